@@ -7,10 +7,6 @@ Interactive web application for churn prediction and analysis.
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
 from pathlib import Path
 import sys
 import joblib
@@ -18,8 +14,12 @@ import joblib
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 
-from predict import load_trained_model, predict_single, predict_batch, prepare_customer_input
+from predict import (predict_batch, predict_customer, PredictionCache,
+                     CUSTOMER_FIELDS, prepare_customer_input, get_explainer, explain_prediction_shap,
+                     SHAP_OUTPUT_UNITS)
 from features import engineer_features
+from data_prep import (load_processed_data, is_processed_data_fresh, columnar_format_available,
+                       PROCESSED_PARQUET_PATH, PROCESSED_CSV_PATH)
 
 # Page configuration
 st.set_page_config(
@@ -834,25 +834,37 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_resource
 def load_model():
-    """Load the trained model (cached)."""
+    """Load the trained model (held by the prediction cache, so there is one copy, reloaded when the file changes)."""
     try:
-        model_path = Path(__file__).parent.parent / "models" / "model.joblib"
-        pipeline = load_trained_model(str(model_path))
-        return pipeline
+        return load_prediction_cache().pipeline()
     except FileNotFoundError:
         st.error("❌ Model not found. Please train the model first by running: `python src/train.py`")
         return None
 
 
+@st.cache_resource
+def load_prediction_cache():
+    """Prediction cache shared across sessions (invalidated when the model file changes)."""
+    model_path = Path(__file__).parent.parent / "models" / "model.joblib"
+    return PredictionCache(model_path)
+
+
 @st.cache_data
 def load_dataset():
     """Load the dataset for EDA (cached)."""
     try:
-        data_path = Path(__file__).parent.parent / "data" / "processed" / "telco_churn_clean.csv"
+        project_root = Path(__file__).parent.parent
+        raw_path = project_root / "data" / "raw" / "telco_churn.csv"
+        
+        # Prefer the columnar processed data while it matches the raw file
+        parquet_path = project_root / PROCESSED_PARQUET_PATH
+        if columnar_format_available() and is_processed_data_fresh(parquet_path, raw_path):
+            return load_processed_data(parquet_path)
+        
+        data_path = project_root / PROCESSED_CSV_PATH
         if not data_path.exists():
-            data_path = Path(__file__).parent.parent / "data" / "raw" / "telco_churn.csv"
+            data_path = raw_path
         
         df = pd.read_csv(data_path)
         return df
@@ -1081,6 +1093,9 @@ def home_page():
 
 def eda_page():
     """Display the EDA page with Font Awesome icons."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     st.markdown('<h1 class="main-header"><i class="fas fa-chart-bar"></i> Exploratory Data Analysis</h1>', unsafe_allow_html=True)
     
     df = load_dataset()
@@ -1263,13 +1278,15 @@ def predict_page():
     st.markdown("<br>", unsafe_allow_html=True)
     
     if st.session_state.prediction_mode == "single":
-        single_customer_prediction(pipeline)
+        single_customer_prediction()
     else:
         batch_prediction(pipeline)
 
 
-def single_customer_prediction(pipeline):
+def single_customer_prediction():
     """Handle single customer prediction."""
+    import plotly.graph_objects as go
+    
     st.markdown('<h2 class="sub-header"><i class="fas fa-user icon"></i>Enter Customer Details</h2>', unsafe_allow_html=True)
     
     st.info("ⓘ Fill in the customer information below to predict churn probability")
@@ -1345,18 +1362,22 @@ def single_customer_prediction(pipeline):
     
     if submitted:
         # Prepare input
-        customer_df = prepare_customer_input(
+        customer = dict(zip(CUSTOMER_FIELDS, [
             gender, senior_citizen, partner, dependents, tenure,
             phone_service, multiple_lines, internet_service,
             online_security, online_backup, device_protection,
             tech_support, streaming_tv, streaming_movies,
             contract, paperless_billing, payment_method,
             monthly_charges, total_charges
-        )
+        ]))
         
-        # Make prediction
+        # One model snapshot for the prediction and its explanation, even if the model file is swapped meanwhile
+        cache = load_prediction_cache()
+        checksum, pipeline = cache.model()
+        
+        # Make prediction (repeat submissions of the same customer come from the cache)
         with st.spinner("🤖 Analyzing customer data..."):
-            result = predict_single(pipeline, customer_df)
+            result = predict_customer(customer, pipeline, cache=cache, checksum=checksum)
         
         # Display results with enhanced styling
         st.markdown('<h2 class="sub-header"><i class="fas fa-chart-pie icon"></i>Prediction Results</h2>', unsafe_allow_html=True)
@@ -1447,6 +1468,32 @@ def single_customer_prediction(pipeline):
         
         st.plotly_chart(fig, use_container_width=True)
         
+        # Top factors from the explainer saved at training time (loaded on first use)
+        model_path = Path(__file__).parent.parent / "models" / "model.joblib"
+        explainer = get_explainer(model_path, model_path.parent / "explainer.joblib")
+        if explainer is not None and explainer['model_checksum'] == checksum:
+            st.markdown('<h2 class="sub-header"><i class="fas fa-list-ol icon"></i>Top Factors</h2>', unsafe_allow_html=True)
+            
+            explanation = explain_prediction_shap(pipeline, prepare_customer_input(*customer.values()),
+                                                  explainer=explainer)
+            factors = pd.DataFrame({'Feature': explanation.feature_names, 'SHAP': explanation.values[0]})
+            factors = factors.reindex(factors['SHAP'].abs().sort_values(ascending=False).index).head(10)
+            
+            fig = go.Figure(go.Bar(
+                x=factors['SHAP'][::-1], y=factors['Feature'][::-1], orientation='h',
+                marker_color=['#ef4444' if v > 0 else '#10b981' for v in factors['SHAP'][::-1]]
+            ))
+            # Linear and XGBoost contributions are in log-odds, Random Forest ones in probability
+            units = SHAP_OUTPUT_UNITS[explainer['method']]
+            fig.update_layout(
+                height=400,
+                margin=dict(l=20, r=20, t=40, b=20),
+                title=f"Contribution to churn risk in {units} (red raises, green lowers)",
+                xaxis_title=f"SHAP value ({units})",
+                paper_bgcolor="white"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
         # Recommendations
         st.markdown('<h2 class="sub-header"><i class="fas fa-lightbulb icon"></i>Recommended Actions</h2>', unsafe_allow_html=True)
         
@@ -1499,6 +1546,8 @@ def single_customer_prediction(pipeline):
 
 def batch_prediction(pipeline):
     """Handle batch prediction from CSV upload."""
+    import plotly.express as px
+    
     st.markdown('<h2 class="sub-header"><i class="fas fa-upload icon"></i>Upload Customer Data</h2>', unsafe_allow_html=True)
     
     st.info("""
@@ -1584,6 +1633,8 @@ def batch_prediction(pipeline):
 
 def model_performance_page():
     """Display model performance metrics."""
+    import plotly.graph_objects as go
+    
     st.markdown('<h1 class="main-header"><i class="fas fa-chart-line"></i> Model Performance</h1>', unsafe_allow_html=True)
     
     try:
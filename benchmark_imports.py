@@ -0,0 +1,148 @@
+"""
+Import-Time Benchmark
+=====================
+Measure the cold-start import cost of the prediction CLI (src/predict.py),
+the prediction server (src/serve.py) and the Streamlit dashboard
+(app/app.py) with `python -X importtime`, and list the heavy libraries each
+entry point loads before doing any work.
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).parent
+
+# Entry point -> (module to import, directory holding it)
+ENTRY_POINTS = {
+    'cli': ('predict', 'src'),
+    'server': ('serve', 'src'),
+    'app': ('app', 'app')
+}
+
+# Libraries that should only be imported by the functions that need them
+HEAVY_PACKAGES = ['shap', 'numba', 'matplotlib', 'seaborn', 'plotly', 'sklearn', 'scipy', 'xgboost', 'imblearn']
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)\s*$')
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+    
+    Returns:
+    --------
+    list of tuple
+        (module, self time in ms, cumulative time in ms, nesting depth), in output order
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2))
+    return rows
+
+
+def measure_import(module, module_dir, repeats=5, top=5):
+    """
+    Import a module in fresh interpreters and time it.
+    
+    Parameters:
+    -----------
+    module : str
+        Module to import
+    module_dir : str
+        Directory (relative to the repo root) the module lives in; src/ is
+        always on the path
+    repeats : int
+        Fresh interpreters to run (the median is reported)
+    top : int
+        Number of slowest direct imports to report
+    
+    Returns:
+    --------
+    dict
+        Median import time (ms), heavy packages loaded and slowest direct
+        imports, or an 'error' entry if the module cannot be imported here
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT / 'src'), str(ROOT / module_dir)]))
+    
+    times, rows = [], []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=ROOT, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1]}
+        
+        rows = parse_importtime(result.stderr)
+        # The entry point is the last top-level row; its direct imports are the depth-1 rows before it
+        target = max(i for i, row in enumerate(rows) if row[0] == module and row[3] == 0)
+        times.append(rows[target][2])
+    
+    start = max((i for i, row in enumerate(rows[:target]) if row[3] == 0), default=-1) + 1
+    direct = sorted((row for row in rows[start:target] if row[3] == 1), key=lambda row: -row[2])
+    loaded = {row[0].split('.')[0] for row in rows}
+    
+    return {
+        'import_ms': statistics.median(times),
+        'heavy_packages': [package for package in HEAVY_PACKAGES if package in loaded],
+        'slowest': [(row[0], row[2]) for row in direct[:top]]
+    }
+
+
+def run_benchmark(entry_points=None, repeats=5, top=5):
+    """
+    Measure every entry point.
+    
+    Parameters:
+    -----------
+    entry_points : list of str, optional
+        Keys of ENTRY_POINTS to measure (defaults to all)
+    repeats : int
+        Fresh interpreters per entry point
+    top : int
+        Number of slowest direct imports to report
+    
+    Returns:
+    --------
+    dict
+        Results keyed by entry point
+    """
+    report = {}
+    for name in entry_points or ENTRY_POINTS:
+        module, module_dir = ENTRY_POINTS[name]
+        print(f"⏱ Importing {module_dir}/{module}.py ({repeats} fresh interpreters)...")
+        report[name] = measure_import(module, module_dir, repeats=repeats, top=top)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Cold-start import time of the CLI, server and app")
+    parser.add_argument("--entry", nargs="+", choices=list(ENTRY_POINTS), help="Entry points to measure (default: all)")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--top", type=int, default=5, help="Slowest direct imports to list")
+    args = parser.parse_args()
+    
+    report = run_benchmark(args.entry, repeats=args.repeats, top=args.top)
+    
+    print("\n" + "="*50)
+    print("🚀 IMPORT-TIME RESULTS")
+    print("="*50)
+    for name, result in report.items():
+        module, module_dir = ENTRY_POINTS[name]
+        print(f"\n{name} ({module_dir}/{module}.py)")
+        if 'error' in result:
+            print(f"  ⚠ Not measured: {result['error']}")
+            continue
+        print(f"  Import time:     {result['import_ms']:.0f} ms (median)")
+        print(f"  Heavy packages:  {', '.join(result['heavy_packages']) or 'none'}")
+        for dependency, ms in result['slowest']:
+            print(f"    {dependency:<28} {ms:8.1f} ms")
+    print("="*50)
@@ -0,0 +1,146 @@
+"""
+Prediction Server Load Test
+===========================
+Fire concurrent single-customer requests at a running prediction server
+(python src/serve.py) and report latency percentiles and requests/second.
+"""
+
+import http.client
+import json
+import threading
+import time
+import numpy as np
+
+
+SAMPLE_CUSTOMER = {
+    'gender': 'Male',
+    'SeniorCitizen': 'No',
+    'Partner': 'Yes',
+    'Dependents': 'No',
+    'tenure': 12,
+    'PhoneService': 'Yes',
+    'MultipleLines': 'No',
+    'InternetService': 'Fiber optic',
+    'OnlineSecurity': 'No',
+    'OnlineBackup': 'No',
+    'DeviceProtection': 'No',
+    'TechSupport': 'No',
+    'StreamingTV': 'Yes',
+    'StreamingMovies': 'Yes',
+    'Contract': 'Month-to-month',
+    'PaperlessBilling': 'Yes',
+    'PaymentMethod': 'Electronic check',
+    'MonthlyCharges': 85.0,
+    'TotalCharges': 1020.0
+}
+
+
+def load_customers(csv_path, limit=1000):
+    """Read request bodies from a cleaned customer CSV (SeniorCitizen as Yes/No)."""
+    import pandas as pd
+    
+    df = pd.read_csv(csv_path, nrows=limit).drop(columns=['customerID', 'Churn'], errors='ignore')
+    if df['SeniorCitizen'].dtype != object:
+        df['SeniorCitizen'] = df['SeniorCitizen'].map({0: 'No', 1: 'Yes'})
+    return df.to_dict('records')
+
+
+def _client(host, port, bodies, stop_at, results):
+    """Send requests over one keep-alive connection until `stop_at`."""
+    connection = http.client.HTTPConnection(host, port)
+    latencies, statuses = [], {}
+    i = 0
+    
+    while time.perf_counter() < stop_at:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('POST', '/predict', body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 'connection error'
+            connection.close()
+            connection = http.client.HTTPConnection(host, port)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    
+    connection.close()
+    results.append((latencies, statuses))
+
+
+def run_load_test(host="127.0.0.1", port=8000, concurrency=16, duration=10.0, customers=None):
+    """
+    Run a closed-loop load test against /predict.
+    
+    Parameters:
+    -----------
+    host, port : str, int
+        Server address
+    concurrency : int
+        Number of simultaneous clients (each waits for its response before sending again)
+    duration : float
+        Test length in seconds
+    customers : list of dict, optional
+        Request bodies to cycle through (defaults to SAMPLE_CUSTOMER)
+    
+    Returns:
+    --------
+    dict
+        Request count, status counts, requests/second and latency percentiles (ms)
+    """
+    bodies = [json.dumps(customer) for customer in (customers or [SAMPLE_CUSTOMER])]
+    results = []
+    
+    print(f"\n⏱ {concurrency} clients for {duration:.0f}s against http://{host}:{port}/predict ...")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=_client, args=(host, port, bodies, start + duration, results))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    latencies = np.concatenate([np.array(lat) for lat, _ in results])
+    statuses = {}
+    for _, client_statuses in results:
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    
+    return {
+        'requests': len(latencies),
+        'statuses': statuses,
+        'requests_per_second': len(latencies) / elapsed,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'latency_max_ms': float(latencies.max())
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Load test the churn prediction server")
+    parser.add_argument("--host", default="127.0.0.1", help="Server address")
+    parser.add_argument("--port", type=int, default=8000, help="Server port")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simultaneous clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test length in seconds")
+    parser.add_argument("--data", help="Cleaned customer CSV to draw request bodies from")
+    args = parser.parse_args()
+    
+    customers = load_customers(args.data) if args.data else None
+    report = run_load_test(args.host, args.port, concurrency=args.concurrency,
+                           duration=args.duration, customers=customers)
+    
+    print("\n" + "="*50)
+    print("📈 LOAD TEST RESULTS")
+    print("="*50)
+    print(f"Requests:      {report['requests']} ({report['statuses']})")
+    print(f"Throughput:    {report['requests_per_second']:,.1f} requests/second")
+    print(f"Latency p50:   {report['latency_p50_ms']:.2f} ms")
+    print(f"Latency p99:   {report['latency_p99_ms']:.2f} ms")
+    print(f"Latency max:   {report['latency_max_ms']:.2f} ms")
+    print("="*50)
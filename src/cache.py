@@ -0,0 +1,127 @@
+"""
+Stage Cache Module
+==================
+Content-addressed on-disk cache for intermediate DataFrames of the
+data-preparation and feature-engineering stages.
+"""
+
+import pandas as pd
+import joblib
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from data_prep import file_checksum, columnar_format_available
+
+
+# Default cache location and size budget
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_CACHE_MAX_MB = 1024
+
+
+def stage_key(stage_name, *parts):
+    """
+    Build a content-addressed key for a pipeline stage.
+    
+    Parameters:
+    -----------
+    stage_name : str
+        Name of the stage (e.g. 'data_prep')
+    *parts : str or Path or dict
+        Inputs that determine the stage output: upstream keys, checksums,
+        code versions, configuration. Existing files are hashed by content.
+    
+    Returns:
+    --------
+    str
+        Hex digest identifying the stage output
+    """
+    digest = hashlib.sha256(stage_name.encode())
+    
+    for part in parts:
+        if isinstance(part, Path) and part.is_file():
+            part = file_checksum(part)
+        elif isinstance(part, dict):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(b'\0' + str(part).encode())
+    
+    return digest.hexdigest()
+
+
+def module_version(module):
+    """Code version of a stage: the checksum of the module source that implements it."""
+    return file_checksum(module.__file__)
+
+
+def _entry_path(cache_dir, stage_name, key):
+    """Location of a cache entry (Parquet keeps dtypes; joblib is the fallback)."""
+    suffix = '.parquet' if columnar_format_available() else '.joblib'
+    return Path(cache_dir) / f"{stage_name}-{key[:32]}{suffix}"
+
+
+def _evict(cache_dir, max_bytes, keep=None):
+    """
+    Delete least recently used entries until the cache fits in `max_bytes`.
+    
+    `keep` (the entry just written) is never evicted, even if it alone
+    exceeds the budget or its mtime does not sort last.
+    """
+    entries = [p for p in Path(cache_dir).glob('*') if p.suffix in ('.parquet', '.joblib')]
+    total = sum(p.stat().st_size for p in entries)
+    entries = [p for p in entries if keep is None or p != Path(keep)]
+    entries.sort(key=lambda p: p.stat().st_mtime_ns)
+    
+    while entries and total > max_bytes:
+        oldest = entries.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink()
+        print(f"  ✓ Evicted cache entry: {oldest.name}")
+
+
+def cached_stage(stage_name, key, compute_fn, cache_dir=DEFAULT_CACHE_DIR,
+                 max_mb=DEFAULT_CACHE_MAX_MB, force=False):
+    """
+    Return the cached output of a stage, computing and storing it on a miss.
+    
+    Parameters:
+    -----------
+    stage_name : str
+        Name of the stage
+    key : str
+        Key from stage_key
+    compute_fn : callable
+        Zero-argument function producing the stage's DataFrame
+    cache_dir : str or Path
+        Directory holding cache entries
+    max_mb : float
+        Size budget; least recently used entries are evicted beyond it
+    force : bool
+        Recompute (and overwrite the entry) even if the key matches
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Stage output
+    """
+    path = _entry_path(cache_dir, stage_name, key)
+    
+    if path.exists() and not force:
+        # Refresh the modification time so LRU eviction sees this entry as used
+        os.utime(path)
+        df = pd.read_parquet(path) if path.suffix == '.parquet' else joblib.load(path)
+        print(f"✓ Cache hit for stage '{stage_name}' ({path.name})")
+        return df
+    
+    df = compute_fn()
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.parquet':
+        df.to_parquet(path)
+    else:
+        joblib.dump(df, path)
+    print(f"✓ Cached stage '{stage_name}' ({path.name})")
+    
+    _evict(cache_dir, max_mb * 1024**2, keep=path)
+    
+    return df
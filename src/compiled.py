@@ -0,0 +1,553 @@
+"""
+Compiled Scorer Module
+======================
+Compile a fitted preprocessing + model pipeline into flat NumPy arrays
+(category-to-column tables, scaler constants, coefficients or flattened trees)
+for low-overhead scoring without sklearn dispatch.
+
+Saved scorers are directories of uncompressed .npy arrays that are
+memory-mapped on load, so every scoring process on a host shares one copy
+of the arrays through the OS page cache.
+"""
+
+import pandas as pd
+import numpy as np
+import joblib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+# Rows x trees evaluated at once by evaluate_trees (bounds the traversal working set)
+TREE_BATCH_CELLS = 1 << 16
+
+# Saved scorer layout: the small fields in an index file, each array in its own .npy file
+DEFAULT_COMPILED_PATH = "models/model_compiled"
+SCORER_INDEX_FILE = "scorer.joblib"
+
+
+def _compile_preprocessor(preprocessor):
+    """
+    Extract scaler constants and one-hot lookup tables from a fitted ColumnTransformer.
+    
+    Returns:
+    --------
+    dict
+        Numerical/categorical feature names, scaler mean and scale, and for
+        every categorical feature a {value: output column} table
+    """
+    numerical_features, categorical_features = [], []
+    mean = scale = None
+    category_columns = []
+    
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'num':
+            numerical_features = list(columns)
+            n_num = len(numerical_features)
+            mean = transformer.mean_ if transformer.with_mean else np.zeros(n_num)
+            scale = transformer.scale_ if transformer.with_std else np.ones(n_num)
+        elif name == 'cat':
+            categorical_features = list(columns)
+            encoder = transformer
+        elif transformer != 'drop':
+            raise ValueError(f"Cannot compile preprocessor step '{name}'")
+    
+    # One-hot columns follow the numerical block, in encoder order minus dropped categories
+    column = len(numerical_features)
+    drop_idx = getattr(encoder, 'drop_idx_', None) if categorical_features else None
+    for j, categories in enumerate(encoder.categories_ if categorical_features else []):
+        table = {}
+        dropped = drop_idx[j] if drop_idx is not None else None
+        for k, value in enumerate(categories):
+            if dropped is not None and k == dropped:
+                continue
+            table[value] = column
+            column += 1
+        category_columns.append(table)
+    
+    return {
+        'numerical_features': numerical_features,
+        'categorical_features': categorical_features,
+        'mean': np.ascontiguousarray(mean, dtype=np.float64),
+        'scale': np.ascontiguousarray(scale, dtype=np.float64),
+        'category_columns': category_columns,
+        'n_features': column
+    }
+
+
+def _pack_tree(left, right, feature, threshold, default_left, value):
+    """
+    Renumber one tree breadth-first so every right child directly follows its left child.
+    
+    Parameters:
+    -----------
+    left, right : np.ndarray
+        Child node ids (-1 for leaves)
+    feature, threshold, default_left, value : np.ndarray
+        Per-node split feature, float32 threshold, missing-value direction
+        and leaf value
+    
+    Returns:
+    --------
+    dict
+        Packed per-node arrays (leaves point to themselves and have a NaN
+        threshold, so traversing past a leaf stays on it) and the tree depth
+    """
+    order = [0]
+    depth = {0: 0}
+    for node in order:
+        if left[node] != -1:
+            order.extend((left[node], right[node]))
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    
+    order = np.asarray(order)
+    new_id = np.empty(len(left), dtype=np.int64)
+    new_id[order] = np.arange(len(order))
+    is_leaf = left[order] == -1
+    
+    return {
+        'feature': np.where(is_leaf, 0, feature[order]),
+        'threshold': np.where(is_leaf, np.nan, threshold[order]).astype(np.float32),
+        'left': np.where(is_leaf, np.arange(len(order)), new_id[left[order]]),
+        'default_left': np.where(is_leaf, True, default_left[order]),
+        'value': np.where(is_leaf, value[order], 0.0),
+        'depth': max(depth.values())
+    }
+
+
+def _concatenate_trees(packed_trees, **settings):
+    """Concatenate packed trees into one set of contiguous arrays, offsetting node ids."""
+    sizes = np.array([len(tree['left']) for tree in packed_trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    
+    return {
+        'feature': np.concatenate([tree['feature'] for tree in packed_trees]).astype(np.int32),
+        'threshold': np.concatenate([tree['threshold'] for tree in packed_trees]),
+        'left': np.concatenate([tree['left'] + root for tree, root in zip(packed_trees, roots)]).astype(np.int32),
+        'default_left': np.concatenate([tree['default_left'] for tree in packed_trees]),
+        'value': np.concatenate([tree['value'] for tree in packed_trees]).astype(np.float64),
+        'roots': roots.astype(np.int32),
+        'max_depth': int(max(tree['depth'] for tree in packed_trees)),
+        **settings
+    }
+
+
+def _float32_floor(threshold):
+    """Largest float32 <= each float64 threshold, so float32 x <= t is unchanged."""
+    threshold32 = threshold.astype(np.float32)
+    rounded_up = threshold32.astype(np.float64) > threshold
+    threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+    return threshold32
+
+
+def _flatten_sklearn_forest(model):
+    """Flatten the trees of a RandomForestClassifier into contiguous arrays."""
+    packed_trees = []
+    
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        missing_go_to_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count))
+        packed_trees.append(_pack_tree(
+            tree.children_left, tree.children_right, tree.feature,
+            _float32_floor(tree.threshold), missing_go_to_left.astype(bool),
+            counts[:, 1] / counts.sum(axis=1)
+        ))
+    
+    # sklearn trees go left when float32(x) <= threshold; leaf probabilities are averaged
+    return _concatenate_trees(packed_trees, comparison='le', aggregation='mean', base_margin=0.0)
+
+
+def _flatten_xgboost(model):
+    """Flatten the trees of a binary XGBClassifier booster into contiguous arrays."""
+    booster_json = json.loads(model.get_booster().save_raw('json'))
+    learner = booster_json['learner']
+    
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Cannot compile XGBoost objective '{learner['objective']['name']}'")
+    
+    packed_trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        # Leaf values are stored in split_conditions
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        packed_trees.append(_pack_tree(
+            np.asarray(tree['left_children']), np.asarray(tree['right_children']),
+            np.asarray(tree['split_indices']), conditions,
+            np.asarray(tree['default_left'], dtype=bool), conditions.astype(np.float64)
+        ))
+    
+    # base_score is a probability; the trees add to its log-odds
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    
+    # XGBoost goes left when float32(x) < threshold; leaf values are summed
+    return _concatenate_trees(packed_trees, comparison='lt', aggregation='sum',
+                              base_margin=float(np.log(base_score / (1 - base_score))))
+
+
+def compile_pipeline(pipeline):
+    """
+    Compile a fitted pipeline into a flat, NumPy-only scorer.
+    
+    Supports Logistic Regression / log-loss SGD (coefficients), Random Forest
+    and XGBoost (flattened trees) behind the StandardScaler + OneHotEncoder
+    preprocessor from get_preprocessor.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline
+        Trained model pipeline
+    
+    Returns:
+    --------
+    dict
+        Compiled scorer (plain arrays and lookup tables, picklable with joblib)
+    """
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    
+    preprocessor = pipeline.named_steps['preprocessor']
+    model = pipeline.named_steps['model']
+    
+    scorer = {'preprocessor': _compile_preprocessor(preprocessor), 'model_name': type(model).__name__}
+    
+    if isinstance(model, LogisticRegression) or (isinstance(model, SGDClassifier) and model.loss == 'log_loss'):
+        scorer['kind'] = 'linear'
+        scorer['coef'] = np.ascontiguousarray(model.coef_[0], dtype=np.float64)
+        scorer['intercept'] = float(model.intercept_[0])
+    elif isinstance(model, RandomForestClassifier):
+        scorer['kind'] = 'trees'
+        scorer['trees'] = _flatten_sklearn_forest(model)
+    elif type(model).__name__ == 'XGBClassifier':
+        scorer['kind'] = 'trees'
+        scorer['trees'] = _flatten_xgboost(model)
+    else:
+        raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+    
+    return scorer
+
+
+def _encode_dict(preprocessor, customer):
+    """Encode a single customer dict into a 1 x n_features matrix."""
+    x = np.zeros((1, preprocessor['n_features']))
+    n_num = len(preprocessor['numerical_features'])
+    
+    x[0, :n_num] = [customer[name] for name in preprocessor['numerical_features']]
+    x[0, :n_num] = (x[0, :n_num] - preprocessor['mean']) / preprocessor['scale']
+    
+    for name, table in zip(preprocessor['categorical_features'], preprocessor['category_columns']):
+        column = table.get(customer[name])
+        if column is not None:
+            x[0, column] = 1.0
+    
+    return x
+
+
+def encode(preprocessor, data):
+    """
+    Apply compiled preprocessing to a DataFrame or a single customer dict.
+    
+    Parameters:
+    -----------
+    preprocessor : dict
+        The 'preprocessor' entry of a compiled scorer
+    data : pd.DataFrame or dict
+        Model input features (as passed to the sklearn pipeline)
+    
+    Returns:
+    --------
+    np.ndarray
+        Encoded matrix of shape (n_rows, n_features)
+    """
+    if isinstance(data, dict):
+        return _encode_dict(preprocessor, data)
+    
+    n_rows = len(data)
+    x = np.zeros((n_rows, preprocessor['n_features']))
+    n_num = len(preprocessor['numerical_features'])
+    
+    x[:, :n_num] = data[preprocessor['numerical_features']].to_numpy(dtype=np.float64)
+    x[:, :n_num] -= preprocessor['mean']
+    x[:, :n_num] /= preprocessor['scale']
+    
+    rows = np.arange(n_rows)
+    for name, table in zip(preprocessor['categorical_features'], preprocessor['category_columns']):
+        columns = pd.Series(np.asarray(data[name], dtype=object)).map(table).to_numpy(dtype=np.float64)
+        known = ~np.isnan(columns)
+        x[rows[known], columns[known].astype(np.intp)] = 1.0
+    
+    return x
+
+
+def _traverse_trees(trees, X):
+    """Leaf node reached in every tree by every row of a float32 matrix."""
+    n_rows, n_features = X.shape
+    flat_X = X.ravel()
+    row_offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+    nodes = np.broadcast_to(trees['roots'], (n_rows, len(trees['roots']))).copy()
+    has_missing = np.isnan(X).any()
+    
+    # Working buffers reused at every level
+    index = np.empty_like(nodes)
+    x = np.empty(nodes.shape, dtype=np.float32)
+    threshold = np.empty(nodes.shape, dtype=np.float32)
+    go_right = np.empty(nodes.shape, dtype=bool)
+    compare = np.greater if trees['comparison'] == 'le' else np.greater_equal
+    
+    for _ in range(trees['max_depth']):
+        np.take(trees['feature'], nodes, out=index)
+        index += row_offsets
+        np.take(flat_X, index, out=x)
+        np.take(trees['threshold'], nodes, out=threshold)
+        compare(x, threshold, out=go_right)
+        if has_missing:
+            missing = np.isnan(x)
+            go_right[missing] = ~trees['default_left'][nodes[missing]]
+        # The right child is stored right after the left child
+        np.take(trees['left'], nodes, out=nodes)
+        nodes += go_right
+    
+    return nodes
+
+
+def evaluate_trees(trees, X, batch_cells=TREE_BATCH_CELLS):
+    """
+    Evaluate flattened trees on a matrix, level by level for all rows and trees at once.
+    
+    Rows are processed in batches of about `batch_cells / n_trees` so the
+    (rows x trees) working arrays stay small regardless of the input size.
+    
+    Parameters:
+    -----------
+    trees : dict
+        Flattened tree arrays (from compile_pipeline)
+    X : np.ndarray
+        Encoded matrix
+    batch_cells : int
+        Rows x trees evaluated per batch
+    
+    Returns:
+    --------
+    np.ndarray
+        Churn probability per row
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    batch_rows = max(batch_cells // len(trees['roots']), 1)
+    churn_probability = np.empty(X.shape[0])
+    
+    for start in range(0, X.shape[0], batch_rows):
+        leaf_values = trees['value'][_traverse_trees(trees, X[start:start + batch_rows])]
+        
+        if trees['aggregation'] == 'mean':
+            churn_probability[start:start + batch_rows] = leaf_values.mean(axis=1)
+        else:
+            margin = trees['base_margin'] + leaf_values.sum(axis=1)
+            churn_probability[start:start + batch_rows] = 1.0 / (1.0 + np.exp(-margin))
+    
+    return churn_probability
+
+
+def compiled_predict_proba(scorer, data):
+    """
+    Class probabilities from a compiled scorer.
+    
+    Parameters:
+    -----------
+    scorer : dict
+        Compiled scorer from compile_pipeline
+    data : pd.DataFrame or dict
+        Model input features, or a single customer as a dict
+    
+    Returns:
+    --------
+    np.ndarray
+        Probabilities of shape (n_rows, 2), like predict_proba
+    """
+    X = encode(scorer['preprocessor'], data)
+    
+    if scorer['kind'] == 'linear':
+        churn_probability = 1.0 / (1.0 + np.exp(-(X @ scorer['coef'] + scorer['intercept'])))
+    else:
+        churn_probability = evaluate_trees(scorer['trees'], X)
+    
+    return np.column_stack([1.0 - churn_probability, churn_probability])
+
+
+def export_compiled_scorer(pipeline, output_path=DEFAULT_COMPILED_PATH, validation_data=None, tolerance=1e-6,
+                           model_path=None):
+    """
+    Compile a pipeline, check it against sklearn and save it next to the model.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline
+        Trained model pipeline
+    output_path : str or Path
+        Directory to save the compiled scorer to (see save_compiled_scorer)
+    validation_data : pd.DataFrame, optional
+        Model input rows used to verify the compiled probabilities
+    tolerance : float
+        Maximum allowed absolute difference from pipeline.predict_proba
+    model_path : str or Path, optional
+        Saved model the scorer was compiled from; its size, modification time
+        and checksum are stored so scorer_matches_model can detect a stale
+        scorer after retraining
+    
+    Returns:
+    --------
+    dict or None
+        The compiled scorer, or None if the pipeline could not be compiled
+        or did not match within `tolerance`
+    """
+    try:
+        scorer = compile_pipeline(pipeline)
+    except (ValueError, AttributeError) as e:
+        print(f"⚠ Could not compile scorer: {str(e)}")
+        return None
+    
+    if validation_data is not None:
+        max_error = np.abs(compiled_predict_proba(scorer, validation_data)[:, 1]
+                           - pipeline.predict_proba(validation_data)[:, 1]).max()
+        if max_error > tolerance:
+            print(f"⚠ Compiled scorer differs from the pipeline by {max_error:.2e}; not saved")
+            return None
+        print(f"✓ Compiled scorer matches the pipeline (max error {max_error:.1e})")
+    
+    if model_path is not None:
+        from data_prep import file_checksum
+        scorer['model_checksum'] = file_checksum(model_path)
+        scorer['model_file_state'] = _file_state(model_path)
+    
+    save_compiled_scorer(scorer, output_path)
+    print(f"✓ Compiled scorer saved to: {output_path}")
+    
+    return scorer
+
+
+def _file_state(path):
+    """Size and modification time of a file: a cheap stand-in for its checksum."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def scorer_matches_model(scorer, model_path):
+    """
+    Whether a saved scorer was compiled from the model file at `model_path`.
+    
+    The file's size and modification time are compared with the ones stored
+    at export, so the usual start-up check reads no model bytes; only when
+    they differ (e.g. the file was copied) is the model hashed and compared
+    with the stored checksum.
+    """
+    if scorer.get('model_file_state') == _file_state(model_path):
+        return True
+    
+    from data_prep import file_checksum
+    return scorer.get('model_checksum') == file_checksum(model_path)
+
+
+def compiled_scorer_path(model_path):
+    """Directory of the compiled scorer saved next to a model (models/model.joblib -> models/model_compiled)."""
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}_compiled")
+
+
+class _ArrayFile(str):
+    """Name of the .npy file holding one array of a saved scorer."""
+
+
+def _split_arrays(scorer, prefix=''):
+    """Replace every array in a (nested) scorer dict by its file name; returns (index, {file name: array})."""
+    index, arrays = {}, {}
+    
+    for key, value in scorer.items():
+        if isinstance(value, dict):
+            index[key], nested_arrays = _split_arrays(value, prefix=f"{prefix}{key}.")
+            arrays.update(nested_arrays)
+        elif isinstance(value, np.ndarray):
+            index[key] = _ArrayFile(f"{prefix}{key}.npy")
+            arrays[index[key]] = value
+        else:
+            index[key] = value
+    
+    return index, arrays
+
+
+def _map_arrays(index, directory, mmap_mode):
+    """Inverse of _split_arrays: load (memory-map) the arrays an index refers to."""
+    scorer = {}
+    
+    for key, value in index.items():
+        if isinstance(value, dict):
+            scorer[key] = _map_arrays(value, directory, mmap_mode)
+        elif isinstance(value, _ArrayFile):
+            scorer[key] = np.load(directory / value, mmap_mode=mmap_mode, allow_pickle=False)
+        else:
+            scorer[key] = value
+    
+    return scorer
+
+
+def save_compiled_scorer(scorer, output_path=DEFAULT_COMPILED_PATH):
+    """
+    Save a compiled scorer as a directory of uncompressed .npy arrays plus an index.
+    
+    The directory is built next to `output_path` and swapped in at the end:
+    processes that still map the previous arrays keep reading intact files
+    (an overwritten memory-mapped file would crash them).
+    
+    Parameters:
+    -----------
+    scorer : dict
+        Compiled scorer from compile_pipeline
+    output_path : str or Path
+        Directory to save the scorer to
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{output_path.name}.", dir=output_path.parent))
+    os.chmod(staging_dir, 0o755)
+    index, arrays = _split_arrays(scorer)
+    for file_name, array in arrays.items():
+        np.save(staging_dir / file_name, np.ascontiguousarray(array), allow_pickle=False)
+    joblib.dump(index, staging_dir / SCORER_INDEX_FILE)
+    
+    if not output_path.exists():
+        os.replace(staging_dir, output_path)
+        return
+    
+    retired_dir = Path(tempfile.mkdtemp(prefix=f".{output_path.name}.old.", dir=output_path.parent))
+    os.replace(output_path, retired_dir / output_path.name)
+    os.replace(staging_dir, output_path)
+    shutil.rmtree(retired_dir, ignore_errors=True)
+
+
+def load_compiled_scorer(scorer_path=DEFAULT_COMPILED_PATH, mmap_mode='r'):
+    """
+    Load a compiled scorer saved by export_compiled_scorer.
+    
+    Parameters:
+    -----------
+    scorer_path : str or Path
+        Scorer directory (or a single-file scorer saved with joblib.dump)
+    mmap_mode : str or None
+        'r' memory-maps the arrays read-only, so loading is near-instant and
+        processes share the pages; None reads them into private memory
+    
+    Returns:
+    --------
+    dict
+        Compiled scorer
+    """
+    scorer_path = Path(scorer_path)
+    
+    try:
+        if scorer_path.is_dir():
+            return _map_arrays(joblib.load(scorer_path / SCORER_INDEX_FILE), scorer_path, mmap_mode)
+        return joblib.load(scorer_path, mmap_mode=mmap_mode)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Compiled scorer not found at {scorer_path}. Please train the model first by running: python src/train.py"
+        )
@@ -6,10 +6,37 @@ Functions for loading, cleaning, and basic preprocessing of telecom churn data.
 
 import pandas as pd
 import numpy as np
+import hashlib
+import importlib.util
+import json
 from pathlib import Path
 
 
-def load_data(filepath):
+# Enum-like columns stored as pandas categoricals instead of Python strings
+CATEGORICAL_COLUMNS = [
+    'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+    'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract',
+    'PaperlessBilling', 'PaymentMethod', 'Churn'
+]
+
+# Declared dtypes for the raw Telco columns (applied while parsing). The charges
+# stay float64: scoring parses them as float64, and float32 values would land on
+# the other side of split thresholds than the same customer scored at serve time
+TELCO_SCHEMA = {
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    'customerID': 'object',
+    'SeniorCitizen': 'int8',
+    'tenure': 'int16',
+    'MonthlyCharges': 'float64',
+    'TotalCharges': 'float64'
+}
+
+# TotalCharges is blank for brand-new customers; parse blanks as NaN
+TELCO_NA_VALUES = {'TotalCharges': [' ', '']}
+
+
+def load_data(filepath, use_schema=True):
     """
     Load the Telco Customer Churn dataset.
     
@@ -17,6 +44,9 @@ def load_data(filepath):
     -----------
     filepath : str or Path
         Path to the CSV file
+    use_schema : bool
+        Whether to apply TELCO_SCHEMA at parse time (categoricals and
+        compact ints) instead of letting pandas infer object columns
     
     Returns:
     --------
@@ -24,8 +54,13 @@ def load_data(filepath):
         Loaded dataset
     """
     try:
-        df = pd.read_csv(filepath)
-        print(f"✓ Data loaded successfully: {df.shape[0]} rows, {df.shape[1]} columns")
+        if use_schema:
+            df = pd.read_csv(filepath, dtype=TELCO_SCHEMA, na_values=TELCO_NA_VALUES,
+                             keep_default_na=False)
+        else:
+            df = pd.read_csv(filepath)
+        print(f"✓ Data loaded successfully: {df.shape[0]} rows, {df.shape[1]} columns "
+              f"({df.memory_usage(deep=True).sum() / 1024**2:.1f} MB)")
         return df
     except FileNotFoundError:
         raise FileNotFoundError(f"Dataset not found at {filepath}. Please ensure the file exists.")
@@ -33,7 +68,7 @@ def load_data(filepath):
         raise Exception(f"Error loading data: {str(e)}")
 
 
-def clean_data(df):
+def clean_data(df, keep_id=False):
     """
     Clean the dataset by handling missing values and data type issues.
     
@@ -41,6 +76,9 @@ def clean_data(df):
     -----------
     df : pd.DataFrame
         Raw dataset
+    keep_id : bool
+        Keep the customerID column, for outputs keyed by customer (the
+        features used for modeling must not include it)
     
     Returns:
     --------
@@ -50,19 +88,21 @@ def clean_data(df):
     df_clean = df.copy()
     
     # Remove customer ID (not useful for prediction)
-    if 'customerID' in df_clean.columns:
+    if 'customerID' in df_clean.columns and not keep_id:
         df_clean = df_clean.drop('customerID', axis=1)
     
     # Handle TotalCharges - sometimes stored as string with spaces
+    # (already numeric when loaded with TELCO_SCHEMA)
     if 'TotalCharges' in df_clean.columns:
-        df_clean['TotalCharges'] = pd.to_numeric(df_clean['TotalCharges'], errors='coerce')
+        if not pd.api.types.is_numeric_dtype(df_clean['TotalCharges']):
+            df_clean['TotalCharges'] = pd.to_numeric(df_clean['TotalCharges'], errors='coerce')
         
         # Fill missing TotalCharges with 0 (likely new customers)
-        df_clean['TotalCharges'].fillna(0, inplace=True)
+        df_clean['TotalCharges'] = df_clean['TotalCharges'].fillna(0)
     
     # Handle SeniorCitizen (convert to Yes/No for consistency)
     if 'SeniorCitizen' in df_clean.columns:
-        df_clean['SeniorCitizen'] = df_clean['SeniorCitizen'].map({0: 'No', 1: 'Yes'})
+        df_clean['SeniorCitizen'] = df_clean['SeniorCitizen'].map({0: 'No', 1: 'Yes'}).astype('category')
     
     # Remove any duplicate rows
     initial_shape = df_clean.shape[0]
@@ -79,9 +119,9 @@ def clean_data(df):
         print(missing_summary[missing_summary > 0])
         
         # Fill remaining missing values with mode for categorical
-        for col in df_clean.select_dtypes(include=['object']).columns:
+        for col in df_clean.select_dtypes(include=['object', 'category']).columns:
             if df_clean[col].isnull().sum() > 0:
-                df_clean[col].fillna(df_clean[col].mode()[0], inplace=True)
+                df_clean[col] = df_clean[col].fillna(df_clean[col].mode()[0])
     
     print(f"✓ Data cleaned: {df_clean.shape[0]} rows, {df_clean.shape[1]} columns")
     
@@ -108,8 +148,8 @@ def get_feature_types(df, target_col='Churn'):
     features = df.drop(target_col, axis=1).columns.tolist()
     
     # Identify numerical and categorical features
-    numerical_features = df[features].select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_features = df[features].select_dtypes(include=['object']).columns.tolist()
+    numerical_features = df[features].select_dtypes(include='number').columns.tolist()
+    categorical_features = df[features].select_dtypes(include=['object', 'category']).columns.tolist()
     
     feature_dict = {
         'numerical': numerical_features,
@@ -123,9 +163,86 @@ def get_feature_types(df, target_col='Churn'):
     return feature_dict
 
 
-def save_processed_data(df, output_path):
+def memory_usage_report(df):
+    """
+    Report the in-memory size of each column.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Per-column dtype and memory usage in MB, largest first
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Column': usage.index,
+        'Dtype': [str(df[col].dtype) for col in usage.index],
+        'Memory (MB)': usage.values / 1024**2
+    }).sort_values('Memory (MB)', ascending=False)
+    
+    print(f"\n💾 Memory usage: {report['Memory (MB)'].sum():.2f} MB")
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    
+    return report
+
+
+# Binary columnar formats that keep dtypes and support column projection
+COLUMNAR_FORMATS = ('.parquet', '.feather')
+
+# Default locations of the processed dataset
+PROCESSED_PARQUET_PATH = "data/processed/telco_churn_clean.parquet"
+PROCESSED_CSV_PATH = "data/processed/telco_churn_clean.csv"
+
+
+def columnar_format_available():
+    """Whether pyarrow is installed, i.e. Parquet/Feather can be read and written."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def file_checksum(filepath, block_size=1 << 20):
     """
-    Save the processed dataset to CSV.
+    Compute the SHA-256 checksum of a file's contents.
+    
+    Parameters:
+    -----------
+    filepath : str or Path
+        File to hash
+    block_size : int
+        Bytes read per iteration
+    
+    Returns:
+    --------
+    str
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_metadata_path(output_path):
+    """Sidecar file recording which raw file a processed file was built from."""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + '.source.json')
+
+
+def cleaning_code_version():
+    """Version of the loading/cleaning code: the checksum of this module's source."""
+    return file_checksum(__file__)
+
+
+def save_processed_data(df, output_path, source_path=None):
+    """
+    Save the processed dataset.
+    
+    The format follows the file extension: `.parquet` and `.feather` are
+    binary columnar formats that keep dtypes, anything else is written as CSV.
     
     Parameters:
     -----------
@@ -133,20 +250,136 @@ def save_processed_data(df, output_path):
         Processed dataset
     output_path : str or Path
         Output file path
+    source_path : str or Path, optional
+        Raw file the data was prepared from; its checksum and the cleaning
+        code version are recorded so that is_processed_data_fresh can detect
+        when either changes. Without it the file is never considered fresh.
     """
     # Create directory if it doesn't exist
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Save to CSV
-    df.to_csv(output_path, index=False)
+    # Drop the old sidecar first: it describes the data being replaced
+    metadata_path = _source_metadata_path(output_path)
+    metadata_path.unlink(missing_ok=True)
+    
+    suffix = output_path.suffix.lower()
+    if suffix == '.parquet':
+        df.to_parquet(output_path, index=False)
+    elif suffix == '.feather':
+        # Feather requires a default RangeIndex
+        df.reset_index(drop=True).to_feather(output_path)
+    else:
+        df.to_csv(output_path, index=False)
+    
+    if source_path is not None:
+        metadata = {
+            'source': str(source_path),
+            'sha256': file_checksum(source_path),
+            'code_version': cleaning_code_version()
+        }
+        metadata_path.write_text(json.dumps(metadata, indent=2))
+    
     print(f"✓ Processed data saved to: {output_path}")
 
 
-def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=None):
+def is_processed_data_fresh(processed_path, raw_data_path):
+    """
+    Check whether a processed file exists and was built from the current raw
+    file by the current cleaning code.
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Processed data file
+    raw_data_path : str or Path
+        Raw data file it should have been prepared from
+    
+    Returns:
+    --------
+    bool
+        True if the processed file can be used as-is
+    """
+    processed_path = Path(processed_path)
+    metadata_path = _source_metadata_path(processed_path)
+    
+    if not processed_path.exists() or not metadata_path.exists() or not Path(raw_data_path).exists():
+        return False
+    
+    try:
+        metadata = json.loads(metadata_path.read_text())
+    except (OSError, ValueError):
+        return False
+    
+    return (metadata.get('code_version') == cleaning_code_version()
+            and metadata.get('sha256') == file_checksum(raw_data_path))
+
+
+def load_processed_data(processed_path, columns=None):
+    """
+    Load a processed dataset, reading only the requested columns where possible.
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Path to a `.parquet`, `.feather` or CSV file
+    columns : list, optional
+        Columns to load (all if None)
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Processed dataset
+    """
+    processed_path = Path(processed_path)
+    suffix = processed_path.suffix.lower()
+    
+    if suffix == '.parquet':
+        df = pd.read_parquet(processed_path, columns=columns)
+    elif suffix == '.feather':
+        df = pd.read_feather(processed_path, columns=columns)
+    else:
+        df = pd.read_csv(processed_path, usecols=columns)
+    
+    print(f"✓ Processed data loaded from: {processed_path} ({df.shape[0]} rows, {df.shape[1]} columns)")
+    return df
+
+
+def iter_processed_chunks(processed_path, chunksize=100_000):
+    """
+    Stream a processed dataset in chunks without loading the whole file.
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Path to a `.parquet` or CSV file
+    chunksize : int
+        Rows per chunk
+    
+    Yields:
+    -------
+    pd.DataFrame
+        Consecutive chunks of the dataset
+    """
+    processed_path = Path(processed_path)
+    
+    if processed_path.suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+        
+        for batch in pq.ParquetFile(processed_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(processed_path, chunksize=chunksize)
+
+
+def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=None, rebuild=False):
     """
     Complete pipeline to load and prepare data.
     
+    If `processed_path` is a Parquet/Feather file that was built from the
+    current raw file by the current cleaning code, it is loaded directly and
+    cleaning is skipped (unless `rebuild=True`).
+    
     Parameters:
     -----------
     raw_data_path : str or Path
@@ -155,6 +388,8 @@ def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=Non
         Whether to save the processed data
     processed_path : str or Path
         Path to save processed data (if save_processed=True)
+    rebuild : bool
+        Always load and clean the raw file, even if the processed file is fresh
     
     Returns:
     --------
@@ -165,6 +400,16 @@ def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=Non
     print("🔄 DATA PREPARATION PIPELINE")
     print("="*50)
     
+    # Reuse the columnar processed data if neither the raw file nor the cleaning code changed
+    if (not rebuild and processed_path and Path(processed_path).suffix.lower() in COLUMNAR_FORMATS
+            and is_processed_data_fresh(processed_path, raw_data_path)):
+        df_clean = load_processed_data(processed_path)
+        
+        print("\n✅ Data preparation complete! (processed data is up to date)")
+        print("="*50 + "\n")
+        
+        return df_clean
+    
     # Load data
     df = load_data(raw_data_path)
     
@@ -176,7 +421,7 @@ def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=Non
     
     # Save if requested
     if save_processed and processed_path:
-        save_processed_data(df_clean, processed_path)
+        save_processed_data(df_clean, processed_path, source_path=raw_data_path)
     
     print("\n✅ Data preparation complete!")
     print("="*50 + "\n")
@@ -187,8 +432,9 @@ def load_and_prepare_data(raw_data_path, save_processed=True, processed_path=Non
 if __name__ == "__main__":
     # Example usage
     raw_data_path = "../data/raw/telco_churn.csv"
-    processed_path = "../data/processed/telco_churn_clean.csv"
+    processed_path = "../" + (PROCESSED_PARQUET_PATH if columnar_format_available() else PROCESSED_CSV_PATH)
     
     df = load_and_prepare_data(raw_data_path, save_processed=True, processed_path=processed_path)
     print(f"\nDataset shape: {df.shape}")
+    memory_usage_report(df)
     print(f"Target distribution:\n{df['Churn'].value_counts()}")
@@ -6,16 +6,16 @@ Functions for evaluating model performance with various metrics.
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, roc_curve, confusion_matrix, classification_report
 )
 from pathlib import Path
 
+from scoring import score, DEFAULT_THRESHOLD
 
-def evaluate_model(pipeline, X_test, y_test, model_name="Model"):
+
+def evaluate_model(pipeline, X_test, y_test, model_name="Model", threshold=DEFAULT_THRESHOLD):
     """
     Evaluate a trained model on test data.
     
@@ -29,16 +29,42 @@ def evaluate_model(pipeline, X_test, y_test, model_name="Model"):
         Test targets
     model_name : str
         Name of the model for display
+    threshold : float
+        Decision threshold on the churn probability
     
     Returns:
     --------
     dict
         Dictionary of evaluation metrics
     """
-    # Make predictions
-    y_pred = pipeline.predict(X_test)
-    y_pred_proba = pipeline.predict_proba(X_test)[:, 1]
+    # Make predictions (single inference pass)
+    y_pred, probabilities = score(pipeline, X_test, threshold=threshold)
+    
+    return compute_metrics(y_test, y_pred, probabilities[:, 1], model_name=model_name)
+
+
+def compute_metrics(y_test, y_pred, y_pred_proba, model_name="Model", verbose=True):
+    """
+    Calculate and print evaluation metrics from precomputed predictions.
+    
+    Parameters:
+    -----------
+    y_test : array-like
+        True labels
+    y_pred : array-like
+        Predicted labels
+    y_pred_proba : array-like
+        Predicted probabilities for positive class
+    model_name : str
+        Name of the model for display
+    verbose : bool
+        Whether to print the metrics
     
+    Returns:
+    --------
+    dict
+        Dictionary of evaluation metrics
+    """
     # Calculate metrics
     metrics = {
         'accuracy': accuracy_score(y_test, y_pred),
@@ -49,12 +75,13 @@ def evaluate_model(pipeline, X_test, y_test, model_name="Model"):
     }
     
     # Print metrics
-    print(f"\n📊 {model_name} Performance:")
-    print(f"  - Accuracy:  {metrics['accuracy']:.4f}")
-    print(f"  - Precision: {metrics['precision']:.4f}")
-    print(f"  - Recall:    {metrics['recall']:.4f}")
-    print(f"  - F1-Score:  {metrics['f1_score']:.4f}")
-    print(f"  - ROC-AUC:   {metrics['roc_auc']:.4f}")
+    if verbose:
+        print(f"\n📊 {model_name} Performance:")
+        print(f"  - Accuracy:  {metrics['accuracy']:.4f}")
+        print(f"  - Precision: {metrics['precision']:.4f}")
+        print(f"  - Recall:    {metrics['recall']:.4f}")
+        print(f"  - F1-Score:  {metrics['f1_score']:.4f}")
+        print(f"  - ROC-AUC:   {metrics['roc_auc']:.4f}")
     
     return metrics
 
@@ -79,6 +106,9 @@ def plot_confusion_matrix(y_test, y_pred, model_name="Model", save_path=None):
     matplotlib.figure.Figure
         The confusion matrix figure
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     cm = confusion_matrix(y_test, y_pred)
     
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -121,6 +151,8 @@ def plot_roc_curve(y_test, y_pred_proba, model_name="Model", save_path=None):
     matplotlib.figure.Figure
         The ROC curve figure
     """
+    import matplotlib.pyplot as plt
+    
     fpr, tpr, thresholds = roc_curve(y_test, y_pred_proba)
     auc = roc_auc_score(y_test, y_pred_proba)
     
@@ -223,6 +255,8 @@ def plot_model_comparison(comparison_df, save_path=None):
     matplotlib.figure.Figure
         The comparison figure
     """
+    import matplotlib.pyplot as plt
+    
     metrics = ['Accuracy', 'Precision', 'Recall', 'F1-Score', 'ROC-AUC']
     
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -254,7 +288,8 @@ def plot_model_comparison(comparison_df, save_path=None):
     return fig
 
 
-def generate_evaluation_report(pipeline, X_test, y_test, model_name="Model", output_dir="reports"):
+def generate_evaluation_report(pipeline, X_test, y_test, model_name="Model", output_dir="reports",
+                               threshold=DEFAULT_THRESHOLD):
     """
     Generate a complete evaluation report with all metrics and plots.
     
@@ -270,6 +305,8 @@ def generate_evaluation_report(pipeline, X_test, y_test, model_name="Model", out
         Model name
     output_dir : str or Path
         Directory to save outputs
+    threshold : float
+        Decision threshold on the churn probability
     """
     print("\n" + "="*50)
     print("📄 GENERATING EVALUATION REPORT")
@@ -278,12 +315,12 @@ def generate_evaluation_report(pipeline, X_test, y_test, model_name="Model", out
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Make predictions
-    y_pred = pipeline.predict(X_test)
-    y_pred_proba = pipeline.predict_proba(X_test)[:, 1]
+    # Make predictions (single inference pass shared by metrics and plots)
+    y_pred, probabilities = score(pipeline, X_test, threshold=threshold)
+    y_pred_proba = probabilities[:, 1]
     
     # Generate metrics
-    metrics = evaluate_model(pipeline, X_test, y_test, model_name)
+    metrics = compute_metrics(y_test, y_pred, y_pred_proba, model_name)
     
     # Classification report
     print("\n📊 Classification Report:")
@@ -309,6 +346,7 @@ def generate_evaluation_report(pipeline, X_test, y_test, model_name="Model", out
     print("\n✅ Evaluation report complete!")
     print("="*50)
     
+    import matplotlib.pyplot as plt
     plt.close('all')  # Close all figures
     
     return metrics
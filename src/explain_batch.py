@@ -0,0 +1,285 @@
+"""
+Batch Explanation Module
+========================
+Nightly reason codes for the whole customer base: customers are streamed in
+chunks, SHAP values are computed in parallel worker processes, one-hot
+columns are rolled up to their source feature, and only the top-k reasons
+per customer are written to a columnar file.
+"""
+
+import pandas as pd
+import numpy as np
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data_prep import clean_data, iter_processed_chunks, columnar_format_available
+from predict import (load_trained_model, get_explainer, explain_prediction_shap, shap_churn_probability,
+                     _engineer_chunk, DEFAULT_EXPLAINER_PATH)
+
+
+# Default number of reasons kept per customer
+DEFAULT_TOP_K = 3
+
+
+def source_feature_matrix(pipeline, feature_names):
+    """
+    Matrix that sums transformed columns into their source features.
+    
+    Numerical columns map to themselves; one-hot columns map to the
+    categorical feature they encode (e.g. every 'Contract_*' to 'Contract').
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline
+        Trained model pipeline
+    feature_names : list
+        Feature names after preprocessing
+    
+    Returns:
+    --------
+    tuple
+        (matrix of shape (n_transformed, n_sources), source feature names)
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    numerical_features = list(preprocessor.transformers_[0][2])
+    categorical_features = list(preprocessor.transformers_[1][2])
+    source_names = numerical_features + categorical_features
+    
+    # Longest prefix first, so 'A_B_x' goes to 'A_B' rather than 'A'
+    prefixes = sorted(categorical_features, key=len, reverse=True)
+    
+    matrix = np.zeros((len(feature_names), len(source_names)))
+    for i, name in enumerate(feature_names):
+        if name in numerical_features:
+            source = name
+        else:
+            source = next((prefix for prefix in prefixes if name.startswith(prefix + '_')), None)
+            if source is None:
+                raise ValueError(f"Transformed column '{name}' matches no numerical or categorical source feature")
+        matrix[i, source_names.index(source)] = 1.0
+    
+    return matrix, source_names
+
+
+def top_k_reasons(values, source_names, top_k=DEFAULT_TOP_K):
+    """
+    Top-k features by absolute SHAP value for every row.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        SHAP values per source feature, shape (n_rows, n_sources)
+    source_names : list
+        Source feature names
+    top_k : int
+        Reasons kept per row
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Columns reason_1, reason_1_shap, ..., reason_k, reason_k_shap
+        (positive SHAP values push towards churn; log-odds or probability
+        units depending on the model, see predict.SHAP_OUTPUT_UNITS)
+    """
+    top_k = min(top_k, values.shape[1])
+    order = np.argsort(-np.abs(values), axis=1)[:, :top_k]
+    top_values = np.take_along_axis(values, order, axis=1)
+    names = np.asarray(source_names, dtype=object)[order]
+    
+    columns = {}
+    for k in range(top_k):
+        columns[f'reason_{k + 1}'] = names[:, k]
+        columns[f'reason_{k + 1}_shap'] = top_values[:, k]
+    
+    return pd.DataFrame(columns)
+
+
+def explain_chunk(pipeline, explainer, chunk, top_k=DEFAULT_TOP_K, offset=0):
+    """
+    Reason codes for one chunk of customers.
+    
+    The churn probability is recovered from the SHAP base value plus the
+    contributions, so the model is evaluated only once per chunk.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline
+        Trained model pipeline
+    explainer : dict
+        Explainer from get_explainer
+    chunk : pd.DataFrame
+        Customers (raw or processed columns; 'customerID' is carried over if present)
+    top_k : int
+        Reasons kept per customer
+    offset : int
+        Position of the chunk's first row in the input, used when there is no customerID
+    
+    Returns:
+    --------
+    pd.DataFrame
+        One row per customer: id, churn probability and the top-k reasons
+    """
+    if 'customerID' in chunk.columns:
+        ids = pd.DataFrame({'customerID': chunk['customerID'].to_numpy()})
+    else:
+        ids = pd.DataFrame({'row': np.arange(offset, offset + len(chunk))})
+    
+    X = _engineer_chunk(chunk.drop(columns='customerID', errors='ignore'))
+    explanation = explain_prediction_shap(pipeline, X, explainer=explainer)
+    
+    matrix, source_names = source_feature_matrix(pipeline, explanation.feature_names)
+    reasons = top_k_reasons(explanation.values @ matrix, source_names, top_k=top_k)
+    
+    ids['churn_probability'] = shap_churn_probability(explanation, explainer['method'])
+    return pd.concat([ids, reasons], axis=1)
+
+
+# Per-process model and explainer used by the parallel explanation workers
+_worker_state = {}
+
+
+def _init_explain_worker(model_path, explainer_path):
+    """Load the model and explainer once per worker process, single-threaded."""
+    pipeline = load_trained_model(model_path)
+    model = pipeline.named_steps['model']
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    
+    _worker_state['pipeline'] = pipeline
+    _worker_state['explainer'] = get_explainer(model_path, explainer_path)
+
+
+def _explain_chunk_in_worker(chunk, top_k, offset):
+    return explain_chunk(_worker_state['pipeline'], _worker_state['explainer'], chunk, top_k=top_k, offset=offset)
+
+
+def _iter_explained_chunks(chunks, model_path, explainer_path, top_k, n_workers):
+    """Yield explained chunks in input order; at most 2 * n_workers chunks are in flight."""
+    if n_workers <= 1:
+        _init_explain_worker(model_path, explainer_path)
+        offset = 0
+        for chunk in chunks:
+            yield _explain_chunk_in_worker(chunk, top_k, offset)
+            offset += len(chunk)
+        return
+    
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_explain_worker,
+                             initargs=(str(model_path), str(explainer_path))) as executor:
+        pending = deque()
+        offset = 0
+        for chunk in chunks:
+            pending.append(executor.submit(_explain_chunk_in_worker, chunk, top_k, offset))
+            offset += len(chunk)
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+
+
+def explain_batch(customer_file_path, output_path, model_path="models/model.joblib",
+                  explainer_path=DEFAULT_EXPLAINER_PATH, chunksize=10_000, n_workers=1,
+                  top_k=DEFAULT_TOP_K, raw=True):
+    """
+    Write the top-k churn reasons for every customer in a file.
+    
+    Parameters:
+    -----------
+    customer_file_path : str or Path
+        Customer data (CSV or Parquet)
+    output_path : str or Path
+        Output file; Parquet (written chunk by chunk) if pyarrow is
+        installed, otherwise CSV
+    model_path : str or Path
+        Path to trained model
+    explainer_path : str or Path
+        Explainer saved at training time
+    chunksize : int
+        Customers explained per task
+    n_workers : int
+        Worker processes; each loads the model and explainer once
+    top_k : int
+        Reasons kept per customer
+    raw : bool
+        The file has the raw columns: every chunk is cleaned here with
+        clean_data, keeping customerID so each reason row names its customer.
+        False for already cleaned data, which has no customerID; its rows are
+        then numbered in file order
+    
+    Returns:
+    --------
+    dict
+        Summary with row count, output path and customers/second
+    """
+    print("\n" + "="*50)
+    print("🔍 BATCH EXPLANATIONS")
+    print("="*50)
+    
+    if get_explainer(model_path, explainer_path) is None:
+        raise FileNotFoundError(
+            f"No explainer for {model_path} at {explainer_path}. Please retrain the model first by running: python src/train.py"
+        )
+    
+    output_path = Path(output_path)
+    if not columnar_format_available() and output_path.suffix.lower() == '.parquet':
+        output_path = output_path.with_suffix('.csv')
+        print("⚠ pyarrow is not installed; writing CSV instead of Parquet")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    start = time.perf_counter()
+    n_rows = 0
+    writer = None
+    
+    chunks = iter_processed_chunks(customer_file_path, chunksize=chunksize)
+    if raw:
+        chunks = (clean_data(chunk, keep_id=True) for chunk in chunks)
+    try:
+        for i, reasons_df in enumerate(_iter_explained_chunks(chunks, model_path, explainer_path, top_k, n_workers)):
+            if output_path.suffix.lower() == '.parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                
+                table = pa.Table.from_pandas(reasons_df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+            else:
+                reasons_df.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            
+            n_rows += len(reasons_df)
+            print(f"  ✓ Chunk {i + 1}: {n_rows} customers explained")
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ Reasons for {n_rows} customers saved to: {output_path}")
+    print(f"Throughput: {n_rows / max(elapsed, 1e-9):,.0f} customers/second ({elapsed:.1f}s, {n_workers} worker(s))")
+    print("="*50)
+    
+    return {
+        'rows': n_rows,
+        'output_path': str(output_path),
+        'customers_per_second': n_rows / max(elapsed, 1e-9)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Batch SHAP reason codes for a customer file")
+    parser.add_argument("--input", required=True, help="Raw customer data (CSV or Parquet)")
+    parser.add_argument("--processed", action="store_true",
+                        help="The input is already cleaned (no customerID; rows are numbered instead)")
+    parser.add_argument("--output", default="reports/churn_reasons.parquet", help="Output file")
+    parser.add_argument("--model", default="models/model.joblib", help="Path to the trained model")
+    parser.add_argument("--explainer", default=DEFAULT_EXPLAINER_PATH, help="Explainer saved at training time")
+    parser.add_argument("--chunksize", type=int, default=10_000, help="Customers explained per task")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Reasons kept per customer")
+    args = parser.parse_args()
+    
+    explain_batch(args.input, args.output, model_path=args.model, explainer_path=args.explainer,
+                  chunksize=args.chunksize, n_workers=args.workers, top_k=args.top_k, raw=not args.processed)
@@ -6,10 +6,113 @@ Functions for creating new features and preparing data for modeling.
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.pipeline import Pipeline
+
+
+def _safe_divide(numerator, denominator, fallback):
+    """
+    Element-wise division that uses `fallback` wherever the denominator is not positive.
+    
+    Parameters:
+    -----------
+    numerator, denominator : np.ndarray
+        Float arrays of equal length
+    fallback : np.ndarray or float
+        Value(s) used where denominator <= 0 (or NaN)
+    
+    Returns:
+    --------
+    np.ndarray
+        Quotient array
+    """
+    result = np.broadcast_to(np.asarray(fallback, dtype=np.float64), numerator.shape).copy()
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+# Service columns counted towards TotalServices
+SERVICE_COLUMNS = ['PhoneService', 'MultipleLines', 'InternetService', 
+                   'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+                   'TechSupport', 'StreamingTV', 'StreamingMovies']
+
+# Tenure bins and labels shared by the DataFrame and single-customer paths
+TENURE_BINS = [0, 12, 24, 48, 60, 100]
+TENURE_LABELS = ['0-1 year', '1-2 years', '2-4 years', '4-5 years', '5+ years']
+
+
+def _tenure_group_columns(df):
+    """Compute the 'TenureGroup' column without touching `df`."""
+    if 'tenure' not in df.columns:
+        return {}
+    
+    return {'TenureGroup': pd.cut(df['tenure'], bins=TENURE_BINS, labels=TENURE_LABELS, include_lowest=True)}
+
+
+def _charge_columns(df):
+    """Compute 'AvgMonthlyCharges' and 'ChargeRatio' without touching `df`."""
+    if 'TotalCharges' not in df.columns or 'tenure' not in df.columns:
+        return {}
+    
+    total = df['TotalCharges'].to_numpy(dtype=np.float64)
+    tenure = df['tenure'].to_numpy(dtype=np.float64)
+    monthly = df['MonthlyCharges'].to_numpy(dtype=np.float64)
+    
+    return {
+        # Average monthly charges (TotalCharges / tenure), avoiding division by zero
+        'AvgMonthlyCharges': _safe_divide(total, tenure, fallback=monthly),
+        # Charge ratio (how much of monthly charge is the total)
+        'ChargeRatio': _safe_divide(total, monthly, fallback=0.0)
+    }
+
+
+def _service_columns(df):
+    """Compute 'TotalServices' (number of 'Yes' services) without touching `df`."""
+    available_cols = [col for col in SERVICE_COLUMNS if col in df.columns]
+    if not available_cols:
+        return {}
+    
+    return {'TotalServices': (df[available_cols] == 'Yes').sum(axis=1)}
+
+
+def engineer_customer(customer):
+    """
+    Scalar fast path of engineer_features for a single customer dict.
+    
+    Produces the same derived fields as the DataFrame path (TenureGroup,
+    AvgMonthlyCharges, ChargeRatio, TotalServices) without building a frame.
+    
+    Parameters:
+    -----------
+    customer : dict
+        Raw customer fields
+    
+    Returns:
+    --------
+    dict
+        A new dict with the input fields and the engineered fields
+    """
+    engineered = dict(customer)
+    
+    if 'tenure' in customer:
+        # Same intervals as pd.cut(..., include_lowest=True): [0, 12], (12, 24], ...
+        tenure = float(customer['tenure'])
+        engineered['TenureGroup'] = np.nan
+        for lower, upper, label in zip(TENURE_BINS, TENURE_BINS[1:], TENURE_LABELS):
+            if (lower < tenure or (lower == TENURE_BINS[0] and tenure == lower)) and tenure <= upper:
+                engineered['TenureGroup'] = label
+                break
+    
+    if 'TotalCharges' in customer and 'tenure' in customer:
+        total = float(customer['TotalCharges'])
+        tenure = float(customer['tenure'])
+        monthly = float(customer['MonthlyCharges'])
+        engineered['AvgMonthlyCharges'] = total / tenure if tenure > 0 else monthly
+        engineered['ChargeRatio'] = total / monthly if monthly > 0 else 0.0
+    
+    available_cols = [col for col in SERVICE_COLUMNS if col in customer]
+    if available_cols:
+        engineered['TotalServices'] = sum(customer[col] == 'Yes' for col in available_cols)
+    
+    return engineered
 
 
 def create_tenure_groups(df):
@@ -28,11 +131,9 @@ def create_tenure_groups(df):
     """
     df_new = df.copy()
     
-    if 'tenure' in df_new.columns:
-        # Create tenure groups
-        bins = [0, 12, 24, 48, 60, 100]
-        labels = ['0-1 year', '1-2 years', '2-4 years', '4-5 years', '5+ years']
-        df_new['TenureGroup'] = pd.cut(df_new['tenure'], bins=bins, labels=labels, include_lowest=True)
+    new_columns = _tenure_group_columns(df_new)
+    if new_columns:
+        df_new['TenureGroup'] = new_columns['TenureGroup']
         
         print("✓ Created tenure groups")
     
@@ -55,19 +156,10 @@ def create_charge_features(df):
     """
     df_new = df.copy()
     
-    # Average monthly charges (TotalCharges / tenure)
-    if 'TotalCharges' in df_new.columns and 'tenure' in df_new.columns:
-        # Avoid division by zero
-        df_new['AvgMonthlyCharges'] = df_new.apply(
-            lambda row: row['TotalCharges'] / row['tenure'] if row['tenure'] > 0 else row['MonthlyCharges'],
-            axis=1
-        )
-        
-        # Charge ratio (how much of monthly charge is the total)
-        df_new['ChargeRatio'] = df_new.apply(
-            lambda row: row['TotalCharges'] / row['MonthlyCharges'] if row['MonthlyCharges'] > 0 else 0,
-            axis=1
-        )
+    new_columns = _charge_columns(df_new)
+    if new_columns:
+        for col, values in new_columns.items():
+            df_new[col] = values
         
         print("✓ Created charge-related features")
     
@@ -90,56 +182,97 @@ def create_service_features(df):
     """
     df_new = df.copy()
     
-    # List of service columns
-    service_cols = ['PhoneService', 'MultipleLines', 'InternetService', 
-                    'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
-                    'TechSupport', 'StreamingTV', 'StreamingMovies']
-    
-    # Count number of services (Yes answers)
-    available_cols = [col for col in service_cols if col in df_new.columns]
-    
-    if available_cols:
-        df_new['TotalServices'] = df_new[available_cols].apply(
-            lambda row: sum(row == 'Yes'), axis=1
-        )
+    new_columns = _service_columns(df_new)
+    if new_columns:
+        df_new['TotalServices'] = new_columns['TotalServices']
         
-        print(f"✓ Created service bundle features ({len(available_cols)} services)")
+        available = sum(col in df_new.columns for col in SERVICE_COLUMNS)
+        print(f"✓ Created service bundle features ({available} services)")
     
     return df_new
 
 
-def engineer_features(df):
+def _frame_memory_mb(df):
+    """Memory footprint of a DataFrame (or dict of columns) in MB, string payloads included."""
+    if isinstance(df, dict):
+        return sum(pd.Series(values).memory_usage(index=False, deep=True) for values in df.values()) / 1024**2
+    return df.memory_usage(index=False, deep=True).sum() / 1024**2
+
+
+def engineer_features(df, inplace=False, verbose=True, report_memory=False):
     """
     Apply all feature engineering steps.
     
+    All new columns are computed from the input in a single pass and added to
+    the frame in one step, so the peak memory is the input plus the new
+    columns (plus one copy of the input unless `inplace=True`). With
+    `report_memory=True` the memory allocated by the call is measured with
+    tracemalloc and reported; tracing slows every allocation down, so it is
+    off by default.
+    
     Parameters:
     -----------
     df : pd.DataFrame
         Cleaned dataset
+    inplace : bool
+        If True, add the new columns to `df` itself instead of a copy.
+        Use this when the caller owns the frame.
+    verbose : bool
+        Whether to print progress (disable for per-chunk calls)
+    report_memory : bool
+        Whether to measure and print the peak memory of the call
     
     Returns:
     --------
     pd.DataFrame
         Dataset with engineered features
     """
-    print("\n" + "="*50)
-    print("🔧 FEATURE ENGINEERING")
-    print("="*50)
-    
-    df_engineered = df.copy()
-    
-    # Create tenure groups
-    df_engineered = create_tenure_groups(df_engineered)
-    
-    # Create charge features
-    df_engineered = create_charge_features(df_engineered)
-    
-    # Create service features
-    df_engineered = create_service_features(df_engineered)
-    
-    print("\n✅ Feature engineering complete!")
-    print(f"Total features: {df_engineered.shape[1]}")
-    print("="*50 + "\n")
+    import tracemalloc
+    
+    input_mb = _frame_memory_mb(df) if report_memory else 0.0
+    
+    # Measure the allocations of this call (unless the caller is already tracing)
+    measure = report_memory and not tracemalloc.is_tracing()
+    if measure:
+        tracemalloc.start()
+    
+    # Compute every new column from the input before modifying anything
+    new_columns = {}
+    new_columns.update(_tenure_group_columns(df))
+    new_columns.update(_charge_columns(df))
+    new_columns.update(_service_columns(df))
+    
+    df_engineered = df if inplace else df.copy()
+    for col, values in new_columns.items():
+        df_engineered[col] = values
+    
+    memory_report = None
+    if measure:
+        allocated_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+        memory_report = (f"Peak memory: {input_mb + allocated_mb:.1f} MB (input {input_mb:.1f} MB + "
+                         f"{allocated_mb:.1f} MB peak allocated by feature engineering, measured with tracemalloc)")
+    
+    if verbose:
+        print("\n" + "="*50)
+        print("🔧 FEATURE ENGINEERING")
+        print("="*50)
+        
+        if 'TenureGroup' in new_columns:
+            print("✓ Created tenure groups")
+        if 'ChargeRatio' in new_columns:
+            print("✓ Created charge-related features")
+        if 'TotalServices' in new_columns:
+            available = sum(col in df.columns for col in SERVICE_COLUMNS)
+            print(f"✓ Created service bundle features ({available} services)")
+        
+        print("\n✅ Feature engineering complete!")
+        print(f"Total features: {df_engineered.shape[1]}")
+        if memory_report:
+            print(memory_report)
+        print("="*50 + "\n")
+    elif memory_report:
+        print(memory_report)
     
     return df_engineered
 
@@ -160,6 +293,9 @@ def get_preprocessor(numerical_features, categorical_features):
     ColumnTransformer
         Preprocessing pipeline
     """
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.compose import ColumnTransformer
+    
     # Numerical transformer: StandardScaler
     numerical_transformer = StandardScaler()
     
@@ -202,11 +338,11 @@ def prepare_features_for_modeling(df, target_col='Churn'):
     X = df.drop(target_col, axis=1)
     y = df[target_col]
     
-    # Encode target variable (Yes=1, No=0)
-    y = y.map({'Yes': 1, 'No': 0})
+    # Encode target variable (Yes=1, No=0); astype undoes the categorical dtype
+    y = y.map({'Yes': 1, 'No': 0}).astype('int64')
     
-    # Identify feature types
-    numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    # Identify feature types (compact ints from the typed schema count as numerical)
+    numerical_features = X.select_dtypes(include='number').columns.tolist()
     categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
     
     print(f"\n📊 Features prepared for modeling:")
@@ -256,7 +392,7 @@ if __name__ == "__main__":
     from data_prep import load_data
     
     df = load_data("../data/raw/telco_churn.csv")
-    df_engineered = engineer_features(df)
+    df_engineered = engineer_features(df, report_memory=True)
     
     X, y, feature_names, num_features, cat_features = prepare_features_for_modeling(df_engineered)
     
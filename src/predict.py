@@ -7,8 +7,22 @@ Functions for making predictions on new data.
 import pandas as pd
 import numpy as np
 import joblib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import shap
+
+from compiled import (compile_pipeline, compiled_predict_proba, evaluate_trees, encode,
+                      compiled_scorer_path, load_compiled_scorer, scorer_matches_model)
+from scoring import score, DEFAULT_THRESHOLD
+
+
+# Scoring engines: the sklearn pipeline itself, or the flattened NumPy scorer from compiled.py
+ENGINES = ('native', 'flat')
 
 
 def load_trained_model(model_path="models/model.joblib"):
@@ -34,31 +48,66 @@ def load_trained_model(model_path="models/model.joblib"):
         )
 
 
-def predict_single(pipeline, customer_data):
+def load_flat_scorer(model_path="models/model.joblib"):
+    """
+    Load the compiled scorer for a model, memory-mapped.
+    
+    The scorer saved next to the model at training time is mapped read-only,
+    so loading is near-instant and all processes scoring with it share its
+    arrays. If it is missing or was built for another model (see
+    scorer_matches_model), the model is compiled in memory instead.
+    
+    Parameters:
+    -----------
+    model_path : str or Path
+        Path to the saved model
+    
+    Returns:
+    --------
+    dict
+        Compiled scorer
+    """
+    scorer_path = compiled_scorer_path(model_path)
+    if scorer_path.exists():
+        scorer = load_compiled_scorer(scorer_path)
+        if scorer_matches_model(scorer, model_path):
+            return scorer
+        print(f"⚠ {scorer_path} was built for a different model; compiling it in memory")
+    
+    return compile_pipeline(load_trained_model(model_path))
+
+
+def predict_single(pipeline, customer_data, threshold=DEFAULT_THRESHOLD):
     """
     Make prediction for a single customer.
     
     Parameters:
     -----------
-    pipeline : Pipeline
-        Trained model pipeline
+    pipeline : Pipeline or dict
+        Trained model pipeline, or a compiled scorer (scores a dict
+        directly, without building a DataFrame)
     customer_data : dict or pd.DataFrame
         Customer features
+    threshold : float
+        Decision threshold on the churn probability
     
     Returns:
     --------
     dict
         Prediction results with probability
     """
-    # Convert to DataFrame if dict
-    if isinstance(customer_data, dict):
+    # Convert to DataFrame if dict (the compiled scorer reads dicts as they are)
+    if isinstance(customer_data, dict) and isinstance(pipeline, dict):
+        customer_df = customer_data
+    elif isinstance(customer_data, dict):
         customer_df = pd.DataFrame([customer_data])
     else:
         customer_df = customer_data.copy()
     
     # Make prediction
-    prediction = pipeline.predict(customer_df)[0]
-    probability = pipeline.predict_proba(customer_df)[0]
+    labels, probabilities = score(pipeline, customer_df, threshold=threshold)
+    prediction = labels[0]
+    probability = probabilities[0]
     
     result = {
         'prediction': 'Churn' if prediction == 1 else 'No Churn',
@@ -70,39 +119,248 @@ def predict_single(pipeline, customer_data):
     return result
 
 
-def predict_batch(pipeline, data):
+def predict_batch(pipeline, data, threshold=DEFAULT_THRESHOLD, engine='native'):
     """
     Make predictions for multiple customers.
     
     Parameters:
     -----------
-    pipeline : Pipeline
-        Trained model pipeline
+    pipeline : Pipeline or dict
+        Trained model pipeline, or a compiled scorer
     data : pd.DataFrame
         Customer data
+    threshold : float
+        Decision threshold on the churn probability
+    engine : str
+        'native' scores with the sklearn pipeline; 'flat' compiles it into
+        contiguous arrays (trees are evaluated level by level for the whole
+        batch). Pass a compiled scorer to avoid compiling on every call.
     
     Returns:
     --------
     pd.DataFrame
         Original data with predictions and probabilities
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose from {ENGINES}")
+    
+    if engine == 'flat' and not isinstance(pipeline, dict):
+        pipeline = compile_pipeline(pipeline)
+    
     # Make predictions
-    predictions = pipeline.predict(data)
-    probabilities = pipeline.predict_proba(data)
+    predictions, probabilities = score(pipeline, data, threshold=threshold)
     
     # Add predictions to dataframe
     result_df = data.copy()
-    result_df['Churn_Prediction'] = ['Churn' if p == 1 else 'No Churn' for p in predictions]
+    result_df['Churn_Prediction'] = np.where(predictions == 1, 'Churn', 'No Churn')
     result_df['Churn_Probability'] = probabilities[:, 1]
     result_df['No_Churn_Probability'] = probabilities[:, 0]
     
     return result_df
 
 
-def explain_prediction_shap(pipeline, customer_data, background_data=None):
+def _shap_method(model):
+    """Pick the SHAP algorithm for a fitted model: 'linear', 'xgboost', 'tree' or 'generic'."""
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    
+    if isinstance(model, LogisticRegression) or (isinstance(model, SGDClassifier) and model.loss == 'log_loss'):
+        return 'linear'
+    if type(model).__name__ == 'XGBClassifier':
+        return 'xgboost'
+    if isinstance(model, RandomForestClassifier):
+        return 'tree'
+    return 'generic'
+
+
+# Units of the SHAP values (and base value) produced by each method: the linear and
+# XGBoost explanations are additive in log-odds, the others in churn probability
+SHAP_OUTPUT_UNITS = {
+    'linear': 'log-odds',
+    'xgboost': 'log-odds',
+    'tree': 'probability',
+    'generic': 'probability'
+}
+
+
+def shap_churn_probability(explanation, method):
+    """
+    Churn probability recovered from a SHAP explanation (base value plus contributions).
+    
+    Parameters:
+    -----------
+    explanation : shap.Explanation
+        Output of explain_prediction_shap
+    method : str
+        The explainer's method (selects the units, see SHAP_OUTPUT_UNITS)
+    
+    Returns:
+    --------
+    np.ndarray
+        Churn probability per row
+    """
+    total = explanation.base_values + explanation.values.sum(axis=1)
+    if SHAP_OUTPUT_UNITS[method] == 'log-odds':
+        return 1 / (1 + np.exp(-total))
+    return np.clip(total, 0.0, 1.0)
+
+
+def linear_shap_values(model, X, background_mean):
+    """
+    Closed-form (interventional) SHAP values of a linear model in log-odds space.
+    
+    phi_ij = w_j * (x_ij - E[x_j]) over the background, base value = w . E[x] + b.
+    
+    Returns:
+    --------
+    tuple
+        (values of shape (n, n_features), base value)
+    """
+    coef = model.coef_[0]
+    values = (np.asarray(X) - background_mean) * coef
+    base_value = float(background_mean @ coef + model.intercept_[0])
+    return values, base_value
+
+
+# Persisted explainer (built at training time) and the size of its summarized background
+DEFAULT_EXPLAINER_PATH = "models/explainer.joblib"
+DEFAULT_BACKGROUND_ROWS = 200
+
+
+def summarize_background(X, y=None, n_rows=DEFAULT_BACKGROUND_ROWS, random_state=42):
+    """
+    Summarize training data into a small SHAP background set.
+    
+    Parameters:
+    -----------
+    X : pd.DataFrame
+        Model input features (e.g. X_train)
+    y : pd.Series, optional
+        Target; if given, the sample keeps the class proportions
+    n_rows : int
+        Rows in the background set
+    random_state : int
+        Seed for the sample
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Background rows
+    """
+    if len(X) <= n_rows:
+        return X.copy()
+    
+    if y is None:
+        return X.sample(n=n_rows, random_state=random_state)
+    
+    from sklearn.model_selection import train_test_split
+    background, _ = train_test_split(X, train_size=n_rows, stratify=y, random_state=random_state)
+    return background
+
+
+def build_explainer(pipeline, background_data, method='auto'):
+    """
+    Precompute everything a SHAP explanation needs apart from the rows to explain.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline
+        Trained model pipeline
+    background_data : pd.DataFrame
+        Background rows (model input features), e.g. from summarize_background
+    method : str
+        'auto' (by model type) or one of 'linear', 'xgboost', 'tree', 'generic'
+    
+    Returns:
+    --------
+    dict
+        Explainer: method, feature names, transformed background and its mean
+    """
+    from features import get_feature_names_after_preprocessing
+    
+    preprocessor = pipeline.named_steps['preprocessor']
+    X_background = preprocessor.transform(background_data)
+    
+    return {
+        'method': _shap_method(pipeline.named_steps['model']) if method == 'auto' else method,
+        'feature_names': get_feature_names_after_preprocessing(preprocessor, preprocessor.transformers_[1][2]),
+        'X_background': X_background,
+        'background_mean': np.asarray(X_background.mean(axis=0)).ravel()
+    }
+
+
+def save_explainer(explainer, model_path="models/model.joblib", explainer_path=DEFAULT_EXPLAINER_PATH):
+    """
+    Persist an explainer next to the model it was built for.
+    
+    The model file's checksum is stored with it, so a stale explainer is
+    detected after the model is retrained.
+    """
+    from data_prep import file_checksum
+    
+    explainer_path = Path(explainer_path)
+    explainer_path.parent.mkdir(parents=True, exist_ok=True)
+    # The TreeExplainer embeds a copy of the model; it is rebuilt in milliseconds on first use
+    persisted = {key: value for key, value in explainer.items() if key != 'tree_explainer'}
+    joblib.dump({**persisted, 'model_checksum': file_checksum(model_path)}, explainer_path)
+    print(f"✓ Explainer saved to: {explainer_path} ({len(explainer['X_background'])} background rows)")
+
+
+# Explainer loaded by get_explainer, keyed by path and file state
+_loaded_explainers = {}
+
+
+def get_explainer(model_path="models/model.joblib", explainer_path=DEFAULT_EXPLAINER_PATH):
+    """
+    Load the persisted explainer on first use (and again only if the file changes).
+    
+    Parameters:
+    -----------
+    model_path : str or Path
+        Model the explainer must belong to
+    explainer_path : str or Path
+        Persisted explainer
+    
+    Returns:
+    --------
+    dict or None
+        The explainer, or None if it is missing or was built for another model
+    """
+    from data_prep import file_checksum
+    
+    explainer_path = Path(explainer_path)
+    if not explainer_path.exists():
+        return None
+    
+    # Reload (and re-check against the model) only when either file changes
+    cache_key = tuple((str(path), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                      for path in (explainer_path, model_path))
+    if cache_key not in _loaded_explainers:
+        explainer = joblib.load(explainer_path)
+        if explainer['model_checksum'] != file_checksum(model_path):
+            print(f"⚠ {explainer_path} was built for a different model; retrain to refresh it")
+            explainer = None
+        _loaded_explainers.clear()
+        _loaded_explainers[cache_key] = explainer
+    
+    return _loaded_explainers[cache_key]
+
+
+def explain_prediction_shap(pipeline, customer_data, background_data=None, method='auto', explainer=None):
     """
     Generate SHAP explanation for a prediction.
     
+    The algorithm follows the model type:
+    - Logistic Regression / log-loss SGD: closed-form linear SHAP (log-odds)
+    - XGBoost: exact TreeSHAP from the booster itself (log-odds)
+    - Random Forest: exact shap.TreeExplainer (churn probability)
+    - anything else: the model-agnostic shap.Explainer on the churn probability
+    
+    The units differ: for linear and XGBoost models the base value plus the
+    SHAP values add up to the churn log-odds, for the others to the churn
+    probability. SHAP_OUTPUT_UNITS[explainer['method']] gives the units, so
+    values from different model types must not be compared directly.
+    
     Parameters:
     -----------
     pipeline : Pipeline
@@ -110,30 +368,77 @@ def explain_prediction_shap(pipeline, customer_data, background_data=None):
     customer_data : pd.DataFrame
         Customer data to explain (single row or multiple rows)
     background_data : pd.DataFrame, optional
-        Background data for SHAP explainer (if None, uses customer_data)
+        Background data for the linear and generic explainers, e.g.
+        summarize_background(X_train, y_train); without it (and without an
+        explainer) these raise ValueError. Tree models do not need it: their
+        SHAP values use the training cover stored in the trees.
+    method : str
+        'auto' (by model type) or one of 'linear', 'xgboost', 'tree', 'generic'
+    explainer : dict, optional
+        Prebuilt explainer (build_explainer / get_explainer); replaces
+        background_data and method
     
     Returns:
     --------
     shap.Explanation
-        SHAP explanation object
+        SHAP values for the churn class, shape (n_rows, n_features), in
+        log-odds or probability units (see above)
     """
-    # Transform data using preprocessor
-    X_transformed = pipeline.named_steps['preprocessor'].transform(customer_data)
+    import shap
     
-    # Get the model
     model = pipeline.named_steps['model']
     
-    # Create SHAP explainer
-    if background_data is not None:
-        X_background = pipeline.named_steps['preprocessor'].transform(background_data)
-        explainer = shap.Explainer(model.predict_proba, X_background)
+    if explainer is None:
+        method = _shap_method(model) if method == 'auto' else method
+        if background_data is None:
+            if method in ('linear', 'generic'):
+                # Explaining the rows against themselves would measure them against their own mean
+                raise ValueError(
+                    f"Explaining a {type(model).__name__} needs background data: pass background_data "
+                    "(e.g. summarize_background(X_train, y_train)) or the explainer saved at training "
+                    "time (get_explainer())"
+                )
+            # Only used for the feature names: tree SHAP takes its baseline from the trees
+            background_data = customer_data
+        explainer = build_explainer(pipeline, background_data, method=method)
+    
+    # Transform data using preprocessor
+    X_transformed = pipeline.named_steps['preprocessor'].transform(customer_data)
+    method = explainer['method']
+    
+    if method == 'linear':
+        values, base_value = linear_shap_values(model, X_transformed, explainer['background_mean'])
+    elif method == 'xgboost':
+        import xgboost as xgb
+        # pred_contribs is exact TreeSHAP; the last column is the bias (base value)
+        contributions = model.get_booster().predict(xgb.DMatrix(X_transformed), pred_contribs=True)
+        values, base_value = contributions[:, :-1], contributions[:, -1]
+    elif method == 'tree':
+        # Path-dependent TreeSHAP: exact and additive, and far cheaper than the
+        # interventional variant, which walks every tree once per background row
+        # The TreeExplainer is kept on the (in-memory) explainer for later calls
+        tree_explainer = explainer.get('tree_explainer')
+        if tree_explainer is None:
+            tree_explainer = shap.TreeExplainer(model, feature_perturbation='tree_path_dependent')
+            explainer['tree_explainer'] = tree_explainer
+        values = tree_explainer.shap_values(X_transformed)
+        base_value = np.ravel(tree_explainer.expected_value)
+        # Random Forest explains both classes; keep the churn class. shap < 0.45
+        # returns one (n_rows, n_features) array per class, later versions a
+        # single (n_rows, n_features, n_classes) array
+        if isinstance(values, list):
+            values, base_value = values[1], base_value[1]
+        elif np.ndim(values) == 3:
+            values, base_value = values[..., 1], base_value[1]
     else:
-        explainer = shap.Explainer(model.predict_proba, X_transformed)
+        generic_explainer = shap.Explainer(lambda X: model.predict_proba(X)[:, 1], explainer['X_background'])
+        explanation = generic_explainer(X_transformed)
+        values, base_value = explanation.values, explanation.base_values
     
-    # Calculate SHAP values
-    shap_values = explainer(X_transformed)
+    base_values = np.broadcast_to(np.asarray(base_value, dtype=np.float64), (len(X_transformed),)).copy()
     
-    return shap_values
+    return shap.Explanation(values=np.asarray(values, dtype=np.float64), base_values=base_values,
+                            data=X_transformed, feature_names=explainer['feature_names'])
 
 
 def get_feature_importance(pipeline, feature_names=None):
@@ -182,6 +487,19 @@ def get_feature_importance(pipeline, feature_names=None):
     return importance_df
 
 
+# The 19 raw customer fields expected by prepare_customer_input (in this order)
+CUSTOMER_FIELDS = [
+    'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure',
+    'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity',
+    'OnlineBackup', 'DeviceProtection', 'TechSupport', 'StreamingTV',
+    'StreamingMovies', 'Contract', 'PaperlessBilling', 'PaymentMethod',
+    'MonthlyCharges', 'TotalCharges'
+]
+
+# Raw fields that must be numeric
+NUMERIC_CUSTOMER_FIELDS = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+
 def prepare_customer_input(gender, senior_citizen, partner, dependents, tenure,
                           phone_service, multiple_lines, internet_service,
                           online_security, online_backup, device_protection,
@@ -222,17 +540,457 @@ def prepare_customer_input(gender, senior_citizen, partner, dependents, tenure,
         'TotalCharges': total_charges
     }
     
-    # Create DataFrame
-    df = pd.DataFrame([customer_data])
+    # Derive the engineered fields from the scalars (same values as engineer_features)
+    # and build the one-row frame once
+    from features import engineer_customer
+    return _customer_frame(engineer_customer(customer_data))
+
+
+def _customer_frame(engineered):
+    """One-row DataFrame from an engineered customer dict."""
+    df = pd.DataFrame([engineered])
+    
+    # An out-of-range tenure leaves TenureGroup NaN; keep the column categorical for the encoder
+    if 'TenureGroup' in df.columns and df['TenureGroup'].dtype != object:
+        df['TenureGroup'] = df['TenureGroup'].astype(object)
+    
+    return df
+
+
+# Default number of predictions kept by PredictionCache
+DEFAULT_PREDICTION_CACHE_SIZE = 10_000
+
+
+def canonical_customer(customer):
+    """
+    Canonical form of a raw customer: the 19 CUSTOMER_FIELDS in fixed order,
+    numeric fields as floats and everything else as stripped strings.
+    
+    Parameters:
+    -----------
+    customer : dict
+        Raw customer fields (extra keys are ignored)
     
-    # Apply feature engineering (same as training)
+    Returns:
+    --------
+    list
+        Field values in CUSTOMER_FIELDS order
+    """
+    missing = [field for field in CUSTOMER_FIELDS if field not in customer]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    
+    return [float(customer[field]) if field in NUMERIC_CUSTOMER_FIELDS else str(customer[field]).strip()
+            for field in CUSTOMER_FIELDS]
+
+
+class PredictionCache:
+    """
+    In-process LRU cache of single-customer predictions for one model file.
+    
+    Keys are a SHA-256 of the canonical raw customer, the decision threshold
+    and the model file's checksum. The model file is re-checked (size and
+    modification time, then checksum) on every lookup; when it changes, the
+    cache is cleared and the model is reloaded. The checksum and the loaded
+    model are read and replaced together under `model_lock`, so a prediction
+    is always stored under the checksum of the model that produced it.
+    """
+    
+    def __init__(self, model_path="models/model.joblib", max_entries=DEFAULT_PREDICTION_CACHE_SIZE):
+        self.model_path = Path(model_path)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.model_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._file_state = None
+        self._checksum = None
+        self._pipeline = None
+    
+    def _file_stat(self):
+        stat = os.stat(self.model_path)
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _refresh(self):
+        """Re-checksum the model file if its size or mtime changed (call with model_lock held)."""
+        file_state = self._file_stat()
+        if file_state != self._file_state:
+            from data_prep import file_checksum
+            checksum = file_checksum(self.model_path)
+            if self._checksum is not None and checksum != self._checksum:
+                with self.lock:
+                    self.entries.clear()
+                    self.invalidations += 1
+                self._pipeline = None
+            self._file_state, self._checksum = file_state, checksum
+    
+    def model_checksum(self):
+        """Checksum of the model file, recomputed only when its size or mtime changes."""
+        with self.model_lock:
+            self._refresh()
+            return self._checksum
+    
+    def model(self):
+        """
+        The current model file's checksum and loaded model, as a consistent pair.
+        
+        Returns:
+        --------
+        tuple
+            (checksum, pipeline)
+        """
+        with self.model_lock:
+            self._refresh()
+            while self._pipeline is None:
+                pipeline = load_trained_model(self.model_path)
+                # Keep the model only if the file was not replaced while it was loading
+                if self._file_stat() == self._file_state:
+                    self._pipeline = pipeline
+                else:
+                    self._refresh()
+            return self._checksum, self._pipeline
+    
+    def pipeline(self):
+        """The model matching the current model file (reloaded after it changes)."""
+        return self.model()[1]
+    
+    def key(self, customer, threshold=DEFAULT_THRESHOLD, checksum=None):
+        """Stable hash of the canonical customer, threshold and model checksum (the current one by default)."""
+        if checksum is None:
+            checksum = self.model_checksum()
+        payload = json.dumps([canonical_customer(customer), float(threshold), checksum])
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+    
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = dict(result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def predict_customer(customer, pipeline=None, threshold=DEFAULT_THRESHOLD, cache=None, checksum=None):
+    """
+    Predict churn for one raw customer, optionally through a PredictionCache.
+    
+    Parameters:
+    -----------
+    customer : dict
+        The 19 raw CUSTOMER_FIELDS
+    pipeline : Pipeline or dict, optional
+        Model to score with; required without a cache (with a cache, the
+        cache's model file is used so results always match its checksum)
+    threshold : float
+        Decision threshold on the churn probability
+    cache : PredictionCache, optional
+        Reuse predictions for customers already scored with this model
+    checksum : str, optional
+        With a cache, score with a (checksum, pipeline) pair the caller
+        already took from cache.model(), e.g. to explain the prediction with
+        the same model; by default the cache's current pair is used
+    
+    Returns:
+    --------
+    dict
+        Prediction results with probability (as predict_single)
+    """
+    if cache is not None:
+        # Key and model come from the same snapshot, so a result is never cached under another model's checksum
+        if checksum is None or pipeline is None:
+            checksum, pipeline = cache.model()
+        key = cache.key(customer, threshold, checksum=checksum)
+        result = cache.get(key)
+        if result is not None:
+            return result
+    elif pipeline is None:
+        raise ValueError("predict_customer needs a pipeline or a cache")
+    
+    from features import engineer_customer
+    engineered = engineer_customer({field: customer[field] for field in CUSTOMER_FIELDS})
+    
+    # A compiled scorer reads the dict directly; the sklearn pipeline needs a one-row frame
+    customer_data = engineered if isinstance(pipeline, dict) else _customer_frame(engineered)
+    result = predict_single(pipeline, customer_data, threshold=threshold)
+    
+    if cache is not None:
+        cache.put(key, result)
+    
+    return result
+
+
+def _engineer_chunk(df):
+    """Feature-engineer a frame we own and drop the target column if present."""
     from features import engineer_features
-    df_engineered = engineer_features(df)
+    df_engineered = engineer_features(df, inplace=True, verbose=False)
+    
+    if 'Churn' in df_engineered.columns:
+        df_engineered = df_engineered.drop('Churn', axis=1)
     
     return df_engineered
 
 
-def load_and_predict(customer_file_path, model_path="models/model.joblib", output_path=None):
+def _print_prediction_summary(churn_counts, mean_probability, n_rows, elapsed):
+    """Print the summary shared by the in-memory and streaming prediction modes."""
+    print(f"✓ Predictions complete!")
+    print(f"\nChurn Predictions Summary:")
+    print(churn_counts)
+    print(f"\nAverage Churn Probability: {mean_probability:.2%}")
+    print(f"Throughput: {n_rows / max(elapsed, 1e-9):,.0f} rows/second ({n_rows} rows in {elapsed:.2f}s)")
+
+
+# Per-process model used by the parallel scoring workers
+_worker_pipeline = None
+
+
+def _init_scoring_worker(model_path, engine='native'):
+    """Load the model once per worker process and keep its inference single-threaded."""
+    global _worker_pipeline
+    
+    # Flat-engine workers map the saved arrays instead of each holding a private copy
+    if engine == 'flat':
+        _worker_pipeline = load_flat_scorer(model_path)
+        return
+    
+    _worker_pipeline = load_trained_model(model_path)
+    
+    # Parallelism comes from the process pool; avoid N workers x N threads
+    model = _worker_pipeline.named_steps['model']
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+
+
+def _score_chunk_in_worker(chunk):
+    """Engineer features for and score one chunk inside a worker process."""
+    return predict_batch(_worker_pipeline, _engineer_chunk(chunk))
+
+
+def _iter_scored_chunks(pipeline, chunks, n_workers=1, model_path="models/model.joblib", engine='native'):
+    """
+    Yield scored chunks in input order, either in-process or across a process pool.
+    
+    At most 2 * n_workers chunks are in flight so memory stays bounded by the chunk size.
+    """
+    if n_workers <= 1:
+        for chunk in chunks:
+            yield predict_batch(pipeline, _engineer_chunk(chunk))
+        return
+    
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_scoring_worker,
+                             initargs=(str(model_path), engine)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk_in_worker, chunk))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_predictions(pipeline, customer_file_path, output_path, chunksize=100_000,
+                       n_workers=1, model_path="models/model.joblib", engine='native'):
+    """
+    Score a customer CSV chunk by chunk, appending predictions to `output_path`.
+    
+    Memory is bounded by `chunksize` rather than by the size of the file.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline or dict
+        Trained model pipeline or compiled scorer (unused when n_workers > 1)
+    customer_file_path : str or Path
+        Path to customer data CSV
+    output_path : str or Path
+        Path of the predictions CSV to write
+    chunksize : int
+        Number of rows read, engineered and scored at a time
+    n_workers : int
+        Number of worker processes; each loads `model_path` once
+    model_path : str or Path
+        Model loaded by the worker processes when n_workers > 1
+    engine : str
+        Scoring engine of the worker processes ('native' or 'flat')
+    
+    Returns:
+    --------
+    dict
+        Summary with row count, churn counts, mean churn probability and rows/second
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    start = time.perf_counter()
+    n_rows = 0
+    probability_sum = 0.0
+    churn_counts = pd.Series(dtype='int64')
+    
+    chunks = pd.read_csv(customer_file_path, chunksize=chunksize)
+    scored_chunks = _iter_scored_chunks(pipeline, chunks, n_workers=n_workers, model_path=model_path,
+                                        engine=engine)
+    
+    for i, predictions_df in enumerate(scored_chunks):
+        predictions_df.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        
+        n_rows += len(predictions_df)
+        probability_sum += predictions_df['Churn_Probability'].sum()
+        churn_counts = churn_counts.add(predictions_df['Churn_Prediction'].value_counts(), fill_value=0)
+        print(f"  ✓ Chunk {i + 1}: {n_rows} rows scored")
+    
+    elapsed = time.perf_counter() - start
+    churn_counts = churn_counts.astype('int64').sort_values(ascending=False)
+    mean_probability = probability_sum / n_rows if n_rows else 0.0
+    
+    _print_prediction_summary(churn_counts, mean_probability, n_rows, elapsed)
+    print(f"\n✓ Predictions saved to: {output_path}")
+    
+    return {
+        'rows': n_rows,
+        'churn_counts': churn_counts.to_dict(),
+        'mean_churn_probability': mean_probability,
+        'rows_per_second': n_rows / max(elapsed, 1e-9)
+    }
+
+
+def benchmark_workers(customer_file_path, model_path="models/model.joblib",
+                      worker_counts=(1, 2, 4, 8), chunksize=100_000):
+    """
+    Benchmark parallel streaming prediction against the number of worker processes.
+    
+    Parameters:
+    -----------
+    customer_file_path : str or Path
+        Path to customer data CSV
+    model_path : str or Path
+        Path to trained model
+    worker_counts : iterable of int
+        Worker counts to time
+    chunksize : int
+        Rows per chunk
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Rows/second and speedup relative to the first worker count
+    """
+    import tempfile
+    
+    pipeline = load_trained_model(model_path)
+    timings = []
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_workers in worker_counts:
+            print(f"\n⏱ Benchmarking {n_workers} worker(s)...")
+            summary = stream_predictions(pipeline, customer_file_path, Path(tmp_dir) / "predictions.csv",
+                                         chunksize=chunksize, n_workers=n_workers, model_path=model_path)
+            timings.append({'Workers': n_workers, 'Rows/s': summary['rows_per_second']})
+    
+    benchmark_df = pd.DataFrame(timings)
+    benchmark_df['Speedup'] = benchmark_df['Rows/s'] / benchmark_df['Rows/s'].iloc[0]
+    
+    print("\n" + "="*50)
+    print("⏱ PARALLEL SCORING BENCHMARK")
+    print("="*50)
+    print(benchmark_df.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+    print("="*50)
+    
+    return benchmark_df
+
+
+def benchmark_engines(customer_file_path, model_path="models/model.joblib", n_rows=1_000_000):
+    """
+    Benchmark the flattened-array engine against the native sklearn/XGBoost predict.
+    
+    The customer file is feature-engineered once and tiled to `n_rows`; both
+    engines then score the same frame. The model-only rows time the tree
+    evaluation on the already-transformed matrix.
+    
+    Parameters:
+    -----------
+    customer_file_path : str or Path
+        Path to customer data CSV
+    model_path : str or Path
+        Path to trained model
+    n_rows : int
+        Number of rows scored by each engine
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Seconds and rows/second per engine and stage
+    """
+    pipeline = load_trained_model(model_path)
+    scorer = compile_pipeline(pipeline)
+    
+    df = _engineer_chunk(pd.read_csv(customer_file_path))
+    df = df.iloc[np.resize(np.arange(len(df)), n_rows)].reset_index(drop=True)
+    
+    native_probabilities = pipeline.predict_proba(df.head(1000))[:, 1]
+    max_error = np.abs(compiled_predict_proba(scorer, df.head(1000))[:, 1] - native_probabilities).max()
+    
+    stages = {
+        ('native', 'end-to-end'): lambda: pipeline.predict_proba(df),
+        ('flat', 'end-to-end'): lambda: compiled_predict_proba(scorer, df)
+    }
+    if scorer['kind'] == 'trees':
+        X_transformed = pipeline.named_steps['preprocessor'].transform(df)
+        X_encoded = encode(scorer['preprocessor'], df)
+        stages[('native', 'model only')] = lambda: pipeline.named_steps['model'].predict_proba(X_transformed)
+        stages[('flat', 'model only')] = lambda: evaluate_trees(scorer['trees'], X_encoded)
+    
+    timings = []
+    for (engine, stage), run in stages.items():
+        print(f"\n⏱ Scoring {n_rows:,} rows with the {engine} engine ({stage})...")
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        timings.append({'Engine': engine, 'Stage': stage, 'Seconds': elapsed, 'Rows/s': n_rows / elapsed})
+    
+    benchmark_df = pd.DataFrame(timings).sort_values(['Stage', 'Engine'], ignore_index=True)
+    
+    print("\n" + "="*50)
+    print(f"⏱ SCORING ENGINE BENCHMARK ({type(pipeline.named_steps['model']).__name__})")
+    print("="*50)
+    print(benchmark_df.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+    print(f"Max probability difference: {max_error:.1e}")
+    print("="*50)
+    
+    return benchmark_df
+
+
+def load_and_predict(customer_file_path, model_path="models/model.joblib", output_path=None,
+                     chunksize=None, n_workers=1, engine='native'):
     """
     Load customer data from file and make predictions.
     
@@ -244,28 +1002,56 @@ def load_and_predict(customer_file_path, model_path="models/model.joblib", outpu
         Path to trained model
     output_path : str or Path, optional
         Path to save predictions
+    chunksize : int, optional
+        If given, stream the file in chunks of this many rows and append the
+        predictions to `output_path` instead of holding everything in memory
+    n_workers : int
+        Number of worker processes scoring chunks in parallel (implies
+        streaming; chunksize defaults to 100,000 rows)
+    engine : str
+        'native' (sklearn pipeline) or 'flat' (compiled arrays, see predict_batch)
     
     Returns:
     --------
-    pd.DataFrame
-        Predictions dataframe
+    pd.DataFrame or dict
+        Predictions dataframe, or the streaming summary when `chunksize` is set
     """
     print("\n" + "="*50)
     print("🔮 MAKING PREDICTIONS")
     print("="*50)
     
+    if n_workers > 1 and not chunksize:
+        chunksize = 100_000
+    
+    if chunksize and not output_path:
+        raise ValueError("Streaming mode (chunksize) requires an output_path to write predictions to.")
+    
     # Load model
     print(f"\n📂 Loading model from: {model_path}")
-    pipeline = load_trained_model(model_path)
+    if engine == 'flat':
+        pipeline = load_flat_scorer(model_path)
+    else:
+        pipeline = load_trained_model(model_path)
+    
+    if chunksize:
+        print(f"📂 Streaming customer data from: {customer_file_path} ({chunksize} rows per chunk)")
+        if n_workers > 1:
+            print(f"⚙ Scoring with {n_workers} worker processes")
+        print("\n🔮 Generating predictions...")
+        summary = stream_predictions(pipeline, customer_file_path, output_path, chunksize=chunksize,
+                                     n_workers=n_workers, model_path=model_path, engine=engine)
+        print("\n" + "="*50)
+        return summary
     
     # Load customer data
     print(f"📂 Loading customer data from: {customer_file_path}")
+    start = time.perf_counter()
     df = pd.read_csv(customer_file_path)
     print(f"✓ Loaded {len(df)} customers")
     
-    # Apply feature engineering
+    # Apply feature engineering (the frame is ours, so skip the copy)
     from features import engineer_features
-    df_engineered = engineer_features(df)
+    df_engineered = engineer_features(df, inplace=True)
     
     # Remove target column if present
     if 'Churn' in df_engineered.columns:
@@ -277,10 +1063,9 @@ def load_and_predict(customer_file_path, model_path="models/model.joblib", outpu
     print("\n🔮 Generating predictions...")
     predictions_df = predict_batch(pipeline, df_features)
     
-    print(f"✓ Predictions complete!")
-    print(f"\nChurn Predictions Summary:")
-    print(predictions_df['Churn_Prediction'].value_counts())
-    print(f"\nAverage Churn Probability: {predictions_df['Churn_Probability'].mean():.2%}")
+    _print_prediction_summary(predictions_df['Churn_Prediction'].value_counts(),
+                              predictions_df['Churn_Probability'].mean(),
+                              len(predictions_df), time.perf_counter() - start)
     
     # Save predictions
     if output_path:
@@ -295,8 +1080,42 @@ def load_and_predict(customer_file_path, model_path="models/model.joblib", outpu
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Churn prediction")
+    parser.add_argument("--input", help="Customer CSV to score (omit to run the single-customer example)")
+    parser.add_argument("--output", help="Where to write the predictions CSV")
+    parser.add_argument("--model", default="models/model.joblib", help="Path to the trained model")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input in chunks of this many rows")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes for parallel scoring")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Benchmark parallel scoring speedup against the number of workers")
+    parser.add_argument("--engine", choices=ENGINES, default='native',
+                        help="Scoring engine: the sklearn pipeline or flattened NumPy arrays")
+    parser.add_argument("--benchmark-engines", type=int, metavar="N_ROWS", nargs='?', const=1_000_000,
+                        help="Benchmark the flat engine against native predict on N_ROWS rows (default 1M)")
+    args = parser.parse_args()
+    
     # Example: Load model and make predictions
-    model_path = "models/model.joblib"
+    model_path = args.model
+    
+    if args.input and args.benchmark:
+        max_workers = max(args.workers, 1)
+        worker_counts = sorted({1, max_workers} | {2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers})
+        benchmark_workers(args.input, model_path=model_path, worker_counts=worker_counts,
+                          chunksize=args.chunksize or 100_000)
+        raise SystemExit(0)
+    
+    if args.input and args.benchmark_engines:
+        benchmark_engines(args.input, model_path=model_path, n_rows=args.benchmark_engines)
+        raise SystemExit(0)
+    
+    if args.input:
+        load_and_predict(args.input, model_path=model_path, output_path=args.output,
+                         chunksize=args.chunksize, n_workers=args.workers, engine=args.engine)
+        raise SystemExit(0)
     
     # Example single prediction
     sample_customer = {
@@ -336,7 +1155,7 @@ if __name__ == "__main__":
         print(f"Prediction: {result['prediction']}")
         print(f"Churn Probability: {result['churn_probability']:.2%}")
         print("="*50)
-        
+    
     except FileNotFoundError:
         print("⚠ Model not found. Please train the model first:")
         print("   python src/train.py")
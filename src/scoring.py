@@ -0,0 +1,45 @@
+"""
+Scoring Module
+==============
+The single-pass scorer shared by training, evaluation and inference: class
+probabilities from one predict_proba call and labels from a threshold on
+the churn probability.
+"""
+
+from compiled import compiled_predict_proba
+
+
+# Probability above which a customer is labelled as churning
+DEFAULT_THRESHOLD = 0.5
+
+
+def score(pipeline, data, threshold=DEFAULT_THRESHOLD):
+    """
+    Score data with a single inference pass.
+    
+    The pipeline's preprocessor and model run once (via predict_proba) and the
+    labels are derived from the churn probability, instead of calling
+    predict and predict_proba separately.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline or dict
+        Trained model pipeline, or a compiled scorer (see compiled.py)
+    data : pd.DataFrame or dict
+        Customer features (a dict of one customer only with a compiled scorer)
+    threshold : float
+        Churn probability above which the label is 1 (0.5 reproduces
+        the estimators' own predict)
+    
+    Returns:
+    --------
+    tuple
+        (labels, probabilities) where probabilities has shape (n, 2)
+    """
+    if isinstance(pipeline, dict):
+        probabilities = compiled_predict_proba(pipeline, data)
+    else:
+        probabilities = pipeline.predict_proba(data)
+    labels = (probabilities[:, 1] > threshold).astype(int)
+    
+    return labels, probabilities
@@ -0,0 +1,538 @@
+"""
+Prediction Server Module
+========================
+HTTP JSON endpoint for churn scoring. An asyncio front end parses and
+validates requests on the event loop; concurrent single-customer requests are
+coalesced into micro-batches and scored on a bounded thread or process pool.
+When the queue is full, requests are rejected with 429 instead of waiting;
+bodies over the size limit and batches larger than the whole queue get 413.
+
+Endpoints:
+    POST /predict        one customer (JSON object with the 19 raw fields)
+    POST /predict/batch  several customers (JSON list, or {"customers": [...]})
+    GET  /health         liveness and model information
+    GET  /metrics        request, latency and batching statistics
+"""
+
+import pandas as pd
+import numpy as np
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from http import HTTPStatus
+
+import predict
+from predict import CUSTOMER_FIELDS, NUMERIC_CUSTOMER_FIELDS
+from scoring import score, DEFAULT_THRESHOLD
+
+
+# Micro-batching defaults: flush when this many requests are queued or the oldest has waited this long
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Admission control: customers waiting to be scored before new requests get 429,
+# and concurrent inference calls (pool size)
+DEFAULT_MAX_QUEUE = 256
+DEFAULT_WORKERS = 2
+
+# Largest request body read from a client (a customer is about 600 bytes of JSON)
+DEFAULT_MAX_BODY_BYTES = 1024**2
+
+# Number of recent request latencies kept for the percentiles in /metrics
+LATENCY_WINDOW = 10_000
+
+
+def validate_customer(customer):
+    """
+    Check that a request body describes one customer.
+    
+    Parameters:
+    -----------
+    customer : dict
+        Parsed JSON object
+    
+    Returns:
+    --------
+    dict
+        The customer restricted to CUSTOMER_FIELDS, numeric fields as floats
+    """
+    if not isinstance(customer, dict):
+        raise ValueError("Each customer must be a JSON object")
+    
+    missing = [field for field in CUSTOMER_FIELDS if field not in customer]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    
+    record = {field: customer[field] for field in CUSTOMER_FIELDS}
+    for field in NUMERIC_CUSTOMER_FIELDS:
+        try:
+            record[field] = float(record[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"Field '{field}' must be numeric, got {record[field]!r}")
+    
+    return record
+
+
+def score_customers(pipeline, customers, threshold=DEFAULT_THRESHOLD):
+    """
+    Engineer features for and score a list of validated customers in one pass.
+    
+    Parameters:
+    -----------
+    pipeline : Pipeline or dict
+        Trained model pipeline or compiled scorer
+    customers : list of dict
+        Customers from validate_customer
+    threshold : float
+        Decision threshold on the churn probability
+    
+    Returns:
+    --------
+    list of dict
+        One prediction per customer, in input order
+    """
+    from features import engineer_features
+    
+    df = engineer_features(pd.DataFrame(customers, columns=CUSTOMER_FIELDS), inplace=True, verbose=False)
+    labels, probabilities = score(pipeline, df, threshold=threshold)
+    
+    return [
+        {
+            'prediction': 'Churn' if label == 1 else 'No Churn',
+            'prediction_label': int(label),
+            'churn_probability': float(probability[1]),
+            'no_churn_probability': float(probability[0])
+        }
+        for label, probability in zip(labels, probabilities)
+    ]
+
+
+def _score_in_worker(customers, threshold):
+    """Score a batch with the model loaded by predict._init_scoring_worker in this process."""
+    return score_customers(predict._worker_pipeline, customers, threshold=threshold)
+
+
+def _worker_model_name():
+    """Class name of the model loaded by predict._init_scoring_worker in this process."""
+    pipeline = predict._worker_pipeline
+    if isinstance(pipeline, dict):
+        return pipeline.get('model_name', f"compiled {pipeline['kind']} scorer")
+    return type(pipeline.named_steps['model']).__name__
+
+
+class QueueFullError(Exception):
+    """Raised when a request cannot be admitted because the scoring queue is full."""
+
+
+class PayloadTooLargeError(Exception):
+    """Raised when a request could never be served: its body or batch exceeds the server's limits."""
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-customer requests into batches on the event loop.
+    
+    The batching task takes the first queued request, then keeps collecting
+    until `max_batch_size` requests are queued or `max_wait_ms` has passed, and
+    hands the batch to the pool. At most `n_workers` batches are scored at
+    once; while the pool is busy requests accumulate in a queue of at most
+    `max_queue` customers, beyond which submit() raises QueueFullError. A
+    batch of more than `max_queue` customers could never be admitted, so
+    score_batch() raises PayloadTooLargeError for it instead.
+    """
+    
+    def __init__(self, executor, n_workers, threshold=DEFAULT_THRESHOLD,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        self.executor = executor
+        self.threshold = threshold
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.pending = asyncio.Queue()
+        self.slots = asyncio.Semaphore(n_workers)
+        self.direct_customers = 0
+        self.held_customers = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        # Dispatch tasks in flight: the event loop only keeps weak references to tasks
+        self._tasks = set()
+        self.task = asyncio.create_task(self._run())
+    
+    def _admit(self, n_customers):
+        if self.queued() + n_customers > self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Scoring queue is full ({self.max_queue} customers); retry later")
+    
+    def queued(self):
+        """Customers admitted but not yet handed to the pool."""
+        return self.pending.qsize() + self.held_customers + self.direct_customers
+    
+    def submit(self, customer):
+        """Queue one validated customer; returns a Future resolving to its prediction."""
+        self._admit(1)
+        future = asyncio.get_running_loop().create_future()
+        self.pending.put_nowait((customer, future))
+        return future
+    
+    async def score_batch(self, customers):
+        """Score a client-supplied batch directly on the pool, under the same admission limit."""
+        if len(customers) > self.max_queue:
+            raise PayloadTooLargeError(f"Batch of {len(customers)} customers exceeds the queue limit of "
+                                       f"{self.max_queue}; split it into smaller requests")
+        self._admit(len(customers))
+        self.direct_customers += len(customers)
+        try:
+            async with self.slots:
+                return await self._score(customers)
+        finally:
+            self.direct_customers -= len(customers)
+    
+    async def _score(self, customers):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _score_in_worker, customers, self.threshold)
+    
+    async def _collect_batch(self, first):
+        """Starting from the first request, gather more until the batch is full or the wait expires."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(await asyncio.wait_for(self.pending.get(), remaining))
+                else:
+                    batch.append(self.pending.get_nowait())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+        
+        return batch
+    
+    async def _dispatch(self, batch):
+        try:
+            predictions = await self._score([customer for customer, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+        
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+    
+    async def _run(self):
+        while True:
+            # Take a worker only once a request is waiting, so an idle batcher never holds a slot
+            # that score_batch() needs; the held request still counts against max_queue
+            first = await self.pending.get()
+            self.held_customers = 1
+            await self.slots.acquire()
+            self.held_customers = 0
+            batch = await self._collect_batch(first)
+            
+            self.batches += 1
+            self.batched_requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def close(self):
+        """Stop batching and wait for the batches already handed to the pool."""
+        self.task.cancel()
+        await asyncio.gather(self.task, *self._tasks, return_exceptions=True)
+    
+    def stats(self):
+        """Batching and backpressure statistics for /metrics."""
+        return {
+            'batches': self.batches,
+            'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'queued': self.queued(),
+            'rejected': self.rejected,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'max_queue': self.max_queue
+        }
+
+
+def _new_metrics():
+    """Counters and latency window, updated from the event loop."""
+    return {
+        'started': time.time(),
+        'requests': 0,
+        'customers_scored': 0,
+        'errors': 0,
+        'latencies_ms': deque(maxlen=LATENCY_WINDOW)
+    }
+
+
+def _record_request(metrics, latency_ms, n_customers=0, error=False):
+    metrics['requests'] += 1
+    metrics['customers_scored'] += n_customers
+    metrics['errors'] += int(error)
+    metrics['latencies_ms'].append(latency_ms)
+
+
+def metrics_snapshot(metrics, batcher):
+    """
+    Summarize the server metrics.
+    
+    Returns:
+    --------
+    dict
+        Request counts, latency percentiles (ms) over the last LATENCY_WINDOW
+        requests, throughput since start and micro-batching statistics
+    """
+    latencies = np.array(metrics['latencies_ms'])
+    snapshot = {key: metrics[key] for key in ('requests', 'customers_scored', 'errors')}
+    
+    uptime = time.time() - metrics['started']
+    snapshot['uptime_seconds'] = uptime
+    snapshot['requests_per_second'] = snapshot['requests'] / uptime if uptime else 0.0
+    for percentile in (50, 90, 99):
+        snapshot[f'latency_p{percentile}_ms'] = float(np.percentile(latencies, percentile)) if len(latencies) else None
+    snapshot['batching'] = batcher.stats()
+    
+    return snapshot
+
+
+async def _read_request(reader, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """
+    Read one HTTP/1.1 request; returns (method, path, headers, body) or None at end of stream.
+    
+    Raises PayloadTooLargeError, before reading the body, when Content-Length
+    exceeds `max_body_bytes`.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    
+    method, path, version = request_line.decode('latin-1').split()
+    headers = {'http-version': version}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    
+    content_length = int(headers.get('content-length', 0))
+    if content_length < 0:
+        raise ValueError(f"Invalid Content-Length {content_length}")
+    if content_length > max_body_bytes:
+        raise PayloadTooLargeError(f"Request body of {content_length} bytes exceeds the limit of {max_body_bytes}")
+    
+    body = await reader.readexactly(content_length)
+    return method, path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+    ]
+    if status == 429:
+        head.append("Retry-After: 1")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+
+
+class PredictionService:
+    """Request routing for the asyncio server; holds the batcher, metrics and model information."""
+    
+    def __init__(self, batcher, model_info, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        self.batcher = batcher
+        self.model_info = model_info
+        self.max_body_bytes = max_body_bytes
+        self.metrics = _new_metrics()
+    
+    async def handle(self, method, path, body):
+        """Route one request; returns (status, payload, n_customers)."""
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'model': self.model_info}, 0
+        if method == 'GET' and path == '/metrics':
+            return 200, metrics_snapshot(self.metrics, self.batcher), 0
+        if method != 'POST' or path not in ('/predict', '/predict/batch'):
+            return 404, {'error': f"Unknown endpoint {method} {path}"}, 0
+        
+        # Parsing and validation run on the event loop; only inference goes to the pool
+        try:
+            payload = json.loads(body or b'null')
+            if path == '/predict':
+                return 200, await self.batcher.submit(validate_customer(payload)), 1
+            
+            customers = payload.get('customers') if isinstance(payload, dict) else payload
+            if not isinstance(customers, list) or not customers:
+                raise ValueError("Expected a non-empty JSON list of customers")
+            predictions = await self.batcher.score_batch([validate_customer(c) for c in customers])
+            return 200, {'predictions': predictions}, len(customers)
+        except QueueFullError as e:
+            return 429, {'error': str(e)}, 0
+        except PayloadTooLargeError as e:
+            return 413, {'error': str(e)}, 0
+        except (ValueError, json.JSONDecodeError) as e:
+            return 400, {'error': str(e)}, 0
+        except Exception as e:
+            return 500, {'error': f"Scoring failed: {str(e)}"}, 0
+    
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one (keep-alive) connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader, self.max_body_bytes)
+                except (ValueError, asyncio.IncompleteReadError):
+                    _write_response(writer, 400, {'error': "Malformed HTTP request"}, keep_alive=False)
+                    break
+                except PayloadTooLargeError as e:
+                    # The unread body is still on the connection, so it cannot be reused
+                    _write_response(writer, 413, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                
+                method, path, headers, body = request
+                start = time.perf_counter()
+                status, payload, n_customers = await self.handle(method, path, body)
+                
+                keep_alive = headers.get('connection', '').lower() != 'close' and headers['http-version'] == 'HTTP/1.1'
+                _write_response(writer, status, payload, keep_alive=keep_alive)
+                await writer.drain()
+                _record_request(self.metrics, (time.perf_counter() - start) * 1000,
+                                n_customers=n_customers, error=status != 200)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def create_executor(model_path, engine='native', pool='thread', n_workers=DEFAULT_WORKERS):
+    """
+    Build the bounded inference pool, with the model loaded once per process.
+    
+    Parameters:
+    -----------
+    model_path : str or Path
+        Path to the trained model
+    engine : str
+        'native' (sklearn pipeline) or 'flat' (compiled arrays)
+    pool : str
+        'thread' (shares one model; NumPy/XGBoost release the GIL for most of
+        the work) or 'process' (one model copy per worker process)
+    n_workers : int
+        Pool size
+    
+    Returns:
+    --------
+    concurrent.futures.Executor
+        The pool
+    """
+    if pool == 'process':
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=predict._init_scoring_worker,
+                                   initargs=(str(model_path), engine))
+    
+    predict._init_scoring_worker(str(model_path), engine)
+    return ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="scoring")
+
+
+async def serve(model_path="models/model.joblib", host="127.0.0.1", port=8000,
+                max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                max_queue=DEFAULT_MAX_QUEUE, n_workers=DEFAULT_WORKERS, pool='thread',
+                engine='native', threshold=DEFAULT_THRESHOLD, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+    """
+    Load the model and run the prediction server until cancelled.
+    
+    Parameters:
+    -----------
+    model_path : str or Path
+        Path to the trained model
+    host, port : str, int
+        Address to listen on
+    max_batch_size : int
+        Most single-customer requests scored together
+    max_wait_ms : float
+        Longest a request waits for others to join its batch
+    max_queue : int
+        Customers allowed to wait for scoring before requests get 429
+    n_workers : int
+        Size of the inference pool (concurrent batches)
+    pool : str
+        'thread' or 'process'
+    engine : str
+        'native' (sklearn pipeline) or 'flat' (compiled arrays)
+    threshold : float
+        Decision threshold on the churn probability
+    max_body_bytes : int
+        Largest request body accepted; larger requests get 413
+    """
+    executor = create_executor(model_path, engine=engine, pool=pool, n_workers=n_workers)
+    # Ask a worker for the model it loaded instead of loading it again here
+    model_name = await asyncio.get_running_loop().run_in_executor(executor, _worker_model_name)
+    
+    batcher = MicroBatcher(executor, n_workers, threshold=threshold, max_batch_size=max_batch_size,
+                           max_wait_ms=max_wait_ms, max_queue=max_queue)
+    service = PredictionService(batcher, {
+        'path': str(model_path), 'model': model_name, 'engine': engine,
+        'pool': pool, 'workers': n_workers, 'threshold': threshold
+    }, max_body_bytes=max_body_bytes)
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    
+    print("\n" + "="*50)
+    print("🌐 PREDICTION SERVER")
+    print("="*50)
+    print(f"Model: {model_name} ({model_path}, {engine} engine)")
+    print(f"Inference pool: {n_workers} {pool} worker(s), queue limit {max_queue} customers")
+    print(f"Micro-batching: up to {max_batch_size} requests or {max_wait_ms} ms")
+    print(f"Listening on http://{host}:{port}")
+    print("="*50)
+    
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Churn prediction HTTP server")
+    parser.add_argument("--model", default="models/model.joblib", help="Path to the trained model")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Most single-customer requests scored in one batch")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest a request waits for a batch to fill")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Customers waiting for scoring before new requests get 429")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Inference pool size")
+    parser.add_argument("--pool", choices=('thread', 'process'), default='thread',
+                        help="Run inference in threads or worker processes")
+    parser.add_argument("--engine", choices=('native', 'flat'), default='native',
+                        help="Scoring engine: the sklearn pipeline or flattened NumPy arrays")
+    parser.add_argument("--max-body-bytes", type=int, default=DEFAULT_MAX_BODY_BYTES,
+                        help="Largest request body accepted (larger requests get 413)")
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(serve(args.model, host=args.host, port=args.port, max_batch_size=args.max_batch_size,
+                          max_wait_ms=args.max_wait_ms, max_queue=args.max_queue, n_workers=args.workers,
+                          pool=args.pool, engine=args.engine, max_body_bytes=args.max_body_bytes))
+    except KeyboardInterrupt:
+        print("\n✓ Server stopped")
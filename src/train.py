@@ -6,7 +6,10 @@ Functions for training multiple ML models and saving the best one.
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, StratifiedKFold, ParameterSampler
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from scipy.stats import loguniform, randint, uniform
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from xgboost import XGBClassifier
@@ -14,20 +17,45 @@ from sklearn.pipeline import Pipeline
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 import joblib
+from joblib import Parallel, delayed
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
 # Import custom modules
-from data_prep import load_and_prepare_data
+import data_prep
+import features
+from data_prep import (load_and_prepare_data, columnar_format_available,
+                       PROCESSED_PARQUET_PATH, PROCESSED_CSV_PATH)
 from features import engineer_features, prepare_features_for_modeling, get_preprocessor
-from eval import evaluate_model, compare_models
+from eval import evaluate_model, compare_models, compute_metrics
+from scoring import score
+from cache import cached_stage, stage_key, module_version, DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_MB
+from compiled import export_compiled_scorer
 
 
-def create_models():
+# XGBoost trees: an upper bound when early stopping picks the number (see fit_model),
+# and the fixed number used when there is no validation split to stop on
+XGB_MAX_TREES = 500
+XGB_TREES_WITHOUT_EARLY_STOPPING = 100
+
+
+def create_models(early_stopping=True):
     """
     Create instances of all models to train.
     
+    Parameters:
+    -----------
+    early_stopping : bool
+        Whether the models will be fit with fit_model (XGBoost gets
+        XGB_MAX_TREES and early stopping trims it) or as plain pipelines
+        (XGBoost gets a fixed XGB_TREES_WITHOUT_EARLY_STOPPING trees)
+    
     Returns:
     --------
     dict
@@ -47,11 +75,12 @@ def create_models():
             n_jobs=-1
         ),
         'XGBoost': XGBClassifier(
-            n_estimators=100,
+            n_estimators=XGB_MAX_TREES if early_stopping else XGB_TREES_WITHOUT_EARLY_STOPPING,
             random_state=42,
             max_depth=6,
             learning_rate=0.1,
             scale_pos_weight=3,  # Handle class imbalance
+            tree_method='hist',
             n_jobs=-1,
             eval_metric='logloss'
         )
@@ -60,6 +89,74 @@ def create_models():
     return models
 
 
+def _resample(X, y, use_smote):
+    """Oversample the minority class with SMOTE if requested."""
+    if not use_smote:
+        return X, y
+    return SMOTE(random_state=42).fit_resample(X, y)
+
+
+def fit_model(model, X_train, y_train, validation_size=0.1, early_stopping_rounds=20, use_smote=False):
+    """
+    Fit a model on a transformed training matrix.
+    
+    XGBoost models pick their number of trees with early stopping on an
+    internal stratified validation split, then are refit on the whole
+    training matrix with `n_estimators` set to the best iteration + 1, so the
+    saved model has seen every training row, only evaluates the useful trees
+    and its parameters describe it (clone() reproduces it). Other models are
+    fit as-is.
+    
+    Parameters:
+    -----------
+    model : estimator
+        Unfitted model
+    X_train : np.ndarray
+        Transformed training matrix
+    y_train : array-like
+        Training targets
+    validation_size : float
+        Fraction of the training data held out for early stopping
+    early_stopping_rounds : int
+        Rounds without validation improvement before stopping
+    use_smote : bool
+        Oversample the training rows with SMOTE; the early-stopping
+        validation rows are split off first, so they stay real customers
+    
+    Returns:
+    --------
+    dict or None
+        Early-stopping summary (best iteration, trees kept, validation
+        logloss curve) for XGBoost, None for other models
+    """
+    if not isinstance(model, XGBClassifier):
+        model.fit(*_resample(X_train, y_train, use_smote))
+        return None
+    
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=validation_size, random_state=42, stratify=y_train
+    )
+    
+    model.set_params(early_stopping_rounds=early_stopping_rounds)
+    model.fit(*_resample(X_fit, y_fit, use_smote), eval_set=[(X_val, y_val)], verbose=False)
+    
+    best_iteration = model.best_iteration
+    curve = model.evals_result()['validation_0']['logloss']
+    
+    # Refit on every training row with only the useful trees (no validation split to hold out now)
+    model.set_params(n_estimators=best_iteration + 1, early_stopping_rounds=None)
+    model.fit(*_resample(X_train, y_train, use_smote), verbose=False)
+    
+    print(f"  ✓ Early stopping: best iteration {best_iteration} "
+          f"({best_iteration + 1} of {len(curve)} trees kept, refit on all training rows)")
+    
+    return {
+        'best_iteration': best_iteration,
+        'n_trees': best_iteration + 1,
+        'validation_logloss': curve
+    }
+
+
 def create_pipeline(preprocessor, model, use_smote=False):
     """
     Create a complete pipeline with preprocessing and model.
@@ -95,7 +192,155 @@ def create_pipeline(preprocessor, model, use_smote=False):
     return pipeline
 
 
-def train_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor, use_smote=False):
+def prepare_shared_matrices(X_train, X_test, y_train, preprocessor):
+    """
+    Fit the preprocessor once and materialize the transformed train/test matrices.
+    
+    SMOTE, if used, is applied per model by fit_model, after the XGBoost
+    early-stopping rows are split off.
+    
+    Parameters:
+    -----------
+    X_train, X_test : pd.DataFrame
+        Training and test features
+    y_train : pd.Series
+        Training targets
+    preprocessor : ColumnTransformer
+        Unfitted preprocessing pipeline (fitted in place)
+    
+    Returns:
+    --------
+    tuple
+        (X_train_transformed, X_test_transformed)
+    """
+    print("\n⚙ Fitting preprocessor once for all models...")
+    X_train_transformed = preprocessor.fit_transform(X_train, y_train)
+    X_test_transformed = preprocessor.transform(X_test)
+    
+    print(f"  - Transformed training matrix: {X_train_transformed.shape}")
+    
+    return X_train_transformed, X_test_transformed
+
+
+def allocate_cores(models, n_cores=None):
+    """
+    Split a core budget between models trained concurrently.
+    
+    Single-threaded models (no `n_jobs`, or Logistic Regression whose lbfgs
+    solver ignores it for binary problems) get one core; the remaining cores
+    are divided evenly between the multi-threaded models. With fewer cores
+    than models every model gets one thread, and train_models_in_parallel
+    runs at most `n_cores` of them at a time (see concurrent_model_slots).
+    
+    Parameters:
+    -----------
+    models : dict
+        Dictionary of model name and model instance
+    n_cores : int, optional
+        Total cores available (defaults to os.cpu_count())
+    
+    Returns:
+    --------
+    dict
+        Dictionary of model name and number of threads
+    """
+    n_cores = n_cores or os.cpu_count() or 1
+    
+    threaded = [name for name, model in models.items()
+                if 'n_jobs' in model.get_params() and not isinstance(model, LogisticRegression)]
+    n_single = len(models) - len(threaded)
+    
+    per_model = max(1, (n_cores - n_single) // len(threaded)) if threaded else 1
+    
+    return {name: (per_model if name in threaded else 1) for name in models}
+
+
+def concurrent_model_slots(models, n_cores=None):
+    """Number of models trained at once so that their threads never exceed the core budget."""
+    n_cores = n_cores or os.cpu_count() or 1
+    return max(1, min(len(models), n_cores))
+
+
+def _fit_and_score(model, X_train, y_train, X_test, use_smote=False):
+    """Fit a model on a (shared) matrix and score the test matrix; runs in a worker thread."""
+    start = time.perf_counter()
+    early_stopping = fit_model(model, X_train, y_train, use_smote=use_smote)
+    y_pred, probabilities = score(model, X_test)
+    
+    return y_pred, probabilities[:, 1], time.perf_counter() - start, early_stopping
+
+
+def train_models_in_parallel(models, X_train, y_train, X_test, y_test, n_cores=None, use_smote=False):
+    """
+    Train candidate models concurrently on shared matrices within a core budget.
+    
+    Models run in threads (fitting releases the GIL), so the matrices are
+    shared rather than copied. If there are fewer cores than models, the
+    extra models queue until a core frees up. Metrics are collected as each
+    model finishes.
+    
+    Parameters:
+    -----------
+    models : dict
+        Dictionary of model name and unfitted model instance
+    X_train, X_test : np.ndarray
+        Transformed training and test matrices
+    y_train, y_test : pd.Series
+        Training and test targets
+    n_cores : int, optional
+        Total cores available (defaults to os.cpu_count())
+    use_smote : bool
+        Oversample each model's training rows with SMOTE (see fit_model)
+    
+    Returns:
+    --------
+    tuple
+        (metrics per model name, wall time per model name, early-stopping
+        summary per model name)
+    """
+    allocation = allocate_cores(models, n_cores)
+    original_n_jobs = {}
+    
+    for model_name, model in models.items():
+        if 'n_jobs' in model.get_params():
+            original_n_jobs[model_name] = model.get_params()['n_jobs']
+            model.set_params(n_jobs=allocation[model_name])
+        print(f"  - {model_name}: {allocation[model_name]} thread(s)")
+    
+    metrics, timings, early_stopping = {}, {}, {}
+    start = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=concurrent_model_slots(models, n_cores)) as executor:
+        futures = {
+            executor.submit(_fit_and_score, model, X_train, y_train, X_test, use_smote=use_smote): model_name
+            for model_name, model in models.items()
+        }
+        
+        for future in as_completed(futures):
+            model_name = futures[future]
+            y_pred, y_pred_proba, elapsed, early_stopping[model_name] = future.result()
+            timings[model_name] = elapsed
+            
+            print(f"\n✓ {model_name} finished in {elapsed:.2f}s")
+            metrics[model_name] = compute_metrics(y_test, y_pred, y_pred_proba, model_name=model_name)
+    
+    total = time.perf_counter() - start
+    
+    # Restore the original thread settings for inference with the saved pipelines
+    for model_name, n_jobs in original_n_jobs.items():
+        models[model_name].set_params(n_jobs=n_jobs)
+    
+    # Per-model times overlap and share cores, so their sum is not a sequential baseline
+    print("\n⏱ Training wall time per model (run concurrently):")
+    for model_name in models:
+        print(f"  - {model_name}: {timings[model_name]:.2f}s")
+    print(f"  Total: {total:.2f}s")
+    
+    return metrics, timings, early_stopping
+
+
+def train_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor, use_smote=False,
+                              shared_preprocessing=True, parallel=False, n_cores=None, compare_sequential=False):
     """
     Train all models and evaluate their performance.
     
@@ -109,6 +354,19 @@ def train_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor, us
         Preprocessing pipeline
     use_smote : bool
         Whether to use SMOTE
+    shared_preprocessing : bool
+        Fit the preprocessor once and train every model on the same
+        transformed matrices (the exported pipelines share the fitted
+        preprocessor). If False, each model's pipeline refits it and
+        XGBoost is trained without early stopping.
+    parallel : bool
+        Train the models concurrently within a shared core budget
+        (requires shared_preprocessing)
+    n_cores : int, optional
+        Core budget for parallel training (defaults to os.cpu_count())
+    compare_sequential : bool
+        After parallel training, also run the sequential loop on the same
+        data and print the measured speedup (doubles the training time)
     
     Returns:
     --------
@@ -119,35 +377,410 @@ def train_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor, us
     print("🤖 MODEL TRAINING & EVALUATION")
     print("="*50)
     
-    models = create_models()
+    if parallel and not shared_preprocessing:
+        raise ValueError("Parallel training requires shared_preprocessing=True.")
+    
+    start = time.perf_counter()
+    
+    # Without shared preprocessing the pipelines are fit directly, with no early-stopping split
+    models = create_models(early_stopping=shared_preprocessing)
     results = {}
     
-    for model_name, model in models.items():
-        print(f"\n📊 Training {model_name}...")
+    if shared_preprocessing:
+        X_train_transformed, X_test_transformed = prepare_shared_matrices(X_train, X_test, y_train, preprocessor)
+    
+    if parallel:
+        print(f"\n📊 Training {len(models)} models in parallel...")
+        metrics_by_model, _, early_stopping = train_models_in_parallel(
+            models, X_train_transformed, y_train, X_test_transformed, y_test, n_cores=n_cores, use_smote=use_smote
+        )
+        
+        for model_name, model in models.items():
+            results[model_name] = {
+                'pipeline': create_pipeline(preprocessor, model, use_smote=use_smote),
+                'metrics': metrics_by_model[model_name],
+                'early_stopping': early_stopping[model_name]
+            }
+        
+        if compare_sequential:
+            parallel_time = time.perf_counter() - start
+            print("\n⏱ Training the same models sequentially for comparison...")
+            sequential_start = time.perf_counter()
+            train_and_evaluate_models(X_train, X_test, y_train, y_test, clone(preprocessor), use_smote=use_smote)
+            sequential_time = time.perf_counter() - sequential_start
+            print(f"\n⏱ Parallel: {parallel_time:.2f}s, sequential: {sequential_time:.2f}s "
+                  f"(speedup {sequential_time / max(parallel_time, 1e-9):.2f}x)")
+    else:
+        for model_name, model in models.items():
+            print(f"\n📊 Training {model_name}...")
+            
+            early_stopping = None
+            
+            if shared_preprocessing:
+                # Train on the shared matrix, then wrap the fitted steps into a full pipeline
+                early_stopping = fit_model(model, X_train_transformed, y_train, use_smote=use_smote)
+                pipeline = create_pipeline(preprocessor, model, use_smote=use_smote)
+                
+                # Evaluate model on the cached test matrix
+                metrics = evaluate_model(model, X_test_transformed, y_test, model_name=model_name)
+            else:
+                # Create pipeline
+                pipeline = create_pipeline(preprocessor, model, use_smote=use_smote)
+                
+                # Train model
+                pipeline.fit(X_train, y_train)
+                
+                # Evaluate model
+                metrics = evaluate_model(pipeline, X_test, y_test, model_name=model_name)
+            
+            # Store results
+            results[model_name] = {
+                'pipeline': pipeline,
+                'metrics': metrics,
+                'early_stopping': early_stopping
+            }
+    
+    print("\n" + "="*50)
+    print("✅ All models trained and evaluated!")
+    print("="*50)
+    
+    return results
+
+
+def create_search_spaces():
+    """
+    Hyperparameter distributions sampled by the successive-halving search.
+    
+    Returns:
+    --------
+    dict
+        Dictionary of model name and parameter distributions
+    """
+    return {
+        'Logistic Regression': {
+            'C': loguniform(1e-3, 1e2)
+        },
+        'Random Forest': {
+            'n_estimators': randint(50, 400),
+            'max_depth': [4, 6, 8, 10, 14, 20, None],
+            'min_samples_leaf': randint(1, 20),
+            'max_features': ['sqrt', 'log2', 0.5]
+        },
+        'XGBoost': {
+            'n_estimators': randint(50, 500),
+            'max_depth': randint(2, 10),
+            'learning_rate': loguniform(0.01, 0.3),
+            'subsample': uniform(0.6, 0.4),
+            'colsample_bytree': uniform(0.5, 0.5),
+            'min_child_weight': randint(1, 10),
+            'scale_pos_weight': uniform(1, 4)
+        }
+    }
+
+
+def _cv_fold_score(estimator, X, y, train_idx, val_idx):
+    """Fit on one CV fold and return its F1-score."""
+    estimator.fit(X[train_idx], y[train_idx])
+    return f1_score(y[val_idx], estimator.predict(X[val_idx]))
+
+
+def successive_halving_search(estimator, param_distributions, X, y, n_candidates=27, factor=3,
+                              min_samples=500, cv=3, deadline=None, random_state=42):
+    """
+    Successive-halving random search for one model.
+    
+    Many sampled configurations are scored on a small stratified subsample;
+    only the best 1/factor survive to the next round, which uses factor
+    times more data, until the survivors are scored on the full matrix.
+    (candidate, fold) fits run in parallel across all cores.
+    
+    Parameters:
+    -----------
+    estimator : estimator
+        Unfitted model
+    param_distributions : dict
+        Parameter distributions (see create_search_spaces)
+    X : np.ndarray
+        Transformed training matrix
+    y : array-like
+        Training targets
+    n_candidates : int
+        Configurations sampled in the first round
+    factor : int
+        Elimination factor between rounds
+    min_samples : int
+        Samples used in the first round
+    cv : int
+        Stratified folds per evaluation
+    deadline : float, optional
+        time.perf_counter() value after which no further candidate is
+        evaluated; the best candidate of the interrupted round is returned
+    random_state : int
+        Seed for sampling configurations and subsamples
+    
+    Returns:
+    --------
+    tuple
+        (best_params, history DataFrame with one row per candidate and round)
+    """
+    y = np.asarray(y)
+    n_samples = len(y)
+    candidates = [
+        {name: value.item() if hasattr(value, 'item') else value for name, value in params.items()}
+        for params in ParameterSampler(param_distributions, n_candidates, random_state=random_state)
+    ]
+    
+    # Enough rounds to whittle the candidates down to one, but never start below min_samples
+    # (integer arithmetic: math.log(27, 3) is 3.0000000000000004, which would add a round)
+    rounds_for_candidates, remaining = 1, n_candidates
+    while remaining > 1:
+        remaining = max(1, remaining // factor)
+        rounds_for_candidates += 1
+    rounds_for_data = 1
+    while min_samples * factor ** rounds_for_data <= n_samples:
+        rounds_for_data += 1
+    n_rounds = min(rounds_for_candidates, rounds_for_data)
+    
+    # Single-threaded estimators: parallelism comes from the (candidate, fold) fan-out
+    if 'n_jobs' in estimator.get_params():
+        estimator = clone(estimator).set_params(n_jobs=1)
+    
+    history = []
+    rng = np.random.RandomState(random_state)
+    
+    for round_idx in range(n_rounds):
+        if deadline is not None and round_idx > 0 and time.perf_counter() > deadline:
+            print(f"    ⏱ Budget reached, stopping after round {round_idx}")
+            break
+        
+        # Resources grow by `factor` each round and reach the full matrix in the last round
+        n_round = n_samples // factor ** (n_rounds - 1 - round_idx)
+        if n_round < n_samples:
+            idx, _ = train_test_split(np.arange(n_samples), train_size=n_round, stratify=y,
+                                      random_state=rng.randint(1 << 30))
+        else:
+            idx = np.arange(n_samples)
+        X_round, y_round = X[idx], y[idx]
+        
+        folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X_round, y_round))
+        scores = Parallel(n_jobs=-1, return_as='generator')(
+            delayed(_cv_fold_score)(clone(estimator).set_params(**params), X_round, y_round, train_idx, val_idx)
+            for params in candidates for train_idx, val_idx in folds
+        )
+        
+        # Results arrive in candidate order; check the budget after every candidate
+        fold_scores, mean_scores = [], []
+        out_of_time = False
+        for fold_score in scores:
+            fold_scores.append(fold_score)
+            if len(fold_scores) < cv:
+                continue
+            mean_scores.append(np.mean(fold_scores))
+            fold_scores = []
+            if (deadline is not None and time.perf_counter() > deadline
+                    and len(mean_scores) < len(candidates)):
+                out_of_time = True
+                scores.close()  # Cancel the remaining fits
+                break
+        
+        mean_scores = np.asarray(mean_scores)
+        candidates = candidates[:len(mean_scores)]
         
-        # Create pipeline
-        pipeline = create_pipeline(preprocessor, model, use_smote=use_smote)
+        for params, mean_score in zip(candidates, mean_scores):
+            history.append({'round': round_idx, 'n_samples': n_round, 'params': params, 'cv_f1': mean_score})
+        print(f"    Round {round_idx + 1}: {len(candidates)} candidates on {n_round} samples, "
+              f"best CV F1 {mean_scores.max():.4f}")
         
-        # Train model
-        pipeline.fit(X_train, y_train)
+        # Promote the best 1/factor candidates (only the best one if the budget ran out)
+        n_keep = 1 if out_of_time else max(1, len(candidates) // factor)
+        order = np.argsort(-mean_scores, kind='stable')[:n_keep]
+        candidates = [candidates[i] for i in order]
+        
+        if out_of_time:
+            print(f"    ⏱ Budget reached during round {round_idx + 1}")
+            break
+    
+    return candidates[0], pd.DataFrame(history)
+
+
+def search_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor, n_candidates=27,
+                               time_budget=None, leaderboard_path="reports/search_leaderboard.csv"):
+    """
+    Tune every model with successive halving, then refit and evaluate the winners.
+    
+    Parameters:
+    -----------
+    X_train, X_test : pd.DataFrame
+        Training and test features
+    y_train, y_test : pd.Series
+        Training and test targets
+    preprocessor : ColumnTransformer
+        Preprocessing pipeline (fitted once and shared)
+    n_candidates : int
+        Configurations sampled per model in the first round
+    time_budget : float, optional
+        Wall-clock budget in seconds for the whole search; unused time of
+        one model carries over to the next
+    leaderboard_path : str or Path, optional
+        Where to write the leaderboard of all evaluated configurations
+    
+    Returns:
+    --------
+    dict
+        Dictionary of trained pipelines and their results
+    """
+    print("\n" + "="*50)
+    print("🔎 SUCCESSIVE-HALVING HYPERPARAMETER SEARCH")
+    print("="*50)
+    
+    X_train_transformed, X_test_transformed = prepare_shared_matrices(X_train, X_test, y_train, preprocessor)
+    
+    models = create_models()
+    search_spaces = create_search_spaces()
+    results = {}
+    leaderboards = []
+    start = time.perf_counter()
+    
+    for i, (model_name, model) in enumerate(models.items()):
+        print(f"\n📊 Searching {model_name}...")
+        deadline = start + time_budget * (i + 1) / len(models) if time_budget else None
+        
+        best_params, history = successive_halving_search(
+            model, search_spaces[model_name], X_train_transformed, y_train,
+            n_candidates=n_candidates, deadline=deadline
+        )
+        history.insert(0, 'model', model_name)
+        leaderboards.append(history)
+        print(f"  ✓ Best parameters: {best_params}")
         
-        # Evaluate model
-        metrics = evaluate_model(pipeline, X_test, y_test, model_name=model_name)
+        # Refit the winning configuration on the full training matrix
+        model.set_params(**best_params)
+        early_stopping = fit_model(model, X_train_transformed, y_train)
         
-        # Store results
         results[model_name] = {
-            'pipeline': pipeline,
-            'metrics': metrics
+            'pipeline': create_pipeline(preprocessor, model),
+            'metrics': evaluate_model(model, X_test_transformed, y_test, model_name=model_name),
+            'best_params': best_params,
+            'early_stopping': early_stopping
         }
     
+    # Leaderboard: each configuration's score from the last round it reached
+    leaderboard = pd.concat(leaderboards, ignore_index=True)
+    leaderboard = (leaderboard.sort_values('round')
+                   .groupby(['model', leaderboard['params'].astype(str)], sort=False).tail(1)
+                   .sort_values(['round', 'cv_f1'], ascending=False)
+                   .reset_index(drop=True))
+    
+    print(f"\n⏱ Search finished in {time.perf_counter() - start:.1f}s")
+    print("\n🏅 Top configurations:")
+    print(leaderboard.head(10).to_string(index=False))
+    
+    if leaderboard_path:
+        leaderboard_path = Path(leaderboard_path)
+        leaderboard_path.parent.mkdir(parents=True, exist_ok=True)
+        leaderboard.to_csv(leaderboard_path, index=False)
+        print(f"✓ Leaderboard saved to: {leaderboard_path}")
+    
+    return results
+
+
+def _cv_fold_metrics(estimator, X, y, train_idx, val_idx):
+    """Fit a candidate's model steps on one fold of its fold-encoded (memory-mapped) matrix and return its metrics."""
+    estimator.fit(X[train_idx], y[train_idx])
+    y_pred, probabilities = score(estimator, X[val_idx])
+    
+    return compute_metrics(y[val_idx], y_pred, probabilities[:, 1], verbose=False)
+
+
+def cross_validate_models(X_train, y_train, pipelines, n_splits=5, n_jobs=-1, random_state=42):
+    """
+    Stratified k-fold cross-validation of the candidate pipelines, folds in parallel.
+    
+    Every candidate is cross-validated in the configuration it was trained
+    with (tuned parameters, SMOTE step, number of XGBoost trees), and the
+    preprocessor is refit on the training rows of each fold. Each fold's
+    encoded matrix is written once to a memory-mapped file, so the worker
+    processes share its pages instead of each receiving a pickled copy.
+    
+    Parameters:
+    -----------
+    X_train : pd.DataFrame
+        Training features
+    y_train : pd.Series
+        Training targets
+    pipelines : dict
+        Model name -> candidate pipeline ('preprocessor' first, see
+        create_pipeline); clones are fitted, the pipelines are not modified
+    n_splits : int
+        Number of folds
+    n_jobs : int
+        Parallel workers (-1 for all cores)
+    random_state : int
+        Seed for the fold assignment
+    
+    Returns:
+    --------
+    dict
+        Dictionary of model name and {'<metric>_mean', '<metric>_std'} values
+    """
     print("\n" + "="*50)
-    print("✅ All models trained and evaluated!")
+    print(f"🔁 {n_splits}-FOLD CROSS-VALIDATION")
     print("="*50)
     
-    return results
+    y = np.asarray(y_train)
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X_train, y))
+    
+    # Split every candidate into its preprocessor and the steps fitted on the encoded matrix
+    candidates = {}
+    for model_name, pipeline in pipelines.items():
+        candidate = clone(pipeline)
+        model_steps = candidate[1:]
+        if 'n_jobs' in model_steps[-1].get_params():
+            model_steps[-1].set_params(n_jobs=1)
+        candidates[model_name] = (candidate.named_steps['preprocessor'], model_steps)
+    
+    memmap_dir = tempfile.mkdtemp(prefix='churn_cv_')
+    try:
+        # Encode once per fold (and distinct preprocessor configuration), fitting on the fold's training rows
+        encoded, tasks = {}, []
+        for model_name, (preprocessor, _) in candidates.items():
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                key = (joblib.hash(preprocessor), fold)
+                if key not in encoded:
+                    fold_preprocessor = clone(preprocessor).fit(X_train.iloc[train_idx], y[train_idx])
+                    memmap_path = Path(memmap_dir) / f'X_train_{len(encoded)}.mmap'
+                    joblib.dump(fold_preprocessor.transform(X_train), memmap_path)
+                    encoded[key] = joblib.load(memmap_path, mmap_mode='r')
+                tasks.append((model_name, encoded[key], train_idx, val_idx))
+        
+        fold_metrics = Parallel(n_jobs=n_jobs)(
+            delayed(_cv_fold_metrics)(clone(candidates[model_name][1]), X_shared, y, train_idx, val_idx)
+            for model_name, X_shared, train_idx, val_idx in tasks
+        )
+    finally:
+        shutil.rmtree(memmap_dir, ignore_errors=True)
+    
+    cv_results = {}
+    for model_name in candidates:
+        per_fold = pd.DataFrame([metrics for (name, _, _, _), metrics in zip(tasks, fold_metrics)
+                                 if name == model_name])
+        cv_results[model_name] = {
+            **{f"{metric}_mean": per_fold[metric].mean() for metric in per_fold.columns},
+            **{f"{metric}_std": per_fold[metric].std() for metric in per_fold.columns}
+        }
+    
+    summary = pd.DataFrame({
+        model_name: {metric: f"{cv[f'{metric}_mean']:.4f} ± {cv[f'{metric}_std']:.4f}"
+                     for metric in ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc']}
+        for model_name, cv in cv_results.items()
+    }).T
+    print(summary.to_string())
+    print("="*50)
+    
+    return cv_results
 
 
-def select_best_model(results):
+def select_best_model(results, use_cv=False):
     """
     Select the best model based on F1-score.
     
@@ -155,6 +788,9 @@ def select_best_model(results):
     -----------
     results : dict
         Dictionary of model results
+    use_cv : bool
+        Rank on the cross-validated mean F1 ('cv_metrics', see
+        cross_validate_models) instead of the single test split
     
     Returns:
     --------
@@ -165,7 +801,10 @@ def select_best_model(results):
     best_model_name = None
     
     for model_name, result in results.items():
-        f1_score = result['metrics']['f1_score']
+        if use_cv:
+            f1_score = result['cv_metrics']['f1_score_mean']
+        else:
+            f1_score = result['metrics']['f1_score']
         if f1_score > best_f1:
             best_f1 = f1_score
             best_model_name = model_name
@@ -174,7 +813,7 @@ def select_best_model(results):
     best_metrics = results[best_model_name]['metrics']
     
     print(f"\n🏆 Best Model: {best_model_name}")
-    print(f"   F1-Score: {best_f1:.4f}")
+    print(f"   F1-Score: {best_f1:.4f}{' (CV mean)' if use_cv else ''}")
     
     return best_model_name, best_pipeline, best_metrics
 
@@ -230,7 +869,59 @@ def load_model(model_path):
         raise FileNotFoundError(f"Model not found at {model_path}")
 
 
-def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_models=True):
+def load_engineered_data(raw_data_path, use_cache=True, rebuild=False,
+                         cache_dir=DEFAULT_CACHE_DIR, cache_max_mb=DEFAULT_CACHE_MAX_MB):
+    """
+    Run the data-preparation and feature-engineering stages, reusing cached outputs.
+    
+    Each stage is keyed by the content of its input plus the source of the
+    module implementing it, so a stage is only recomputed when the raw file,
+    the upstream stage or its code changes.
+    
+    Parameters:
+    -----------
+    raw_data_path : str or Path
+        Path to raw data
+    use_cache : bool
+        Whether to use the stage cache at all
+    rebuild : bool
+        Force both stages to be recomputed (and the cache refreshed)
+    cache_dir : str or Path
+        Directory holding cache entries
+    cache_max_mb : float
+        Size budget of the cache (least recently used entries are evicted)
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Cleaned dataset with engineered features
+    """
+    processed_path = PROCESSED_PARQUET_PATH if columnar_format_available() else PROCESSED_CSV_PATH
+    
+    def prepare(rebuild_processed):
+        return load_and_prepare_data(raw_data_path, save_processed=True, processed_path=processed_path,
+                                     rebuild=rebuild_processed)
+    
+    if not use_cache:
+        return engineer_features(prepare(rebuild), inplace=True)
+    
+    cache_options = {'cache_dir': cache_dir, 'max_mb': cache_max_mb, 'force': rebuild}
+    prep_key = stage_key('data_prep', Path(raw_data_path), module_version(data_prep))
+    features_key = stage_key('features', prep_key, module_version(features))
+    
+    def build_features():
+        # A data_prep cache miss means the raw file or cleaning code changed (or a rebuild
+        # was forced), so the processed file must not be reused either
+        df = cached_stage('data_prep', prep_key, lambda: prepare(True), **cache_options)
+        return engineer_features(df, inplace=True)
+    
+    return cached_stage('features', features_key, build_features, **cache_options)
+
+
+def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_models=True,
+                        use_cache=True, rebuild_cache=False, cache_max_mb=DEFAULT_CACHE_MAX_MB,
+                        parallel=False, n_cores=None, search=False, search_candidates=27,
+                        search_budget=None, cv_folds=None, compare_sequential=False):
     """
     Complete training pipeline from raw data to trained model.
     
@@ -244,6 +935,29 @@ def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_mode
         Whether to use SMOTE
     save_models : bool
         Whether to save trained models
+    use_cache : bool
+        Whether to reuse cached data-prep/feature-engineering outputs
+    rebuild_cache : bool
+        Force the cached stages to be recomputed
+    cache_max_mb : float
+        Size budget of the stage cache
+    parallel : bool
+        Train the candidate models concurrently
+    n_cores : int, optional
+        Core budget for parallel training
+    compare_sequential : bool
+        With parallel training, also time the sequential loop and print the speedup
+    search : bool
+        Tune the models with successive-halving search instead of using
+        the fixed configurations from create_models()
+    search_candidates : int
+        Configurations sampled per model by the search
+    search_budget : float, optional
+        Wall-clock budget of the search in seconds
+    cv_folds : int, optional
+        If given, cross-validate every trained candidate with this many
+        stratified folds (in parallel) and select the best model on the CV
+        mean F1
     
     Returns:
     --------
@@ -254,12 +968,9 @@ def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_mode
     print("🚀 COMPLETE TRAINING PIPELINE")
     print("="*70)
     
-    # Step 1: Load and prepare data
-    df = load_and_prepare_data(raw_data_path, save_processed=True, 
-                               processed_path="data/processed/telco_churn_clean.csv")
-    
-    # Step 2: Engineer features
-    df_engineered = engineer_features(df)
+    # Steps 1-2: Load, prepare and engineer features (skipped when cached)
+    df_engineered = load_engineered_data(raw_data_path, use_cache=use_cache, rebuild=rebuild_cache,
+                                         cache_max_mb=cache_max_mb)
     
     # Step 3: Prepare features for modeling
     X, y, feature_names, num_features, cat_features = prepare_features_for_modeling(df_engineered)
@@ -276,20 +987,44 @@ def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_mode
     print(f"  - Test set: {X_test.shape[0]} samples")
     
     # Step 6: Train and evaluate models
-    results = train_and_evaluate_models(X_train, X_test, y_train, y_test, 
-                                       preprocessor, use_smote=use_smote)
+    if search:
+        if use_smote:
+            raise ValueError("The hyperparameter search does not support SMOTE.")
+        results = search_and_evaluate_models(X_train, X_test, y_train, y_test, preprocessor,
+                                             n_candidates=search_candidates, time_budget=search_budget)
+    else:
+        results = train_and_evaluate_models(X_train, X_test, y_train, y_test, 
+                                           preprocessor, use_smote=use_smote,
+                                           parallel=parallel, n_cores=n_cores,
+                                           compare_sequential=compare_sequential)
     
     # Step 7: Compare models
     compare_models(results)
     
+    if cv_folds:
+        pipelines = {model_name: result['pipeline'] for model_name, result in results.items()}
+        cv_results = cross_validate_models(X_train, y_train, pipelines, n_splits=cv_folds)
+        for model_name, cv_metrics in cv_results.items():
+            results[model_name]['cv_metrics'] = cv_metrics
+    
     # Step 8: Select best model
-    best_model_name, best_pipeline, best_metrics = select_best_model(results)
+    best_model_name, best_pipeline, best_metrics = select_best_model(results, use_cv=bool(cv_folds))
     
     # Step 9: Save models
     if save_models:
         print("\n💾 Saving models...")
         save_model(best_pipeline, "models/model.joblib", "models/preproc.joblib")
         
+        # NumPy-only scorer for low-latency inference, checked against the pipeline
+        # (saved as memory-mappable arrays shared by all scoring workers)
+        export_compiled_scorer(best_pipeline, "models/model_compiled", validation_data=X_test,
+                               model_path="models/model.joblib")
+        
+        # SHAP explainer with a summarized, class-stratified training background
+        from predict import build_explainer, save_explainer, summarize_background, DEFAULT_EXPLAINER_PATH
+        explainer = build_explainer(best_pipeline, summarize_background(X_train, y_train))
+        save_explainer(explainer, "models/model.joblib", DEFAULT_EXPLAINER_PATH)
+        
         # Save all results for comparison
         joblib.dump(results, "models/all_results.joblib")
         print("✓ All results saved")
@@ -311,14 +1046,49 @@ def train_full_pipeline(raw_data_path, test_size=0.2, use_smote=False, save_mode
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train churn prediction models")
+    parser.add_argument("--data", default="data/raw/telco_churn.csv", help="Path to the raw dataset")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute the cached data-prep and feature-engineering stages")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the stage cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help="Size budget of the stage cache in MB")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Train the candidate models concurrently")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="Core budget for parallel training (default: all cores)")
+    parser.add_argument("--compare-sequential", action="store_true",
+                        help="With --parallel, also time sequential training and print the speedup")
+    parser.add_argument("--search", action="store_true",
+                        help="Tune the models with successive-halving hyperparameter search")
+    parser.add_argument("--search-candidates", type=int, default=27,
+                        help="Configurations sampled per model in the first search round")
+    parser.add_argument("--search-budget", type=float, default=None,
+                        help="Wall-clock budget of the search in seconds")
+    parser.add_argument("--cv-folds", type=int, default=None,
+                        help="Cross-validate the models with this many folds and select on the CV mean")
+    args = parser.parse_args()
+    
     # Train the complete pipeline
-    raw_data_path = "data/raw/telco_churn.csv"
+    raw_data_path = args.data
     
     output = train_full_pipeline(
         raw_data_path=raw_data_path,
         test_size=0.2,
         use_smote=False,  # We're using class_weight='balanced' instead
-        save_models=True
+        save_models=True,
+        use_cache=not args.no_cache,
+        rebuild_cache=args.rebuild,
+        cache_max_mb=args.cache_max_mb,
+        parallel=args.parallel,
+        n_cores=args.cores,
+        compare_sequential=args.compare_sequential,
+        search=args.search,
+        search_candidates=args.search_candidates,
+        search_budget=args.search_budget,
+        cv_folds=args.cv_folds
     )
     
     print("\n🎉 Training complete! You can now run the Streamlit app.")
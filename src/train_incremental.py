@@ -0,0 +1,252 @@
+"""
+Incremental Training Module
+===========================
+Out-of-core training for datasets larger than memory: the processed data is
+streamed in chunks, the preprocessor is fitted in a first pass and a linear
+model is trained with partial_fit in the following passes.
+"""
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.compose import ColumnTransformer
+from sklearn.frozen import FrozenEstimator
+from sklearn.pipeline import Pipeline
+import time
+
+from data_prep import iter_processed_chunks
+from features import engineer_features
+from eval import compute_metrics
+from scoring import score
+
+
+# Default working-set budget for one chunk of data (raw, engineered and transformed)
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+# Every n-th row is held out for evaluation
+HOLDOUT_EVERY = 5
+
+# Constant SGD step size (the averaged iterate smooths out its noise)
+SGD_STEP_SIZE = 0.01
+
+
+def _prepare_chunk(chunk, target_col='Churn'):
+    """Engineer features for a chunk and split off the encoded target."""
+    df = engineer_features(chunk, inplace=True, verbose=False)
+    y = df[target_col].map({'Yes': 1, 'No': 0}).astype('int64').to_numpy()
+    X = df.drop(target_col, axis=1)
+    return X, y
+
+
+def _holdout_mask(offset, n_rows):
+    """Deterministic holdout rows, based on each row's position in the file."""
+    return (np.arange(offset, offset + n_rows) % HOLDOUT_EVERY) == 0
+
+
+def estimate_chunk_rows(processed_path, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, sample_rows=1000):
+    """
+    Choose a chunk size so that one chunk's working set stays under the memory limit.
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Processed dataset
+    memory_limit_mb : float
+        Memory budget for the data of one chunk
+    sample_rows : int
+        Rows read to measure the per-row footprint
+    
+    Returns:
+    --------
+    int
+        Rows per chunk
+    """
+    sample = next(iter_processed_chunks(processed_path, chunksize=sample_rows))
+    X, _ = _prepare_chunk(sample)
+    bytes_per_row = X.memory_usage(deep=True).sum() / max(len(X), 1)
+    
+    # The raw chunk, its engineered features and the dense transformed matrix
+    # coexist while a chunk is processed; budget four times the engineered size
+    chunk_rows = int(memory_limit_mb * 1024**2 / (4 * bytes_per_row))
+    
+    return max(chunk_rows, 100)
+
+
+def fit_incremental_preprocessor(processed_path, chunksize):
+    """
+    First pass: fit the scaler and collect the category vocabulary chunk by chunk.
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Processed dataset
+    chunksize : int
+        Rows per chunk
+    
+    Returns:
+    --------
+    tuple
+        (fitted ColumnTransformer, class counts of the training rows)
+    """
+    scaler = StandardScaler()
+    vocabulary = None
+    class_counts = np.zeros(2, dtype=np.int64)
+    first_chunk = None
+    offset = 0
+    
+    for chunk in iter_processed_chunks(processed_path, chunksize=chunksize):
+        X, y = _prepare_chunk(chunk)
+        
+        if vocabulary is None:
+            numerical_features = X.select_dtypes(include='number').columns.tolist()
+            categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
+            vocabulary = {col: set() for col in categorical_features}
+            first_chunk = X
+        
+        train_mask = ~_holdout_mask(offset, len(X))
+        offset += len(X)
+        
+        scaler.partial_fit(X.loc[train_mask, numerical_features])
+        class_counts += np.bincount(y[train_mask], minlength=2)
+        for col in categorical_features:
+            vocabulary[col].update(X[col].dropna().unique())
+    
+    if vocabulary is None:
+        raise ValueError(f"No data found in {processed_path}")
+    
+    # Fixed, sorted vocabularies reproduce what OneHotEncoder would learn in memory
+    categorical_transformer = OneHotEncoder(
+        categories=[sorted(vocabulary[col]) for col in categorical_features],
+        drop='first', sparse_output=False, handle_unknown='ignore'
+    )
+    
+    # The scaler already holds the statistics of every training row; freezing it keeps
+    # ColumnTransformer.fit (which only sets up the column layout here) from refitting it
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', FrozenEstimator(scaler), numerical_features),
+            ('cat', categorical_transformer, categorical_features)
+        ],
+        remainder='drop'
+    )
+    preprocessor.fit(first_chunk)
+    
+    print(f"✓ Preprocessor fitted on {offset} rows")
+    print(f"  - Numerical features: {len(numerical_features)}")
+    print(f"  - Categorical features: {len(categorical_features)}")
+    
+    return preprocessor, class_counts
+
+
+def train_incremental(processed_path, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, epochs=3,
+                      model_path=None, random_state=42):
+    """
+    Train a churn model on a dataset that does not fit in memory.
+    
+    The data is streamed in chunks sized from `memory_limit_mb`. The first
+    pass fits the scaler and one-hot vocabulary; each epoch then trains an
+    averaged logistic-loss SGDClassifier with partial_fit; a final pass scores the
+    held-out rows (every HOLDOUT_EVERY-th row).
+    
+    Parameters:
+    -----------
+    processed_path : str or Path
+        Processed (cleaned) dataset, Parquet or CSV
+    memory_limit_mb : float
+        Memory budget for the data of one chunk
+    epochs : int
+        Passes over the training rows
+    model_path : str or Path, optional
+        Where to save the resulting pipeline
+    random_state : int
+        Seed for the model and the within-chunk shuffling
+    
+    Returns:
+    --------
+    dict
+        Dictionary containing the pipeline, holdout metrics and chunk size
+    """
+    print("\n" + "="*70)
+    print("🚀 INCREMENTAL (OUT-OF-CORE) TRAINING")
+    print("="*70)
+    
+    start = time.perf_counter()
+    chunksize = estimate_chunk_rows(processed_path, memory_limit_mb)
+    print(f"\n📦 Memory limit {memory_limit_mb} MB -> {chunksize} rows per chunk")
+    
+    # Pass 1: preprocessor
+    preprocessor, class_counts = fit_incremental_preprocessor(processed_path, chunksize)
+    
+    # Balanced class weights (partial_fit does not support class_weight='balanced')
+    class_weight = {label: class_counts.sum() / (2 * count) for label, count in enumerate(class_counts) if count}
+    # Averaged SGD with a constant step converges to the in-memory logistic regression
+    # within a few passes; the default 'optimal' schedule is still far from it after three
+    model = SGDClassifier(loss='log_loss', class_weight=class_weight, learning_rate='constant',
+                          eta0=SGD_STEP_SIZE, average=True, random_state=random_state)
+    rng = np.random.RandomState(random_state)
+    
+    # Passes 2..epochs+1: model
+    for epoch in range(epochs):
+        offset = 0
+        for chunk in iter_processed_chunks(processed_path, chunksize=chunksize):
+            X, y = _prepare_chunk(chunk)
+            train_mask = ~_holdout_mask(offset, len(X))
+            offset += len(X)
+            
+            X_transformed = preprocessor.transform(X.loc[train_mask])
+            y_train = y[train_mask]
+            order = rng.permutation(len(y_train))
+            model.partial_fit(X_transformed[order], y_train[order], classes=[0, 1])
+        
+        print(f"  ✓ Epoch {epoch + 1}/{epochs} complete")
+    
+    pipeline = Pipeline([
+        ('preprocessor', preprocessor),
+        ('model', model)
+    ])
+    
+    # Final pass: evaluate on the held-out rows
+    y_true, y_pred, y_proba = [], [], []
+    offset = 0
+    for chunk in iter_processed_chunks(processed_path, chunksize=chunksize):
+        X, y = _prepare_chunk(chunk)
+        holdout_mask = _holdout_mask(offset, len(X))
+        offset += len(X)
+        
+        labels, probabilities = score(pipeline, X.loc[holdout_mask])
+        y_true.append(y[holdout_mask])
+        y_pred.append(labels)
+        y_proba.append(probabilities[:, 1])
+    
+    metrics = compute_metrics(np.concatenate(y_true), np.concatenate(y_pred), np.concatenate(y_proba),
+                              model_name="Incremental SGD")
+    
+    if model_path:
+        from train import save_model
+        save_model(pipeline, model_path)
+    
+    print(f"\n⏱ Incremental training finished in {time.perf_counter() - start:.1f}s")
+    print("="*70)
+    
+    return {
+        'pipeline': pipeline,
+        'metrics': metrics,
+        'chunksize': chunksize
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Out-of-core churn model training")
+    parser.add_argument("--data", default="data/processed/telco_churn_clean.parquet",
+                        help="Processed dataset (Parquet or CSV)")
+    parser.add_argument("--memory-limit-mb", type=float, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help="Memory budget for one chunk of data")
+    parser.add_argument("--epochs", type=int, default=3, help="Passes over the training data")
+    parser.add_argument("--output", default="models/model_incremental.joblib",
+                        help="Where to save the trained pipeline")
+    args = parser.parse_args()
+    
+    train_incremental(args.data, memory_limit_mb=args.memory_limit_mb, epochs=args.epochs,
+                      model_path=args.output)
@@ -0,0 +1,113 @@
+"""
+Shared test fixtures: put src/ on the import path, build synthetic customer
+tables shaped like the cleaned Telco churn dataset, and fit small pipelines
+on them.
+"""
+
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from features import engineer_features, get_preprocessor, prepare_features_for_modeling
+from train import create_pipeline
+
+
+YES_NO = ['Yes', 'No']
+INTERNET_ADDON = ['Yes', 'No', 'No internet service']
+
+
+def make_customers(n_rows, seed=0):
+    """
+    Synthetic cleaned customers (SeniorCitizen as Yes/No), with a Churn column.
+    
+    The first rows are the edge cases of the engineered features: tenure 0,
+    MonthlyCharges 0, both at once, and every tenure-bin boundary.
+    """
+    rng = np.random.default_rng(seed)
+    
+    tenure = rng.integers(0, 73, n_rows)
+    monthly = rng.uniform(18.0, 120.0, n_rows).round(2)
+    total = (monthly * tenure * rng.uniform(0.9, 1.1, n_rows)).round(2)
+    
+    edge_tenure = [0, 0, 5, 0, 12, 13, 24, 25, 48, 49, 60, 61, 72]
+    edge_monthly = [50.0, 0.0, 0.0, 0.0, 70.0, 70.0, 70.0, 70.0, 70.0, 70.0, 70.0, 70.0, 70.0]
+    edge_total = [0.0, 0.0, 100.0, 0.0, 840.0, 910.0, 1680.0, 1750.0, 3360.0, 3430.0, 4200.0, 4270.0, 5040.0]
+    n_edge = min(len(edge_tenure), n_rows)
+    tenure[:n_edge] = edge_tenure[:n_edge]
+    monthly[:n_edge] = edge_monthly[:n_edge]
+    total[:n_edge] = edge_total[:n_edge]
+    
+    def choice(values):
+        return rng.choice(values, n_rows)
+    
+    return pd.DataFrame({
+        'gender': choice(['Male', 'Female']),
+        'SeniorCitizen': choice(YES_NO),
+        'Partner': choice(YES_NO),
+        'Dependents': choice(YES_NO),
+        'tenure': tenure,
+        'PhoneService': choice(YES_NO),
+        'MultipleLines': choice(['Yes', 'No', 'No phone service']),
+        'InternetService': choice(['DSL', 'Fiber optic', 'No']),
+        'OnlineSecurity': choice(INTERNET_ADDON),
+        'OnlineBackup': choice(INTERNET_ADDON),
+        'DeviceProtection': choice(INTERNET_ADDON),
+        'TechSupport': choice(INTERNET_ADDON),
+        'StreamingTV': choice(INTERNET_ADDON),
+        'StreamingMovies': choice(INTERNET_ADDON),
+        'Contract': choice(['Month-to-month', 'One year', 'Two year']),
+        'PaperlessBilling': choice(YES_NO),
+        'PaymentMethod': choice(['Electronic check', 'Mailed check', 'Bank transfer (automatic)',
+                                 'Credit card (automatic)']),
+        'MonthlyCharges': monthly,
+        'TotalCharges': total,
+        'Churn': choice(YES_NO)
+    })
+
+
+def write_raw_csv(df, path):
+    """Write customers in the raw Kaggle layout (customerID, SeniorCitizen as 0/1)."""
+    raw = df.copy()
+    raw.insert(0, 'customerID', [f'{i:04d}-TEST' for i in range(len(raw))])
+    raw['SeniorCitizen'] = (raw['SeniorCitizen'] == 'Yes').astype(int)
+    raw.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def customers():
+    """2,000 synthetic cleaned customers, edge cases first."""
+    return make_customers(2000)
+
+
+TrainedPipeline = namedtuple('TrainedPipeline', ['pipeline', 'X', 'y', 'model_path'])
+
+
+@pytest.fixture
+def train_pipeline(tmp_path):
+    """
+    Factory: fit a small pipeline around `model` on synthetic customers.
+    
+    The fitted pipeline is saved to tmp_path/model.joblib and returned
+    together with the engineered feature matrix and target it was fit on.
+    """
+    model_path = tmp_path / 'model.joblib'
+    
+    def train(model=None, n_rows=400):
+        model = LogisticRegression(max_iter=1000) if model is None else model
+        X, y, _, numerical, categorical = prepare_features_for_modeling(
+            engineer_features(make_customers(n_rows), verbose=False)
+        )
+        pipeline = create_pipeline(get_preprocessor(numerical, categorical), model).fit(X, y)
+        joblib.dump(pipeline, model_path)
+        return TrainedPipeline(pipeline, X, y, model_path)
+    
+    return train
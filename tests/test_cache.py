@@ -0,0 +1,68 @@
+"""
+Stage cache eviction: least recently used entries go first, and the entry
+just written is never evicted.
+"""
+
+import os
+
+import pandas as pd
+
+from cache import cached_stage, stage_key
+
+
+STAGE_FRAME = pd.DataFrame({'tenure': range(100), 'MonthlyCharges': [70.0] * 100})
+
+
+def _cache(cache_dir, name, max_mb=1024):
+    calls = []
+    
+    def compute():
+        calls.append(name)
+        return STAGE_FRAME.copy()
+    
+    cached_stage('stage', stage_key('stage', name), compute, cache_dir=cache_dir, max_mb=max_mb)
+    return calls
+
+
+def _entry_names(cache_dir):
+    return sorted(p.name for p in cache_dir.iterdir())
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    paths = {}
+    for i, name in enumerate(['a', 'b', 'c']):
+        _cache(tmp_path, name)
+        (paths[name],) = set(tmp_path.iterdir()) - set(paths.values())
+        os.utime(paths[name], ns=((i + 1) * 10**9, (i + 1) * 10**9))
+    
+    # A hit makes 'a' the most recently used entry, so 'b' is now the oldest
+    assert _cache(tmp_path, 'a') == []
+    
+    entry_bytes = paths['a'].stat().st_size
+    _cache(tmp_path, 'd', max_mb=3.5 * entry_bytes / 1024**2)
+    
+    assert not paths['b'].exists()
+    assert paths['a'].exists() and paths['c'].exists()
+    assert len(_entry_names(tmp_path)) == 3
+
+
+def test_new_entry_over_the_budget_is_kept(tmp_path):
+    _cache(tmp_path, 'a')
+    
+    # The new entry alone exceeds the budget: older entries go, the new one stays
+    assert _cache(tmp_path, 'b', max_mb=1e-9) == ['b']
+    assert len(_entry_names(tmp_path)) == 1
+    assert _cache(tmp_path, 'b', max_mb=1e-9) == []
+
+
+def test_new_entry_with_an_older_mtime_is_kept(tmp_path):
+    _cache(tmp_path, 'a')
+    (old_entry,) = tmp_path.iterdir()
+    os.utime(old_entry, ns=(4 * 10**18, 4 * 10**18))
+    entry_bytes = old_entry.stat().st_size
+    
+    # The existing entry looks newer than the one being written (e.g. clock skew)
+    _cache(tmp_path, 'b', max_mb=1.5 * entry_bytes / 1024**2)
+    
+    assert not old_entry.exists()
+    assert _cache(tmp_path, 'b', max_mb=1.5 * entry_bytes / 1024**2) == []
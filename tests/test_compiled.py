@@ -0,0 +1,143 @@
+"""
+Compiled scorer: the NumPy-only scorer reproduces the pipeline's
+predict_proba, including rows with missing values and rows that sit exactly
+on (or one float32 step beside) a split threshold. Saved scorers reload
+memory-mapped with the same scores, and are replaced by an in-memory compile
+once the model file changes.
+"""
+
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+import data_prep
+import predict
+from compiled import (compile_pipeline, compiled_predict_proba, compiled_scorer_path, evaluate_trees,
+                      export_compiled_scorer, load_compiled_scorer)
+
+
+TOLERANCE = 1e-6
+
+MODELS = [
+    LogisticRegression(max_iter=1000),
+    RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0, n_jobs=1),
+    XGBClassifier(n_estimators=20, max_depth=4, n_jobs=1)
+]
+MODEL_IDS = ['linear', 'tree', 'xgboost']
+
+
+def _with_missing_values(X):
+    """Copy of X with NaN in some numerical cells (one column, two columns, and none)."""
+    X = X.astype({'tenure': float, 'TotalServices': float})
+    X.loc[X.index[:40], 'TotalCharges'] = np.nan
+    X.loc[X.index[20:60], 'tenure'] = np.nan
+    X.loc[X.index[60:80], ['AvgMonthlyCharges', 'ChargeRatio', 'TotalServices']] = np.nan
+    return X
+
+
+def _split_thresholds(model):
+    """(feature, threshold) of every split of a fitted RandomForest or XGBoost model, as the model stores them."""
+    if isinstance(model, RandomForestClassifier):
+        return [(feature, threshold)
+                for estimator in model.estimators_
+                for feature, threshold, left in zip(estimator.tree_.feature, estimator.tree_.threshold,
+                                                    estimator.tree_.children_left)
+                if left != -1]
+    
+    trees = model.get_booster().trees_to_dataframe()
+    splits = trees[trees['Feature'] != 'Leaf']
+    return [(int(feature[1:]), np.float32(threshold)) for feature, threshold in zip(splits['Feature'], splits['Split'])]
+
+
+def _rows_on_thresholds(base_row, thresholds):
+    """One row per split threshold and per float32 neighbour of it, otherwise equal to `base_row`."""
+    rows = []
+    for feature, threshold in thresholds:
+        threshold32 = np.float32(threshold)
+        for value in (threshold, np.nextafter(threshold32, np.float32(-np.inf)),
+                      np.nextafter(threshold32, np.float32(np.inf))):
+            row = base_row.copy()
+            row[feature] = value
+            rows.append(row)
+    return np.array(rows)
+
+
+@pytest.mark.parametrize('model', MODELS, ids=MODEL_IDS)
+def test_compiled_probabilities_match_the_pipeline(train_pipeline, model):
+    pipeline, X, _, _ = train_pipeline(model)
+    scorer = compile_pipeline(pipeline)
+    
+    # Logistic Regression cannot score missing values; the tree models route them by default direction
+    rows = X.iloc[:200] if scorer['kind'] == 'linear' else _with_missing_values(X.iloc[:200])
+    
+    np.testing.assert_allclose(compiled_predict_proba(scorer, rows), pipeline.predict_proba(rows),
+                               rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('model', MODELS[1:], ids=MODEL_IDS[1:])
+def test_rows_on_split_thresholds_take_the_model_branch(train_pipeline, model):
+    pipeline, X, _, _ = train_pipeline(model)
+    scorer = compile_pipeline(pipeline)
+    base_row = pipeline.named_steps['preprocessor'].transform(X.iloc[:1])[0]
+    
+    rows = _rows_on_thresholds(base_row, _split_thresholds(pipeline.named_steps['model']))
+    
+    np.testing.assert_allclose(evaluate_trees(scorer['trees'], rows),
+                               pipeline.named_steps['model'].predict_proba(rows)[:, 1],
+                               rtol=0, atol=TOLERANCE)
+
+
+def _export(trained):
+    """Export the scorer of a trained pipeline next to its model file, as train.py does."""
+    return export_compiled_scorer(trained.pipeline, compiled_scorer_path(trained.model_path),
+                                  validation_data=trained.X, model_path=trained.model_path)
+
+
+@pytest.mark.parametrize('model', MODELS, ids=MODEL_IDS)
+def test_memory_mapped_scorer_scores_like_the_in_memory_one(train_pipeline, model):
+    trained = train_pipeline(model)
+    scorer = _export(trained)
+    
+    mapped = load_compiled_scorer(compiled_scorer_path(trained.model_path), mmap_mode='r')
+    
+    arrays = mapped['trees'] if mapped['kind'] == 'trees' else mapped
+    assert isinstance(arrays['coef' if mapped['kind'] == 'linear' else 'threshold'], np.memmap)
+    np.testing.assert_array_equal(compiled_predict_proba(mapped, trained.X), compiled_predict_proba(scorer, trained.X))
+
+
+def test_unchanged_model_is_not_hashed_on_load(train_pipeline, monkeypatch):
+    trained = train_pipeline()
+    _export(trained)
+    
+    def no_hashing(path):
+        raise AssertionError("model file hashed although its size and mtime are unchanged")
+    monkeypatch.setattr(data_prep, 'file_checksum', no_hashing)
+    
+    assert isinstance(predict.load_flat_scorer(trained.model_path)['coef'], np.memmap)
+
+
+def test_model_with_the_same_content_and_a_new_mtime_keeps_the_scorer(train_pipeline):
+    trained = train_pipeline()
+    _export(trained)
+    
+    # e.g. the models directory was copied: the content, and so the checksum, is unchanged
+    os.utime(trained.model_path, ns=(10**18, 10**18))
+    
+    assert isinstance(predict.load_flat_scorer(trained.model_path)['coef'], np.memmap)
+
+
+def test_changed_model_makes_the_saved_scorer_stale(train_pipeline):
+    _export(train_pipeline(LogisticRegression(max_iter=1000)))
+    retrained = train_pipeline(RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1))
+    
+    scorer = predict.load_flat_scorer(retrained.model_path)
+    
+    # The old linear scorer is ignored and the new model is compiled in memory
+    assert scorer['kind'] == 'trees'
+    assert not isinstance(scorer['trees']['threshold'], np.memmap)
+    np.testing.assert_allclose(compiled_predict_proba(scorer, retrained.X),
+                               retrained.pipeline.predict_proba(retrained.X), rtol=0, atol=TOLERANCE)
@@ -0,0 +1,104 @@
+"""
+Tests for data loading, cleaning and the processed-data cache in data_prep.py.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_prep
+from conftest import make_customers, write_raw_csv
+from data_prep import clean_data
+
+
+def test_clean_data_fills_missing_categories_with_mode():
+    df = pd.DataFrame({
+        'customerID': ['a', 'b', 'c', 'd'],
+        'SeniorCitizen': [0, 1, 0, 0],
+        'Contract': pd.Series(['One year', None, 'One year', 'Two year'], dtype='category'),
+        'PaymentMethod': ['Mailed check', 'Mailed check', None, 'Electronic check'],
+        'TotalCharges': ['10.5', ' ', '30', '40']
+    })
+    
+    with pd.option_context('mode.copy_on_write', True):
+        cleaned = clean_data(df)
+    
+    assert cleaned.isnull().sum().sum() == 0
+    assert cleaned['Contract'].tolist() == ['One year', 'One year', 'One year', 'Two year']
+    assert cleaned['PaymentMethod'].tolist() == ['Mailed check', 'Mailed check', 'Mailed check', 'Electronic check']
+    assert cleaned['TotalCharges'].tolist() == [10.5, 0.0, 30.0, 40.0]
+
+
+def test_processed_data_freshness_follows_raw_file_and_code(tmp_path, monkeypatch):
+    raw_path = tmp_path / 'raw.csv'
+    raw_path.write_text('a,b\n1,2\n')
+    processed_path = tmp_path / 'processed.csv'
+    
+    data_prep.save_processed_data(pd.DataFrame({'a': [1]}), processed_path, source_path=raw_path)
+    assert data_prep.is_processed_data_fresh(processed_path, raw_path)
+    
+    # A change to the cleaning code makes the processed file stale
+    monkeypatch.setattr(data_prep, 'cleaning_code_version', lambda: 'other-version')
+    assert not data_prep.is_processed_data_fresh(processed_path, raw_path)
+    monkeypatch.undo()
+    
+    # So does a change to the raw file
+    raw_path.write_text('a,b\n1,3\n')
+    assert not data_prep.is_processed_data_fresh(processed_path, raw_path)
+
+
+def test_saving_without_source_drops_old_sidecar(tmp_path):
+    raw_path = tmp_path / 'raw.csv'
+    raw_path.write_text('a,b\n1,2\n')
+    processed_path = tmp_path / 'processed.csv'
+    
+    data_prep.save_processed_data(pd.DataFrame({'a': [1]}), processed_path, source_path=raw_path)
+    data_prep.save_processed_data(pd.DataFrame({'a': [2]}), processed_path)
+    
+    assert not data_prep.is_processed_data_fresh(processed_path, raw_path)
+
+
+@pytest.fixture
+def raw_customers_csv(tmp_path):
+    """Raw Kaggle-layout customers, the first one new with a blank TotalCharges."""
+    df = make_customers(200).astype({'TotalCharges': object})
+    df.loc[0, 'TotalCharges'] = ' '
+    return write_raw_csv(df, tmp_path / 'raw.csv')
+
+
+def test_typed_load_applies_the_schema(raw_customers_csv):
+    df = data_prep.load_data(raw_customers_csv)
+    
+    for col in data_prep.CATEGORICAL_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    assert df['SeniorCitizen'].dtype == 'int8'
+    assert df['tenure'].dtype == 'int16'
+    # Charges keep the float64 precision the scoring paths parse them with
+    assert df['MonthlyCharges'].dtype == 'float64' and df['TotalCharges'].dtype == 'float64'
+    assert np.isnan(df.loc[0, 'TotalCharges'])
+    
+    untyped = data_prep.load_data(raw_customers_csv, use_schema=False)
+    np.testing.assert_array_equal(df['MonthlyCharges'], untyped['MonthlyCharges'])
+
+
+def test_typed_frame_keeps_the_feature_classification(raw_customers_csv):
+    typed = clean_data(data_prep.load_data(raw_customers_csv))
+    untyped = clean_data(data_prep.load_data(raw_customers_csv, use_schema=False))
+    
+    feature_types = data_prep.get_feature_types(typed)
+    
+    assert feature_types == data_prep.get_feature_types(untyped)
+    assert feature_types['numerical'] == ['tenure', 'MonthlyCharges', 'TotalCharges']
+    assert 'SeniorCitizen' in feature_types['categorical']
+    assert 'Churn' not in feature_types['categorical']
+
+
+def test_memory_usage_report_lists_every_column_largest_first(raw_customers_csv):
+    df = data_prep.load_data(raw_customers_csv)
+    
+    report = data_prep.memory_usage_report(df)
+    
+    assert sorted(report['Column']) == sorted(df.columns)
+    assert report['Memory (MB)'].is_monotonic_decreasing
+    assert report.set_index('Column').loc['tenure', 'Dtype'] == 'int16'
+    assert report['Memory (MB)'].sum() * 1024**2 == pytest.approx(df.memory_usage(deep=True, index=False).sum())
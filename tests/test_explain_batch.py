@@ -0,0 +1,125 @@
+"""
+Batch reason codes: the churn probability written next to the reasons comes
+from the SHAP explanation itself and matches the model's own scoring; one-hot
+contributions roll up to their source feature; reasons come out strongest
+first; the job keys every row by customerID and writes the same file with one
+worker or several.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+from conftest import make_customers, write_raw_csv
+from data_prep import columnar_format_available
+from explain_batch import explain_batch, explain_chunk, source_feature_matrix, top_k_reasons
+from predict import build_explainer, explain_prediction_shap, save_explainer, score, summarize_background
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(max_iter=1000),
+    XGBClassifier(n_estimators=20, max_depth=3, n_jobs=1),
+    RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1)
+], ids=['linear', 'xgboost', 'tree'])
+def test_chunk_probabilities_come_from_the_explanation(train_pipeline, model, monkeypatch):
+    customers = make_customers(400)
+    pipeline, X, y, _ = train_pipeline(model, n_rows=len(customers))
+    explainer = build_explainer(pipeline, summarize_background(X, y))
+    _, probabilities = score(pipeline, X.iloc[:50])
+    
+    # The explanation pass is the only model evaluation
+    def no_second_pass(*args, **kwargs):
+        raise AssertionError("predict_proba called in addition to the SHAP pass")
+    monkeypatch.setattr(model, 'predict_proba', no_second_pass)
+    
+    reasons = explain_chunk(pipeline, explainer, customers.iloc[:50])
+    
+    np.testing.assert_allclose(reasons['churn_probability'], probabilities[:, 1], atol=1e-6)
+    assert reasons['row'].tolist() == list(range(50))
+
+
+def test_one_hot_contributions_roll_up_to_their_source_feature(train_pipeline):
+    pipeline, X, y, _ = train_pipeline()
+    explanation = explain_prediction_shap(pipeline, X.iloc[:50], background_data=summarize_background(X, y))
+    feature_names = list(explanation.feature_names)
+    
+    matrix, source_names = source_feature_matrix(pipeline, feature_names)
+    rolled_up = explanation.values @ matrix
+    
+    # Every transformed column belongs to exactly one source feature
+    np.testing.assert_array_equal(matrix.sum(axis=1), 1.0)
+    contract_columns = [i for i, name in enumerate(feature_names) if name.startswith('Contract_')]
+    assert contract_columns and np.flatnonzero(matrix[:, source_names.index('Contract')]).tolist() == contract_columns
+    np.testing.assert_allclose(rolled_up[:, source_names.index('Contract')],
+                               explanation.values[:, contract_columns].sum(axis=1))
+    np.testing.assert_allclose(rolled_up.sum(axis=1), explanation.values.sum(axis=1))
+
+
+def test_unknown_transformed_column_is_named_in_the_error(train_pipeline):
+    pipeline, X, _, _ = train_pipeline()
+    feature_names = explain_prediction_shap(pipeline, X.iloc[:1], method='linear', background_data=X).feature_names
+    
+    with pytest.raises(ValueError, match='Loyalty_gold'):
+        source_feature_matrix(pipeline, list(feature_names) + ['Loyalty_gold'])
+
+
+def test_top_k_reasons_are_ordered_by_absolute_contribution():
+    values = np.array([[0.1, -0.5, 0.3, 0.0],
+                       [0.2, 0.05, -0.01, -0.9]])
+    
+    reasons = top_k_reasons(values, ['tenure', 'Contract', 'MonthlyCharges', 'PaymentMethod'], top_k=3)
+    
+    assert list(reasons.columns) == ['reason_1', 'reason_1_shap', 'reason_2', 'reason_2_shap',
+                                     'reason_3', 'reason_3_shap']
+    assert reasons.loc[0, ['reason_1', 'reason_2', 'reason_3']].tolist() == ['Contract', 'MonthlyCharges', 'tenure']
+    assert reasons.loc[1, ['reason_1', 'reason_2', 'reason_3']].tolist() == ['PaymentMethod', 'tenure', 'Contract']
+    np.testing.assert_allclose(reasons.loc[0, ['reason_1_shap', 'reason_2_shap', 'reason_3_shap']].astype(float),
+                               [-0.5, 0.3, 0.1])
+
+
+@pytest.fixture
+def explained_model(train_pipeline, tmp_path):
+    """A trained model with its explainer saved next to it, and a raw customer file."""
+    trained = train_pipeline()
+    explainer_path = tmp_path / 'explainer.joblib'
+    save_explainer(build_explainer(trained.pipeline, summarize_background(trained.X, trained.y)),
+                   trained.model_path, explainer_path)
+    customer_file = write_raw_csv(make_customers(120, seed=1), tmp_path / 'raw_customers.csv')
+    return trained.model_path, explainer_path, customer_file
+
+
+@pytest.mark.skipif(not columnar_format_available(), reason="pyarrow is not installed")
+def test_batch_writes_one_reason_row_per_customer_to_parquet(explained_model, tmp_path):
+    import pyarrow.parquet as pq
+    
+    model_path, explainer_path, customer_file = explained_model
+    output_path = tmp_path / 'reasons.parquet'
+    
+    summary = explain_batch(customer_file, output_path, model_path=model_path, explainer_path=explainer_path,
+                            chunksize=50, top_k=2)
+    
+    schema = pq.read_schema(output_path)
+    assert schema.names == ['customerID', 'churn_probability', 'reason_1', 'reason_1_shap', 'reason_2', 'reason_2_shap']
+    assert str(schema.field('churn_probability').type) == 'double'
+    assert str(schema.field('reason_1_shap').type) == 'double'
+    assert summary['rows'] == pq.read_metadata(output_path).num_rows == 120
+    
+    # Every row is keyed by the customer it explains, in input order
+    reasons = pd.read_parquet(output_path)
+    assert reasons['customerID'].tolist() == pd.read_csv(customer_file)['customerID'].tolist()
+
+
+def test_parallel_workers_write_the_same_reasons(explained_model, tmp_path):
+    model_path, explainer_path, customer_file = explained_model
+    
+    outputs = []
+    for n_workers in (1, 2):
+        output_path = tmp_path / f'reasons_{n_workers}.csv'
+        explain_batch(customer_file, output_path, model_path=model_path, explainer_path=explainer_path,
+                      chunksize=25, n_workers=n_workers)
+        outputs.append(pd.read_csv(output_path))
+    
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
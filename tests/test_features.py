@@ -0,0 +1,160 @@
+"""
+Parity tests for the vectorized feature builders in features.py.
+
+The reference functions below are the original row-wise implementations
+(DataFrame.apply with a Python lambda per row); the vectorized builders must
+reproduce them bit for bit. The single-customer dict path (engineer_customer,
+prepare_customer_input) must match engineer_features on the same customer.
+"""
+
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_customers
+from features import (create_charge_features, create_service_features, create_tenure_groups,
+                      engineer_customer, engineer_features, SERVICE_COLUMNS)
+from predict import prepare_customer_input, CUSTOMER_FIELDS
+
+
+def rowwise_charge_features(df):
+    df_new = df.copy()
+    df_new['AvgMonthlyCharges'] = df_new.apply(
+        lambda row: row['TotalCharges'] / row['tenure'] if row['tenure'] > 0 else row['MonthlyCharges'],
+        axis=1
+    )
+    df_new['ChargeRatio'] = df_new.apply(
+        lambda row: row['TotalCharges'] / row['MonthlyCharges'] if row['MonthlyCharges'] > 0 else 0,
+        axis=1
+    )
+    return df_new
+
+
+def rowwise_service_features(df):
+    df_new = df.copy()
+    available_cols = [col for col in SERVICE_COLUMNS if col in df_new.columns]
+    df_new['TotalServices'] = df_new[available_cols].apply(lambda row: sum(row == 'Yes'), axis=1)
+    return df_new
+
+
+def rowwise_engineer_features(df):
+    df_new = df.copy()
+    df_new['TenureGroup'] = pd.cut(df_new['tenure'], bins=[0, 12, 24, 48, 60, 100],
+                                   labels=['0-1 year', '1-2 years', '2-4 years', '4-5 years', '5+ years'],
+                                   include_lowest=True)
+    return rowwise_service_features(rowwise_charge_features(df_new))
+
+
+def assert_bitwise_equal(actual, expected):
+    """Same values (NaN == NaN), same dtypes, same bits for floats."""
+    pd.testing.assert_series_equal(actual, expected, check_exact=True)
+    if actual.dtype.kind == 'f':
+        np.testing.assert_array_equal(actual.to_numpy().view(np.int64), expected.to_numpy().view(np.int64))
+
+
+@pytest.mark.parametrize('column', ['AvgMonthlyCharges', 'ChargeRatio'])
+def test_charge_features_match_rowwise(customers, column):
+    assert_bitwise_equal(create_charge_features(customers)[column],
+                         rowwise_charge_features(customers)[column])
+
+
+def test_service_features_match_rowwise(customers):
+    assert_bitwise_equal(create_service_features(customers)['TotalServices'],
+                         rowwise_service_features(customers)['TotalServices'])
+
+
+def test_service_features_with_missing_service_columns(customers):
+    subset = customers.drop(columns=['StreamingTV', 'TechSupport'])
+    assert_bitwise_equal(create_service_features(subset)['TotalServices'],
+                         rowwise_service_features(subset)['TotalServices'])
+
+
+def test_tenure_groups_unchanged(customers):
+    assert_bitwise_equal(create_tenure_groups(customers)['TenureGroup'],
+                         rowwise_engineer_features(customers)['TenureGroup'])
+
+
+def test_divide_edge_cases():
+    df = pd.DataFrame({
+        'tenure': [0, 0, 10, 10],
+        'MonthlyCharges': [50.0, 0.0, 0.0, 25.0],
+        'TotalCharges': [0.0, 0.0, 120.0, 250.0]
+    })
+    
+    result = create_charge_features(df)
+    
+    # tenure == 0 falls back to MonthlyCharges; MonthlyCharges == 0 gives a ratio of 0
+    assert result['AvgMonthlyCharges'].tolist() == [50.0, 0.0, 12.0, 25.0]
+    assert result['ChargeRatio'].tolist() == [0.0, 0.0, 0.0, 10.0]
+    pd.testing.assert_frame_equal(result, rowwise_charge_features(df), check_exact=True)
+
+
+@pytest.mark.parametrize('inplace', [False, True])
+def test_engineer_features_matches_rowwise(customers, inplace):
+    expected = rowwise_engineer_features(customers)
+    
+    result = engineer_features(customers.copy(), inplace=inplace, verbose=False)
+    
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_engineer_features_leaves_input_untouched(customers):
+    original = customers.copy()
+    
+    engineer_features(customers, verbose=False)
+    
+    pd.testing.assert_frame_equal(customers, original)
+
+
+def test_memory_is_only_traced_on_request(customers, capsys):
+    engineer_features(customers)
+    assert 'Peak memory' not in capsys.readouterr().out
+    
+    engineer_features(customers, verbose=False, report_memory=True)
+    assert 'Peak memory' in capsys.readouterr().out
+    assert not tracemalloc.is_tracing()
+
+
+# (tenure, MonthlyCharges, TotalCharges): zero tenure and/or charges, and every tenure-bin boundary
+DICT_PATH_CASES = [
+    (0, 50.0, 0.0), (0, 0.0, 0.0), (5, 0.0, 100.0), (0.5, 30.0, 15.0),
+    (12, 70.0, 840.0), (13, 70.0, 910.0), (24, 70.0, 1680.0), (25, 70.0, 1750.0),
+    (48, 70.0, 3360.0), (49, 70.0, 3430.0), (60, 70.0, 4200.0), (61, 70.0, 4270.0),
+    (72, 70.0, 5040.0), (100, 70.0, 7000.0), (101, 70.0, 7070.0)
+]
+
+
+def _single_customer(tenure, monthly, total):
+    customer = make_customers(1).drop(columns='Churn').iloc[0].to_dict()
+    customer.update({'tenure': tenure, 'MonthlyCharges': monthly, 'TotalCharges': total})
+    return customer
+
+
+@pytest.mark.parametrize('tenure, monthly, total', DICT_PATH_CASES)
+def test_engineer_customer_matches_engineer_features(tenure, monthly, total):
+    customer = _single_customer(tenure, monthly, total)
+    expected = engineer_features(pd.DataFrame([customer]), verbose=False).iloc[0]
+    
+    engineered = engineer_customer(customer)
+    
+    assert set(engineered) == set(expected.index)
+    if pd.isna(expected['TenureGroup']):
+        assert pd.isna(engineered['TenureGroup'])
+    else:
+        assert engineered['TenureGroup'] == expected['TenureGroup']
+    for column in ['AvgMonthlyCharges', 'ChargeRatio']:
+        assert np.float64(engineered[column]).tobytes() == np.float64(expected[column]).tobytes()
+    assert engineered['TotalServices'] == expected['TotalServices']
+
+
+@pytest.mark.parametrize('tenure, monthly, total', DICT_PATH_CASES)
+def test_prepare_customer_input_matches_engineer_features(tenure, monthly, total):
+    customer = _single_customer(tenure, monthly, total)
+    expected = engineer_features(pd.DataFrame([customer]), verbose=False)
+    expected['TenureGroup'] = expected['TenureGroup'].astype(object)
+    
+    result = prepare_customer_input(*[customer[field] for field in CUSTOMER_FIELDS])
+    
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_exact=True)
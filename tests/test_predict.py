@@ -0,0 +1,247 @@
+"""
+Prediction helpers: the prediction cache keeps the model and the checksum
+its predictions are keyed on together, also under concurrent access; SHAP
+explanations need a real background and report values in the documented units,
+also from the per-class lists older shap versions return;
+chunked streaming and parallel scoring write the same predictions, in the
+same order, as the in-memory path; the single-pass scorer reproduces predict
+and applies custom thresholds; the flat engine scores like the native one; a
+persisted explainer reproduces a fresh one and is rejected for another model.
+"""
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.special import logit
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+
+import predict
+from conftest import make_customers
+from data_prep import file_checksum
+
+
+def _write_model(path, name, mtime_ns):
+    joblib.dump({'model': name}, path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_concurrent_lookups_load_the_model_once(tmp_path, monkeypatch):
+    model_path = tmp_path / 'model.joblib'
+    _write_model(model_path, 'A', 1_000_000_000)
+    loads = []
+    
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.05)
+        return joblib.load(path)
+    
+    monkeypatch.setattr(predict, 'load_trained_model', slow_load)
+    cache = predict.PredictionCache(model_path)
+    
+    start = threading.Barrier(8)
+    models = []
+    
+    def lookup():
+        start.wait()
+        models.append(cache.model())
+    
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(loads) == 1
+    assert len({id(pipeline) for _, pipeline in models}) == 1
+
+
+def test_model_replaced_during_load_is_not_paired_with_the_old_checksum(tmp_path, monkeypatch):
+    model_path = tmp_path / 'model.joblib'
+    _write_model(model_path, 'A', 1_000_000_000)
+    
+    def load_then_replace(path):
+        pipeline = joblib.load(path)
+        if pipeline['model'] == 'A':
+            # A new model is deployed while the old file is being loaded
+            _write_model(model_path, 'B', 2_000_000_000)
+        return pipeline
+    
+    monkeypatch.setattr(predict, 'load_trained_model', load_then_replace)
+    cache = predict.PredictionCache(model_path)
+    
+    checksum, pipeline = cache.model()
+    
+    assert pipeline == {'model': 'B'}
+    assert checksum == file_checksum(model_path)
+
+
+def test_linear_explanation_without_background_raises(train_pipeline):
+    pipeline, X, _, _ = train_pipeline(LogisticRegression(max_iter=1000))
+    
+    with pytest.raises(ValueError, match='background'):
+        predict.explain_prediction_shap(pipeline, X.iloc[:1])
+    
+    # With a background the single row gets non-zero contributions
+    explanation = predict.explain_prediction_shap(pipeline, X.iloc[:1], background_data=X)
+    assert np.abs(explanation.values).sum() > 0
+
+
+@pytest.mark.parametrize('model, method', [
+    (LogisticRegression(max_iter=1000), 'linear'),
+    (XGBClassifier(n_estimators=20, max_depth=3, n_jobs=1), 'xgboost'),
+    (RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1), 'tree')
+])
+def test_explanation_units(train_pipeline, model, method):
+    pipeline, X, _, _ = train_pipeline(model)
+    
+    explanation = predict.explain_prediction_shap(pipeline, X.iloc[:20], background_data=X)
+    
+    total = explanation.base_values + explanation.values.sum(axis=1)
+    churn_probability = pipeline.predict_proba(X.iloc[:20])[:, 1]
+    expected = logit(churn_probability) if predict.SHAP_OUTPUT_UNITS[method] == 'log-odds' else churn_probability
+    np.testing.assert_allclose(total, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_tree_explanation_accepts_the_per_class_list(train_pipeline, monkeypatch):
+    import shap
+    
+    pipeline, X, _, _ = train_pipeline(RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1))
+    n_features = pipeline.named_steps['preprocessor'].transform(X.iloc[:1]).shape[1]
+    shap_values = shap.TreeExplainer.shap_values
+    
+    # shap < 0.45 returns one (n_rows, n_features) array per class
+    def per_class_list(self, X, *args, **kwargs):
+        values = shap_values(self, X, *args, **kwargs)
+        return [values[..., k] for k in range(values.shape[-1])] if np.ndim(values) == 3 else values
+    
+    monkeypatch.setattr(shap.TreeExplainer, 'shap_values', per_class_list)
+    explanation = predict.explain_prediction_shap(pipeline, X.iloc[:20], method='tree')
+    
+    assert explanation.values.shape == (20, n_features)
+    total = explanation.base_values + explanation.values.sum(axis=1)
+    np.testing.assert_allclose(total, pipeline.predict_proba(X.iloc[:20])[:, 1], rtol=1e-4, atol=1e-5)
+
+
+@pytest.fixture
+def customer_file(tmp_path):
+    """250 cleaned customers in a CSV, as load_and_predict expects them."""
+    path = tmp_path / 'customers.csv'
+    make_customers(250).to_csv(path, index=False)
+    return path
+
+
+def test_streamed_predictions_match_the_in_memory_path(train_pipeline, customer_file, tmp_path):
+    model_path = train_pipeline().model_path
+    
+    predict.load_and_predict(customer_file, model_path=model_path, output_path=tmp_path / 'in_memory.csv')
+    # 64 does not divide 250: the last chunk is a partial one
+    summary = predict.load_and_predict(customer_file, model_path=model_path, output_path=tmp_path / 'streamed.csv',
+                                       chunksize=64)
+    
+    assert summary['rows'] == 250
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'streamed.csv'), pd.read_csv(tmp_path / 'in_memory.csv'))
+
+
+def test_parallel_scoring_keeps_the_single_worker_output(train_pipeline, customer_file, tmp_path):
+    model_path = train_pipeline().model_path
+    
+    # 10 chunks through a window of 2 * n_workers in-flight chunks
+    for n_workers in (1, 2):
+        predict.load_and_predict(customer_file, model_path=model_path, output_path=tmp_path / f'{n_workers}.csv',
+                                 chunksize=25, n_workers=n_workers)
+    
+    assert (tmp_path / '2.csv').read_text() == (tmp_path / '1.csv').read_text()
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(max_iter=1000),
+    XGBClassifier(n_estimators=20, max_depth=3, n_jobs=1),
+    RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1)
+], ids=['linear', 'xgboost', 'tree'])
+def test_score_reproduces_predict_at_the_default_threshold(train_pipeline, model):
+    pipeline, X, _, _ = train_pipeline(model)
+    
+    labels, probabilities = predict.score(pipeline, X)
+    
+    np.testing.assert_array_equal(labels, pipeline.predict(X))
+    np.testing.assert_array_equal(probabilities, pipeline.predict_proba(X))
+
+
+def test_custom_threshold_moves_the_labels(train_pipeline):
+    pipeline, X, _, _ = train_pipeline()
+    churn_probability = pipeline.predict_proba(X)[:, 1]
+    
+    default_labels, _ = predict.score(pipeline, X)
+    strict_labels, _ = predict.score(pipeline, X, threshold=0.8)
+    lenient_labels, _ = predict.score(pipeline, X, threshold=0.2)
+    
+    np.testing.assert_array_equal(strict_labels, churn_probability > 0.8)
+    np.testing.assert_array_equal(lenient_labels, churn_probability > 0.2)
+    assert strict_labels.sum() < default_labels.sum() < lenient_labels.sum()
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(max_iter=1000),
+    XGBClassifier(n_estimators=20, max_depth=3, n_jobs=1),
+    RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1)
+], ids=['linear', 'xgboost', 'tree'])
+def test_flat_engine_matches_the_native_engine(train_pipeline, model):
+    pipeline, X, _, _ = train_pipeline(model)
+    
+    native = predict.predict_batch(pipeline, X, engine='native')
+    flat = predict.predict_batch(pipeline, X, engine='flat')
+    
+    assert flat['Churn_Prediction'].tolist() == native['Churn_Prediction'].tolist()
+    np.testing.assert_allclose(flat[['Churn_Probability', 'No_Churn_Probability']],
+                               native[['Churn_Probability', 'No_Churn_Probability']], rtol=0, atol=1e-6)
+
+
+def test_customer_is_scored_with_the_callers_model_snapshot(train_pipeline):
+    first = train_pipeline(LogisticRegression(max_iter=1000))
+    cache = predict.PredictionCache(first.model_path)
+    checksum, pipeline = cache.model()
+    customer = make_customers(1).drop(columns='Churn').iloc[0].to_dict()
+    
+    # The model file is replaced between taking the snapshot and scoring
+    train_pipeline(RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1))
+    result = predict.predict_customer(customer, pipeline, cache=cache, checksum=checksum)
+    
+    assert result == predict.predict_customer(customer, first.pipeline)
+    assert cache.get(cache.key(customer, checksum=checksum)) == result
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(max_iter=1000),
+    XGBClassifier(n_estimators=20, max_depth=3, n_jobs=1),
+    RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1)
+], ids=['linear', 'xgboost', 'tree'])
+def test_reloaded_explainer_gives_the_fresh_shap_values(train_pipeline, model, tmp_path):
+    pipeline, X, y, model_path = train_pipeline(model)
+    explainer = predict.build_explainer(pipeline, predict.summarize_background(X, y))
+    predict.save_explainer(explainer, model_path, tmp_path / 'explainer.joblib')
+    
+    reloaded = predict.get_explainer(model_path, tmp_path / 'explainer.joblib')
+    
+    fresh = predict.explain_prediction_shap(pipeline, X.iloc[:20], explainer=explainer)
+    persisted = predict.explain_prediction_shap(pipeline, X.iloc[:20], explainer=reloaded)
+    np.testing.assert_array_equal(persisted.values, fresh.values)
+    np.testing.assert_array_equal(persisted.base_values, fresh.base_values)
+    assert persisted.feature_names == fresh.feature_names
+
+
+def test_explainer_is_rejected_after_the_model_changes(train_pipeline, tmp_path):
+    pipeline, X, y, model_path = train_pipeline(LogisticRegression(max_iter=1000))
+    predict.save_explainer(predict.build_explainer(pipeline, X), model_path, tmp_path / 'explainer.joblib')
+    assert predict.get_explainer(model_path, tmp_path / 'explainer.joblib') is not None
+    
+    # Retraining replaces the model file but leaves the old explainer next to it
+    train_pipeline(RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1))
+    
+    assert predict.get_explainer(model_path, tmp_path / 'explainer.joblib') is None
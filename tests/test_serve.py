@@ -0,0 +1,209 @@
+"""
+Prediction server: concurrent single-customer requests are scored as one
+micro-batch; requests beyond the queue limit get 429, while oversized bodies
+and batches that could never be admitted are answered with 413 instead of
+being read or queued.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import predict
+import serve
+from compiled import compile_pipeline
+from conftest import make_customers
+
+
+MAX_QUEUE = 8
+MAX_BODY_BYTES = 64 * 1024
+
+
+@pytest.fixture
+def worker_pipeline(train_pipeline, monkeypatch):
+    """A small trained pipeline installed as the scoring workers' model."""
+    pipeline = train_pipeline(n_rows=300).pipeline
+    monkeypatch.setattr(predict, '_worker_pipeline', pipeline)
+    return pipeline
+
+
+def _customers(n_rows):
+    df = make_customers(n_rows).drop(columns='Churn')
+    return df.astype({'tenure': float}).to_dict('records')
+
+
+async def _post(path, body, content_length=None):
+    """Send one POST to a fresh server and return (status, payload)."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        batcher = serve.MicroBatcher(executor, 1, max_queue=MAX_QUEUE)
+        service = serve.PredictionService(batcher, {}, max_body_bytes=MAX_BODY_BYTES)
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            length = len(body) if content_length is None else content_length
+            writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode() + body)
+            await writer.drain()
+            
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) != b'\r\n':
+                name, _, value = line.decode().partition(':')
+                headers[name.strip().lower()] = value.strip()
+            payload = json.loads(await reader.readexactly(int(headers['content-length'])))
+            
+            writer.close()
+        await batcher.close()
+    
+    return status, payload
+
+
+def test_body_over_the_limit_is_rejected_without_reading_it():
+    # Only the headers are sent: the server must answer from Content-Length alone
+    status, payload = asyncio.run(_post('/predict/batch', b'', content_length=MAX_BODY_BYTES + 1))
+    
+    assert status == 413
+    assert str(MAX_BODY_BYTES) in payload['error']
+
+
+def test_batch_larger_than_the_queue_gets_413(worker_pipeline):
+    body = json.dumps(_customers(MAX_QUEUE + 1)).encode()
+    
+    status, payload = asyncio.run(_post('/predict/batch', body))
+    
+    assert status == 413
+    assert 'split it' in payload['error']
+
+
+def test_batch_filling_the_queue_is_scored(worker_pipeline):
+    body = json.dumps(_customers(MAX_QUEUE)).encode()
+    
+    status, payload = asyncio.run(_post('/predict/batch', body))
+    
+    assert status == 200
+    assert len(payload['predictions']) == MAX_QUEUE
+
+
+def test_concurrent_requests_are_scored_in_one_batch(worker_pipeline, monkeypatch):
+    batch_sizes = []
+    score_customers = serve.score_customers
+    
+    def recording_score(pipeline, customers, threshold):
+        batch_sizes.append(len(customers))
+        return score_customers(pipeline, customers, threshold=threshold)
+    
+    monkeypatch.setattr(serve, 'score_customers', recording_score)
+    customers = _customers(MAX_QUEUE)
+    
+    async def post_concurrently():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = serve.MicroBatcher(executor, 1, max_batch_size=MAX_QUEUE, max_wait_ms=1000, max_queue=MAX_QUEUE)
+            service = serve.PredictionService(batcher, {})
+            responses = await asyncio.gather(*(service.handle('POST', '/predict', json.dumps(customer).encode())
+                                               for customer in customers))
+            await batcher.close()
+        return responses
+    
+    responses = asyncio.run(post_concurrently())
+    
+    # A full batch is flushed at once instead of waiting out max_wait_ms
+    assert batch_sizes == [MAX_QUEUE]
+    assert [status for status, _, _ in responses] == [200] * MAX_QUEUE
+    expected = score_customers(worker_pipeline, [serve.validate_customer(c) for c in customers])
+    assert [payload for _, payload, _ in responses] == expected
+
+
+async def _wait_until(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "condition not reached"
+        await asyncio.sleep(0.001)
+
+
+def test_requests_beyond_the_queue_limit_get_429(worker_pipeline, monkeypatch):
+    release = threading.Event()
+    in_flight = []
+    score_customers = serve.score_customers
+    
+    def blocking_score(pipeline, customers, threshold):
+        in_flight.append(len(customers))
+        release.wait(5)
+        return score_customers(pipeline, customers, threshold=threshold)
+    
+    monkeypatch.setattr(serve, 'score_customers', blocking_score)
+    body = json.dumps(_customers(1)[0]).encode()
+    
+    async def saturate():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = serve.MicroBatcher(executor, 1, max_batch_size=1, max_queue=MAX_QUEUE)
+            service = serve.PredictionService(batcher, {})
+            
+            # One request occupies the only worker slot, the next MAX_QUEUE fill the queue
+            admitted = [asyncio.create_task(service.handle('POST', '/predict', body))]
+            await _wait_until(lambda: in_flight)
+            admitted += [asyncio.create_task(service.handle('POST', '/predict', body)) for _ in range(MAX_QUEUE)]
+            await _wait_until(lambda: batcher.queued() == MAX_QUEUE)
+            
+            try:
+                single = await service.handle('POST', '/predict', body)
+                batch = await service.handle('POST', '/predict/batch', json.dumps(_customers(2)).encode())
+            finally:
+                release.set()
+            responses = await asyncio.gather(*admitted)
+            await batcher.close()
+        return single, batch, responses, batcher.stats()
+    
+    single, batch, responses, stats = asyncio.run(saturate())
+    
+    assert single[0] == 429 and 'retry later' in single[1]['error']
+    assert batch[0] == 429
+    assert stats['rejected'] == 2
+    assert [status for status, _, _ in responses] == [200] * (MAX_QUEUE + 1)
+
+
+def test_dispatched_batches_are_tracked_until_they_finish(worker_pipeline, monkeypatch):
+    release = threading.Event()
+    score_customers = serve.score_customers
+    
+    def blocking_score(pipeline, customers, threshold):
+        release.wait(5)
+        return score_customers(pipeline, customers, threshold=threshold)
+    
+    monkeypatch.setattr(serve, 'score_customers', blocking_score)
+    body = json.dumps(_customers(1)[0]).encode()
+    
+    async def dispatch_and_close():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = serve.MicroBatcher(executor, 1, max_batch_size=1, max_queue=MAX_QUEUE)
+            service = serve.PredictionService(batcher, {})
+            request = asyncio.create_task(service.handle('POST', '/predict', body))
+            
+            # The batch in the pool is held by the batcher, not just by the event loop
+            await _wait_until(lambda: batcher._tasks)
+            in_flight = set(batcher._tasks)
+            release.set()
+            
+            # Closing waits for the dispatched batch, so the request is still answered
+            await batcher.close()
+            return in_flight, batcher._tasks, await request
+    
+    in_flight, remaining, (status, payload, _) = asyncio.run(dispatch_and_close())
+    
+    assert len(in_flight) == 1 and all(task.done() for task in in_flight)
+    assert remaining == set()
+    assert status == 200 and 'churn_probability' in payload
+
+
+@pytest.mark.parametrize('engine', ['native', 'flat'])
+def test_worker_reports_the_model_it_loaded(train_pipeline, monkeypatch, engine):
+    pipeline = train_pipeline().pipeline
+    if engine == 'flat':
+        pipeline = compile_pipeline(pipeline)
+    monkeypatch.setattr(predict, '_worker_pipeline', pipeline)
+    
+    assert serve._worker_model_name() == 'LogisticRegression'
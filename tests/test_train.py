@@ -0,0 +1,249 @@
+"""
+Tests for the training pipeline in train.py.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from joblib import parallel_config
+from scipy.stats import loguniform, randint
+from sklearn.base import clone
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold
+
+import data_prep
+import train
+from conftest import make_customers, write_raw_csv
+from features import engineer_features, get_preprocessor, prepare_features_for_modeling
+
+
+@pytest.fixture
+def raw_data_path(tmp_path, monkeypatch):
+    """A raw customer CSV, with the working directory set to a scratch project root."""
+    monkeypatch.chdir(tmp_path)
+    return write_raw_csv(make_customers(500), tmp_path / 'raw.csv')
+
+
+def _drop_gender(clean_data):
+    return lambda df: clean_data(df).drop(columns=['gender'])
+
+
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_rebuild_reruns_cleaning(raw_data_path, monkeypatch, use_cache):
+    options = {'use_cache': use_cache, 'cache_dir': 'cache'}
+    assert 'gender' in train.load_engineered_data(raw_data_path, **options).columns
+    
+    # New cleaning code under the same cache key: only a rebuild may pick it up
+    monkeypatch.setattr(data_prep, 'clean_data', _drop_gender(data_prep.clean_data))
+    
+    assert 'gender' not in train.load_engineered_data(raw_data_path, rebuild=True, **options).columns
+
+
+def test_cleaning_code_change_invalidates_processed_data(raw_data_path, monkeypatch):
+    assert 'gender' in train.load_engineered_data(raw_data_path, cache_dir='cache').columns
+    
+    # A cleaning-code change changes the data_prep stage key and the processed-data sidecar version
+    monkeypatch.setattr(data_prep, 'clean_data', _drop_gender(data_prep.clean_data))
+    monkeypatch.setattr(data_prep, 'cleaning_code_version', lambda: 'edited')
+    module_version = train.module_version
+    monkeypatch.setattr(train, 'module_version',
+                        lambda module: 'edited' if module is data_prep else module_version(module))
+    
+    assert 'gender' not in train.load_engineered_data(raw_data_path, cache_dir='cache').columns
+
+
+@pytest.mark.parametrize('n_cores', [1, 2, 3, 4, 8])
+def test_parallel_training_stays_within_core_budget(monkeypatch, n_cores):
+    models = train.create_models()
+    allocation = train.allocate_cores(models, n_cores)
+    running, peak_threads = [], []
+    lock = threading.Lock()
+    
+    def fake_fit_and_score(model, X_train, y_train, X_test, use_smote=False):
+        threads = model.get_params().get('n_jobs') or 1
+        with lock:
+            running.append(threads)
+            peak_threads.append(sum(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(threads)
+        return np.zeros(len(X_test)), np.zeros(len(X_test)), 0.0, None
+    
+    monkeypatch.setattr(train, '_fit_and_score', fake_fit_and_score)
+    monkeypatch.setattr(train, 'compute_metrics', lambda *args, **kwargs: {})
+    
+    X, y = np.zeros((4, 2)), pd.Series([0, 1, 0, 1])
+    train.train_models_in_parallel(models, X, y, X, y, n_cores=n_cores)
+    
+    assert all(threads >= 1 for threads in allocation.values())
+    assert max(peak_threads) <= n_cores
+
+
+class SlowLogisticRegression(LogisticRegression):
+    """Logistic regression whose fit takes a fixed extra time."""
+    
+    def fit(self, X, y):
+        time.sleep(0.02)
+        return super().fit(X, y)
+
+
+def _search_data(n_samples=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, 3))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=n_samples) > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize('n_candidates, n_samples, expected_rounds', [
+    (1, 30_000, 1), (3, 30_000, 2), (9, 30_000, 3), (27, 30_000, 4), (28, 30_000, 4), (81, 30_000, 5),
+    # Data-bound: 243x min_samples allows exactly 6 rounds (math.log(243, 3) is 4.999999999999999)
+    (729, 243 * 20, 6)
+])
+def test_successive_halving_round_count(n_candidates, n_samples, expected_rounds):
+    X, y = _search_data(n_samples=n_samples)
+    space = {'random_state': randint(0, 1 << 30)}
+    
+    with parallel_config(backend='threading', n_jobs=1):
+        _, history = train.successive_halving_search(DummyClassifier(strategy='uniform'), space, X, y,
+                                                     n_candidates=n_candidates, min_samples=20, cv=2)
+    
+    assert history['round'].nunique() == expected_rounds
+    assert history['n_samples'].iloc[-1] == n_samples
+
+
+def test_successive_halving_checks_budget_per_candidate():
+    X, y = _search_data()
+    space = {'C': loguniform(1e-3, 1e2)}
+    
+    with parallel_config(backend='threading', n_jobs=1):
+        best_params, history = train.successive_halving_search(
+            SlowLogisticRegression(), space, X, y, n_candidates=27, min_samples=50, cv=2,
+            deadline=time.perf_counter() + 0.1
+        )
+    
+    # ~0.04 s per candidate: the first round stops long before all 27 are scored
+    assert history['round'].nunique() == 1
+    assert len(history) < 27
+    assert best_params == history.loc[history['cv_f1'].idxmax(), 'params']
+
+
+def test_xgboost_early_stopping_keeps_a_reproducible_model():
+    X, y = _search_data(n_samples=3000)
+    model = train.create_models()['XGBoost'].set_params(n_jobs=1)
+    
+    summary = train.fit_model(model, X, y)
+    
+    n_trees = summary['n_trees']
+    assert n_trees < train.XGB_MAX_TREES
+    assert model.get_params()['n_estimators'] == n_trees
+    assert model.get_booster().num_boosted_rounds() == n_trees
+    
+    # The saved model is refit on every training row: a clone fit on them reproduces it
+    refit = clone(model).fit(X, y)
+    np.testing.assert_array_equal(refit.predict_proba(X), model.predict_proba(X))
+
+
+def test_xgboost_early_stopping_validates_on_real_rows_with_smote(monkeypatch):
+    X, y = _search_data(n_samples=1000)
+    y[:800] = 0  # imbalanced, so SMOTE adds synthetic minority rows
+    model = train.create_models()['XGBoost'].set_params(n_jobs=1)
+    fits = []
+    fit = type(model).fit
+    
+    def recording_fit(self, X_fit, y_fit, **kwargs):
+        fits.append((X_fit, kwargs.get('eval_set')))
+        return fit(self, X_fit, y_fit, **kwargs)
+    
+    monkeypatch.setattr(type(model), 'fit', recording_fit)
+    train.fit_model(model, X, y, use_smote=True)
+    
+    (early_stopping_rows, eval_set), (final_rows, _) = fits
+    X_val = eval_set[0][0]
+    original_rows = {row.tobytes() for row in X}
+    assert len(X_val) == 100
+    assert all(row.tobytes() in original_rows for row in X_val)
+    # Early stopping trains on the oversampled 90%, the final model on all oversampled rows
+    assert len(final_rows) == 2 * np.bincount(y).max()
+    assert len(early_stopping_rows) == pytest.approx(0.9 * len(final_rows), abs=2)
+
+
+def test_pipelines_without_early_stopping_keep_100_trees():
+    X, y, _, numerical, categorical = prepare_features_for_modeling(
+        engineer_features(make_customers(400), verbose=False)
+    )
+    
+    results = train.train_and_evaluate_models(X.iloc[:300], X.iloc[300:], y.iloc[:300], y.iloc[300:],
+                                              get_preprocessor(numerical, categorical),
+                                              shared_preprocessing=False)
+    
+    model = results['XGBoost']['pipeline'].named_steps['model']
+    assert model.get_params()['n_estimators'] == train.XGB_TREES_WITHOUT_EARLY_STOPPING
+    assert model.get_booster().num_boosted_rounds() == train.XGB_TREES_WITHOUT_EARLY_STOPPING
+
+
+def test_cross_validation_refits_each_candidate_pipeline_per_fold():
+    X, y, _, numerical, categorical = prepare_features_for_modeling(
+        engineer_features(make_customers(600), verbose=False)
+    )
+    preprocessor = get_preprocessor(numerical, categorical)
+    pipelines = {
+        'Regularized': train.create_pipeline(preprocessor, LogisticRegression(C=1e-3, max_iter=1000)),
+        'SMOTE': train.create_pipeline(preprocessor, LogisticRegression(max_iter=1000), use_smote=True),
+        'XGBoost': train.create_pipeline(preprocessor, train.create_models()['XGBoost'].set_params(
+            n_estimators=15, early_stopping_rounds=None, n_jobs=1))
+    }
+    
+    cv_results = train.cross_validate_models(X, y, pipelines, n_splits=3, n_jobs=1)
+    
+    # Reference: the whole candidate pipeline, preprocessor included, fit on each fold's raw training rows
+    folds = list(StratifiedKFold(n_splits=3, shuffle=True, random_state=42).split(X, y))
+    for model_name, pipeline in pipelines.items():
+        fold_f1 = [f1_score(y.iloc[val_idx], clone(pipeline).fit(X.iloc[train_idx], y.iloc[train_idx])
+                            .predict(X.iloc[val_idx]))
+                   for train_idx, val_idx in folds]
+        assert cv_results[model_name]['f1_score_mean'] == pytest.approx(np.mean(fold_f1))
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_shared_matrices_give_the_per_pipeline_metrics(monkeypatch, parallel):
+    X, y, _, numerical, categorical = prepare_features_for_modeling(
+        engineer_features(make_customers(600), verbose=False)
+    )
+    create_models = train.create_models
+    monkeypatch.setattr(train, 'create_models', lambda early_stopping=True: {
+        name: model for name, model in create_models(early_stopping).items()
+        if name in ('Logistic Regression', 'Random Forest')
+    })
+    splits = X.iloc[:450], X.iloc[450:], y.iloc[:450], y.iloc[450:]
+    
+    shared = train.train_and_evaluate_models(*splits, get_preprocessor(numerical, categorical), parallel=parallel,
+                                             n_cores=2)
+    separate = train.train_and_evaluate_models(*splits, get_preprocessor(numerical, categorical),
+                                               shared_preprocessing=False)
+    
+    assert set(shared) == {'Logistic Regression', 'Random Forest'}
+    for model_name, result in separate.items():
+        assert shared[model_name]['metrics'] == pytest.approx(result['metrics'])
+        np.testing.assert_allclose(shared[model_name]['pipeline'].predict_proba(splits[1]),
+                                   result['pipeline'].predict_proba(splits[1]))
+
+
+def test_parallel_training_matches_the_sequential_loop(capsys):
+    X, y, _, numerical, categorical = prepare_features_for_modeling(
+        engineer_features(make_customers(600), verbose=False)
+    )
+    splits = X.iloc[:450], X.iloc[450:], y.iloc[:450], y.iloc[450:]
+    
+    parallel = train.train_and_evaluate_models(*splits, get_preprocessor(numerical, categorical), parallel=True,
+                                               n_cores=2, compare_sequential=True)
+    sequential = train.train_and_evaluate_models(*splits, get_preprocessor(numerical, categorical))
+    
+    assert set(parallel) == set(sequential) == set(train.create_models())
+    for model_name, result in sequential.items():
+        assert parallel[model_name]['metrics'] == pytest.approx(result['metrics'])
+    assert 'speedup' in capsys.readouterr().out
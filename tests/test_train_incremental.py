@@ -0,0 +1,77 @@
+"""
+Out-of-core training: a file larger than the memory cap is streamed in
+chunks, and the result must match fitting the same model in memory.
+"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+from conftest import make_customers
+from features import engineer_features, get_preprocessor, prepare_features_for_modeling
+import train_incremental
+
+
+MEMORY_LIMIT_MB = 0.5
+
+
+@pytest.fixture(scope='module')
+def streamed(tmp_path_factory):
+    """Train incrementally on a synthetic file several times the memory cap."""
+    df = make_customers(10000, seed=1)
+    
+    # A learnable target, so the model comparison is meaningful
+    rng = np.random.default_rng(1)
+    logit = -1.0 + 1.5 * (df['Contract'] == 'Month-to-month') - 0.04 * df['tenure'] + 0.01 * df['MonthlyCharges']
+    df['Churn'] = np.where(rng.random(len(df)) < 1 / (1 + np.exp(-logit)), 'Yes', 'No')
+    
+    path = tmp_path_factory.mktemp('incremental') / 'customers.csv'
+    df.to_csv(path, index=False)
+    
+    result = train_incremental.train_incremental(path, memory_limit_mb=MEMORY_LIMIT_MB)
+    
+    X, y, _, numerical_features, categorical_features = prepare_features_for_modeling(
+        engineer_features(df, verbose=False))
+    holdout = (np.arange(len(df)) % train_incremental.HOLDOUT_EVERY) == 0
+    in_memory = get_preprocessor(numerical_features, categorical_features).fit(X[~holdout])
+    
+    return {
+        'path': path, 'result': result, 'X': X, 'y': y.to_numpy(),
+        'holdout': holdout, 'in_memory': in_memory
+    }
+
+
+def test_file_is_streamed_in_several_chunks(streamed):
+    assert streamed['path'].stat().st_size > MEMORY_LIMIT_MB * 1024**2
+    assert streamed['result']['chunksize'] * 5 < len(streamed['X'])
+
+
+def test_streamed_preprocessor_matches_in_memory_fit(streamed):
+    preprocessor = streamed['result']['pipeline'].named_steps['preprocessor']
+    in_memory = streamed['in_memory']
+    
+    scaler = preprocessor.named_transformers_['num']
+    reference = in_memory.named_transformers_['num']
+    np.testing.assert_allclose(scaler.mean_, reference.mean_, rtol=1e-10)
+    np.testing.assert_allclose(scaler.var_, reference.var_, rtol=1e-10)
+    
+    np.testing.assert_allclose(preprocessor.transform(streamed['X']), in_memory.transform(streamed['X']),
+                               rtol=1e-10, atol=1e-12)
+    assert list(preprocessor.get_feature_names_out()) == list(in_memory.get_feature_names_out())
+
+
+def test_streamed_model_matches_in_memory_fit(streamed):
+    model = streamed['result']['pipeline'].named_steps['model']
+    X, y, holdout = streamed['in_memory'].transform(streamed['X']), streamed['y'], streamed['holdout']
+    
+    # The same objective solved in memory: log loss with the SGD model's L2 penalty and class weights
+    reference = LogisticRegression(C=1 / (model.alpha * (~holdout).sum()), class_weight=model.class_weight,
+                                   max_iter=5000).fit(X[~holdout], y[~holdout])
+    
+    streamed_proba = streamed['result']['pipeline'].predict_proba(streamed['X'][holdout])[:, 1]
+    reference_proba = reference.predict_proba(X[holdout])[:, 1]
+    
+    assert np.abs(streamed_proba - reference_proba).mean() < 0.03
+    assert abs(roc_auc_score(y[holdout], streamed_proba) - roc_auc_score(y[holdout], reference_proba)) < 0.01
+    assert streamed['result']['metrics']['roc_auc'] == pytest.approx(roc_auc_score(y[holdout], streamed_proba))